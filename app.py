@@ -3,6 +3,7 @@ APP_VERSION = "v4.9.6"
 APP_RELEASE_DATE = "2026-06-11"
 
 from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, abort, make_response
+from flask import get_template_attribute, Response
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
@@ -22,6 +23,12 @@ import ipaddress
 import logging
 from datetime import datetime, timezone, timedelta, date
 import threading
+import concurrent.futures
+import functools
+import itertools
+import bisect
+import hashlib
+import uuid
 
 
 # Pillow is used to stitch OSM map tiles into the static basemap PNGs for the
@@ -99,8 +106,14 @@ app.secret_key = os.urandom(24)  # replace with a fixed key in production
 app.config['REMEMBER_COOKIE_DURATION'] = timedelta(days=30)
 
 
+# users.db and tuners.db are opened through a per-thread pool of tuned
+# connections (WAL, reused prepared statements); see utils/db_pool.py.
+from utils import db_pool as _db_pool
+
 DATABASE = os.path.join(DATA_DIR, 'users.db')
 TUNER_DB = os.path.join(DATA_DIR, 'tuners.db')
+EPG_DB = os.path.join(DATA_DIR, 'db', 'epg.db')
+FEED_CACHE_DIR = os.path.join(DATA_DIR, 'xmltv')
 ROADS_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'roads_cache')
 ROADS_BUNDLED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'data', 'roads')
 AUDIO_UPLOAD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'audio')
@@ -161,12 +174,11 @@ LOG_PATH = os.path.join(DATA_DIR, "logs", "activity.log")
 def log_event(user, action):
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     try:
-        with sqlite3.connect(DATABASE, timeout=10) as conn:
+        with _db_pool.connect(DATABASE) as conn:
             conn.execute(
                 "INSERT INTO activity_logs (username, action, timestamp) VALUES (?, ?, ?)",
                 (user, action, ts),
             )
-            conn.commit()
     except sqlite3.OperationalError:
         # Table may not exist on older installs where init_db() hasn't run yet — auto-heal.
         init_db()
@@ -297,46 +309,36 @@ def _migrate_activity_log(conn):
     return len(rows)
 
 
-def _apply_users_schema_migrations(conn: sqlite3.Connection) -> None:
-    """Apply incremental column migrations to the ``users`` table.
+# Schema changes are one-shot, versioned migrations (see utils/migrations.py).
+# Append new entries at the end; never edit or reorder applied ones.
+from utils.migrations import migrate as _migrate_schema, add_column as _add_column
 
-    Each statement is wrapped in its own try/except so that a column that
-    already exists (``OperationalError``) is silently skipped.  New columns
-    must be appended to the bottom of this function — never removed — so that
-    any older database is always brought forward to the latest schema.
-    """
-    _migrations = [
-        # v1 → v2: persisted last-login timestamp
-        'ALTER TABLE users ADD COLUMN last_login TEXT',
-        # v2 → v3: per-user tuner assignment
-        'ALTER TABLE users ADD COLUMN assigned_tuner TEXT',
-        # v3 → v4: force password change on first login
-        'ALTER TABLE users ADD COLUMN must_change_password INTEGER NOT NULL DEFAULT 0',
-    ]
-    for stmt in _migrations:
-        try:
-            conn.execute(stmt)
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass  # column already present — safe to skip
 
+def _users_initial_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS users
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password TEXT, last_login TEXT)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS user_preferences
+                    (username TEXT PRIMARY KEY, prefs TEXT)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS activity_logs
+                    (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                     username TEXT NOT NULL,
+                     action TEXT NOT NULL,
+                     timestamp TEXT NOT NULL)''')
 
-def init_db():
-    with sqlite3.connect(DATABASE, timeout=10) as conn:
-        conn.execute("PRAGMA journal_mode=WAL;")
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS users
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT UNIQUE, password TEXT, last_login TEXT)''')
-        c.execute('''CREATE TABLE IF NOT EXISTS user_preferences
-                     (username TEXT PRIMARY KEY, prefs TEXT)''')
-        c.execute('''CREATE TABLE IF NOT EXISTS activity_logs
-                     (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                      username TEXT NOT NULL,
-                      action TEXT NOT NULL,
-                      timestamp TEXT NOT NULL)''')
-        conn.commit()
 
-        _apply_users_schema_migrations(conn)
+_USERS_MIGRATIONS = [
+    (1, "users, user_preferences and activity_logs tables", _users_initial_tables),
+    (2, "users.last_login", lambda conn: _add_column(conn, 'users', 'last_login', 'TEXT')),
+    (3, "users.assigned_tuner (per-user tuner assignment)",
+     lambda conn: _add_column(conn, 'users', 'assigned_tuner', 'TEXT')),
+    (4, "users.must_change_password (forced change on first login)",
+     lambda conn: _add_column(conn, 'users', 'must_change_password', 'INTEGER NOT NULL DEFAULT 0')),
+]
+
+
+def init_db():
+    with _db_pool.connect(DATABASE) as conn:
+        _migrate_schema(conn, _USERS_MIGRATIONS)
 
         # Migrate entries from the legacy activity.log flat file (one-time migration).
         migrated_count = _migrate_activity_log(conn)
@@ -354,13 +356,12 @@ def init_db():
 
 def add_user(username, password, must_change_password=0):
     password_hash = generate_password_hash(password)
-    with sqlite3.connect(DATABASE, timeout=10) as conn:
+    with _db_pool.connect(DATABASE) as conn:
         c = conn.cursor()
         c.execute('INSERT OR IGNORE INTO users (username, password, must_change_password) VALUES (?, ?, ?)', (username, password_hash, must_change_password))
-        conn.commit()
 
 def get_user(username):
-    with sqlite3.connect(DATABASE, timeout=10) as conn:
+    with _db_pool.connect(DATABASE) as conn:
         c = conn.cursor()
         c.execute('SELECT id, username, password, last_login, must_change_password FROM users WHERE username=?', (username,))
         row = c.fetchone()
@@ -368,121 +369,131 @@ def get_user(username):
         return User(row[0], row[1], row[2], row[3], row[4])
     return None
 
+# Loaded users (by id) and decoded preferences (by username) are kept for a
+# short while; every write path below drops or replaces its entry.  See
+# utils/ttl_cache.py for why other processes' writes rely on the TTL.
+from utils.ttl_cache import TTLCache as _TTLCache, MISSING as _MISSING
+
+_user_cache = _TTLCache(lambda: DATABASE)
+_prefs_cache = _TTLCache(lambda: DATABASE)
+
+
+def forget_user(username):
+    """Drop cached identity and preferences for *username*."""
+    _user_cache.discard_where(lambda _id, user: user.username == username)
+    _prefs_cache.discard(username)
+
+
+def get_user_cache_stats():
+    """Identity/preference cache hits, misses and sizes (diagnostics)."""
+    return {"users": _user_cache.stats(), "prefs": _prefs_cache.stats()}
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    with sqlite3.connect(DATABASE, timeout=10) as conn:
+    user = _user_cache.get(str(user_id))
+    if user is not _MISSING:
+        return user
+    with _db_pool.connect(DATABASE) as conn:
         c = conn.cursor()
         c.execute('SELECT id, username, password, last_login, must_change_password FROM users WHERE id=?', (user_id,))
         row = c.fetchone()
     if row:
-        return User(row[0], row[1], row[2], row[3], row[4])
+        user = User(row[0], row[1], row[2], row[3], row[4])
+        _user_cache.put(str(user_id), user)
+        return user
     return None
 
 # ------------------- Tuner DB -------------------
-def init_tuners_db():
-    with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS tuners
-                     (name TEXT PRIMARY KEY, xml TEXT, m3u TEXT)''')
-        c.execute('''CREATE TABLE IF NOT EXISTS settings
-                     (key TEXT PRIMARY KEY, value TEXT)''')
-        conn.commit()
+# Reads of the settings table go through one cached store; see
+# utils/settings_store.py for how it notices writes from other connections.
+from utils.settings_store import SettingsStore as _SettingsStore
 
-        # Add tuner_type column if it doesn't exist (for existing databases)
-        try:
-            c.execute("ALTER TABLE tuners ADD COLUMN tuner_type TEXT DEFAULT 'standard'")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass
+_settings = _SettingsStore(lambda: TUNER_DB, on_write=lambda: bump_data_generation())
 
-        # Add sources column if it doesn't exist (for combined tuners)
-        try:
-            c.execute("ALTER TABLE tuners ADD COLUMN sources TEXT")
-            conn.commit()
-        except sqlite3.OperationalError:
-            pass
+def get_settings_cache_stats():
+    """Settings cache hits, namespace loads and invalidations (diagnostics)."""
+    return _settings.stats()
 
-        # Remove the test banner feature entirely: delete the global overlay.test_text key
-        # and the per-channel test_text keys for all virtual channels.  This clears any
-        # stale "This is test Text!" values that were stored during early development.
-        c.execute("DELETE FROM settings WHERE key='overlay.test_text'")
-        for _ch_id in ('virtual.news', 'virtual.weather', 'virtual.status', 'virtual.traffic', 'virtual.updates', 'virtual.sports', 'virtual.nasa'):
-            c.execute("DELETE FROM settings WHERE key=?",
-                      (f"overlay.{_ch_id}.test_text",))
-        conn.commit()
+# The tuner list and active tuner are served from memory the same way; see
+# utils/tuner_registry.py.
+from utils.tuner_registry import TunerRegistry as _TunerRegistry
+
+_tuners = _TunerRegistry(lambda: TUNER_DB)
+
+def _tuners_initial_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS tuners
+                    (name TEXT PRIMARY KEY, xml TEXT, m3u TEXT)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS settings
+                    (key TEXT PRIMARY KEY, value TEXT)''')
 
-        # bootstrap if empty
-        c.execute("SELECT COUNT(*) FROM tuners")
-        if c.fetchone()[0] == 0:
-            defaults = {
-                "Tuner 1": {
-                    "m3u": "http://iptv.lan:8409/iptv/channels.m3u",
-                    "xml": "http://iptv.lan:8409/iptv/xmltv.xml"
-                },
-                "Tuner 2": {
-                    "m3u": "http://iptv2.lan:8500/iptv/channels.m3u",
-                    "xml": "http://iptv2.lan:8500/iptv/xmltv.xml"
-                },
-            }
-            for name, urls in defaults.items():
-                c.execute("INSERT INTO tuners (name, xml, m3u) VALUES (?, ?, ?)",
-                          (name, urls["xml"], urls["m3u"]))
-            # set default active tuner
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('current_tuner', 'Tuner 1')")
-        conn.commit()
 
-        # Ensure traffic demo cities table exists and is seeded
-        _init_traffic_demo_db(conn)
+def _drop_test_banner_settings(conn):
+    # Remove the test banner feature entirely: delete the global overlay.test_text key
+    # and the per-channel test_text keys for all virtual channels.  This clears any
+    # stale "This is test Text!" values that were stored during early development.
+    conn.execute("DELETE FROM settings WHERE key='overlay.test_text'")
+    for _ch_id in ('virtual.news', 'virtual.weather', 'virtual.status', 'virtual.traffic', 'virtual.updates', 'virtual.sports', 'virtual.nasa'):
+        conn.execute("DELETE FROM settings WHERE key=?", (f"overlay.{_ch_id}.test_text",))
+
+
+def _seed_default_tuners(conn):
+    # Bootstrap a brand-new install.  The active tuner cannot be deleted, so
+    # the table never becomes empty again afterwards.
+    if conn.execute("SELECT COUNT(*) FROM tuners").fetchone()[0]:
+        return
+    defaults = {
+        "Tuner 1": {
+            "m3u": "http://iptv.lan:8409/iptv/channels.m3u",
+            "xml": "http://iptv.lan:8409/iptv/xmltv.xml"
+        },
+        "Tuner 2": {
+            "m3u": "http://iptv2.lan:8500/iptv/channels.m3u",
+            "xml": "http://iptv2.lan:8500/iptv/xmltv.xml"
+        },
+    }
+    for name, urls in defaults.items():
+        conn.execute("INSERT INTO tuners (name, xml, m3u) VALUES (?, ?, ?)",
+                     (name, urls["xml"], urls["m3u"]))
+    # set default active tuner
+    conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('current_tuner', 'Tuner 1')")
+
+
+_TUNERS_MIGRATIONS = [
+    (1, "tuners and settings tables", _tuners_initial_tables),
+    (2, "tuners.tuner_type", lambda conn: _add_column(conn, 'tuners', 'tuner_type', "TEXT DEFAULT 'standard'")),
+    (3, "tuners.sources (combined tuners)", lambda conn: _add_column(conn, 'tuners', 'sources', 'TEXT')),
+    (4, "drop test banner settings", _drop_test_banner_settings),
+    (5, "seed default tuners", _seed_default_tuners),
+    (6, "traffic_demo_cities table", lambda conn: _init_traffic_demo_db(conn)),
+]
+
+
+def init_tuners_db():
+    with _db_pool.connect(TUNER_DB) as conn:
+        _migrate_schema(conn, _TUNERS_MIGRATIONS)
 
 def get_tuners():
-    with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-        c = conn.cursor()
-        try:
-            c.execute("SELECT name, xml, m3u, tuner_type, sources FROM tuners")
-            rows = c.fetchall()
-            result = {}
-            for row in rows:
-                name, xml, m3u, tuner_type, sources_json = row
-                entry = {"xml": xml, "m3u": m3u, "tuner_type": tuner_type or "standard"}
-                if sources_json:
-                    try:
-                        entry["sources"] = _json.loads(sources_json)
-                    except Exception:
-                        entry["sources"] = []
-                else:
-                    entry["sources"] = []
-                result[name] = entry
-            return result
-        except sqlite3.OperationalError:
-            # Fallback for old schema without tuner_type/sources columns
-            c.execute("SELECT name, xml, m3u FROM tuners")
-            return {row[0]: {"xml": row[1], "m3u": row[2], "tuner_type": "standard", "sources": []}
-                    for row in c.fetchall()}
+    return _tuners.tuners()
 
 def get_current_tuner():
-    with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-        c = conn.cursor()
-        c.execute("SELECT value FROM settings WHERE key='current_tuner'")
-        row = c.fetchone()
-        return row[0] if row else None
+    return _tuners.current()
+
+def get_tuner_generation():
+    """Bumped whenever the tuner list or the active tuner changes; for cache keys."""
+    return _tuners.current_generation()
 
 def set_current_tuner(name):
-    with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-        c = conn.cursor()
-        c.execute("UPDATE settings SET value=? WHERE key='current_tuner'", (name,))
-        conn.commit()
+    _tuners.set_current(name)
+    bump_data_generation()
 
 def update_tuner_urls(name, xml_url, m3u_url):
-    with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-        c = conn.cursor()
-        c.execute("UPDATE tuners SET xml=?, m3u=? WHERE name=?", (xml_url, m3u_url, name))
-        conn.commit()
+    _tuners.update_urls(name, xml_url, m3u_url)
 
 def add_tuner(name, xml_url, m3u_url):
     """Insert a new tuner into DB with validation."""
     # Check for duplicate name
-    tuners = get_tuners()
-    if name in tuners:
+    if name in _tuners:
         raise ValueError(f"Tuner '{name}' already exists")
     
     # Validate XML URL
@@ -529,55 +540,278 @@ def add_tuner(name, xml_url, m3u_url):
         raise ValueError(f"M3U URL validation failed: {str(e)}")
     
     # Insert into database
-    with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-        c = conn.cursor()
-        try:
-            c.execute(
-                "INSERT INTO tuners (name, xml, m3u, tuner_type) VALUES (?, ?, ?, 'standard')",
-                (name, xml_url, m3u_url)
-            )
-        except sqlite3.OperationalError:
-            # Fallback for old schema without tuner_type column
-            c.execute(
-                "INSERT INTO tuners (name, xml, m3u) VALUES (?, ?, ?)",
-                (name, xml_url, m3u_url)
-            )
-        conn.commit()
+    _tuners.add(name, xml_url, m3u_url)
 
 def delete_tuner(name):
     """Delete a tuner from DB (except current one)."""
-    with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-        c = conn.cursor()
-        c.execute('DELETE FROM tuners WHERE name=?', (name,))
-        conn.commit()
+    _tuners.delete(name)
+    try:
+        _epg_store.drop_tuner(EPG_DB, name)
+    except sqlite3.Error:
+        logging.exception("delete_tuner: could not drop stored guide for %s", name)
 
 def rename_tuner(old_name, new_name):
-    """Rename a tuner in DB."""
-    with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-        c = conn.cursor()
-        c.execute("UPDATE tuners SET name=? WHERE name=?", (new_name, old_name))
-        conn.commit()
+    """Rename a tuner in DB (the active tuner stays active under its new name)."""
+    _tuners.rename(old_name, new_name)
+    try:
+        _epg_store.rename_tuner(EPG_DB, old_name, new_name)
+    except sqlite3.Error:
+        logging.exception("rename_tuner: could not move stored guide for %s", old_name)
 
 
 def add_combined_tuner(name, sources):
     """Create a combined tuner that merges channels and EPG from multiple source tuners."""
     if not sources:
         raise ValueError("Combined tuner requires at least one source tuner")
+    _tuners.add(name, None, None, tuner_type="combined", sources=sources)
+
+
+# ------------------- EPG Ingest Filters -------------------
+# Per-tuner retention window, stored as "epg_lookback_hours:<tuner>" /
+# "epg_lookahead_hours:<tuner>" in the settings table.  An empty value keeps
+# the whole feed in that direction.  Upcoming programmes are kept in full by
+# default: with auto-refresh off (the default) a shorter horizon would leave
+# the guide empty once it ran out.
+EPG_LOOKBACK_PRESETS = [0, 1, 2, 6, 12, 24]
+EPG_LOOKAHEAD_PRESETS = [12, 24, 48, 72, 168]
+EPG_LOOKBACK_DEFAULT = 2
+EPG_LOOKAHEAD_DEFAULT = None
+
+
+def get_epg_retention(tuner_name):
+    """Return ``(lookback_hours, lookahead_hours)`` for *tuner_name*.
+
+    Either value is None when the tuner keeps the whole feed in that direction.
+    """
+    def _read(key, default, presets):
+        raw = get_setting(f"{key}:{tuner_name}", None)
+        if raw is None:
+            return default
+        if raw == "":
+            return None
+        try:
+            value = int(raw)
+        except (TypeError, ValueError):
+            return default
+        return value if value in presets else default
+
+    return (_read("epg_lookback_hours", EPG_LOOKBACK_DEFAULT, EPG_LOOKBACK_PRESETS),
+            _read("epg_lookahead_hours", EPG_LOOKAHEAD_DEFAULT, EPG_LOOKAHEAD_PRESETS))
+
+
+def epg_ingest_window(tuner_name, now=None):
+    """Return ``(lo, hi)``: programmes must overlap this range to be kept (None = open)."""
+    lookback, lookahead = get_epg_retention(tuner_name)
+    now = now or datetime.now(timezone.utc)
+    return (now - timedelta(hours=lookback) if lookback is not None else None,
+            now + timedelta(hours=lookahead) if lookahead is not None else None)
+
+
+def _playlist_channel_ids(channels):
+    """tvg_ids referenced by *channels*; None (keep every channel) if the playlist is empty."""
+    return {ch.get('tvg_id') for ch in channels if ch.get('tvg_id')} or None
+
+
+def _is_xmltv_url(xml_url):
+    # Same rule as parse_epg: a pasted .m3u in the XML field has no guide data.
+    return bool(xml_url) and not xml_url.lower().endswith(('.m3u', '.m3u8'))
+
+
+# Feeds of a combined tuner are downloaded in parallel on a bounded pool.
+FEED_FETCH_WORKERS = 8
+# Seconds a batch of feed downloads may take; a feed still downloading after
+# that is treated like a failed fetch (its cached copy, or no data).
+FEED_FETCH_TIMEOUT = 60
+
+
+def _run_concurrently(tasks, timeout=FEED_FETCH_TIMEOUT):
+    """Run ``(fn, fallback)`` pairs on a bounded thread pool, results in task order.
+
+    A task that raises, or has not finished *timeout* seconds after the batch
+    started, contributes ``fallback()`` instead; a timed-out thread is left to
+    finish in the background.  Returning in task order keeps merges
+    deterministic regardless of which download completes first.
+    """
+    if not tasks:
+        return []
+    pool = concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(FEED_FETCH_WORKERS, len(tasks)), thread_name_prefix="feed-fetch")
+    try:
+        futures = [pool.submit(fn) for fn, _ in tasks]
+        done, _ = concurrent.futures.wait(futures, timeout=timeout)
+        results = []
+        for future, (fn, fallback) in zip(futures, tasks):
+            if future not in done:
+                logging.warning("Feed fetch still running after %ss, using fallback: %s", timeout, fn)
+                results.append(fallback())
+            elif future.exception() is not None:
+                logging.warning("Feed fetch failed: %s", future.exception())
+                results.append(fallback())
+            else:
+                results.append(future.result())
+        return results
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _PendingChannelIds:
+    """Channel-id filter for guides downloaded alongside their playlists.
+
+    Wrap each playlist task with :meth:`wrap`.  A membership test (the
+    first one comes when a guide's first ``<channel>`` element is parsed)
+    waits until every wrapped task has finished, then answers from the
+    merged playlists' ids, like _playlist_channel_ids.  If the playlists are
+    still running after FEED_FETCH_TIMEOUT, every channel is kept, and later
+    tests answer at once instead of waiting again.
+    """
+
+    def __init__(self, count):
+        self._lock = threading.Lock()
+        self._left = count
+        self._channels = []
+        self._ids = None
+        self._ready = threading.Event()
+        if not count:
+            self._ready.set()
+
+    def wrap(self, fn):
+        def run():
+            found = None
+            try:
+                found = fn()
+                return found
+            finally:
+                with self._lock:
+                    if self._left is not None:  # None: a lookup gave up waiting
+                        self._channels.extend(found or ())
+                        self._left -= 1
+                        if not self._left:
+                            self._ids = _playlist_channel_ids(self._channels)
+                            self._ready.set()
+        return run
+
+    def __contains__(self, channel_id):
+        if not self._ready.wait(FEED_FETCH_TIMEOUT):
+            with self._lock:
+                self._left = None
+                self._ids = None
+                self._ready.set()
+        return self._ids is None or channel_id in self._ids
+
+
+def _feed_sources(tuners, tuner):
+    """The standard tuners whose feeds make up *tuner* (itself, or a combined tuner's sources)."""
+    if tuner.get("tuner_type") == "combined":
+        return [tuners[s] for s in tuner.get("sources", []) if s in tuners]  # skip missing source tuners
+    return [tuner]
+
+
+def _stored_guide_current(stored, meta, now):
+    """True when the stored generation was ingested from the same feeds and settings.
+
+    With a lookahead limit, the guide is re-ingested once half of its horizon
+    has elapsed even if the feeds are unchanged, so it never runs dry.
+    """
+    if stored.get("feeds") != meta["feeds"] or stored.get("retention") != meta["retention"]:
+        return False
+    lookahead = meta["retention"][1]
+    if lookahead is None:
+        return True
+    try:
+        ingested_at = datetime.fromisoformat(stored["ingested_at"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return now - ingested_at < timedelta(hours=lookahead) / 2
+
+
+def _ingest(tuner_name, playlists, parse_guides, now=None):
+    """Shared tail of the two loaders: merge playlists, then parse the guides.
+
+    *playlists* are parsed channel lists in source order.  *parse_guides* is
+    called with the playlists' channel ids and the tuner's retention window
+    and returns parsed guides in source order; later ones win on id clashes.
+    """
+    channels = [ch for found in playlists for ch in found]
+    epg = {}
+    for found in parse_guides(_playlist_channel_ids(channels), epg_ingest_window(tuner_name, now)):
+        epg.update(found)
+    return channels, epg
+
+
+def _parse_cached_guide(xml, channel_ids, window):
+    try:
+        return _programmes_from_chunks(_feed_cache.iter_body(xml), xml.content_encoding,
+                                       channel_ids=channel_ids, window=window)
+    except Exception as e:
+        logging.warning("load_tuner_data_if_changed: could not parse XMLTV from %s: %s", xml.url, e)
+        return {}
+
+
+def load_tuner_data_if_changed(tuner_name):
+    """Like load_tuner_data, but revalidate the feeds against FEED_CACHE_DIR first.
+
+    Each M3U / XMLTV URL is fetched with If-None-Match / If-Modified-Since and
+    its body kept on disk (utils/feed_cache.py); all of them are fetched in
+    parallel.  When every feed hash and the
+    tuner's retention settings match the ones recorded with its stored
+    guide, nothing is parsed and None is returned: the stored guide is still
+    current.
+
+    Returns:
+        None, or (channels, epg, meta) where *meta* (feed hashes, retention,
+        ingest time) should be passed on to publish_tuner_data().
+    """
+    now = datetime.now(timezone.utc)
     tuners = get_tuners()
-    if name in tuners:
-        raise ValueError(f"Tuner '{name}' already exists")
-    with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-        c = conn.cursor()
-        c.execute(
-            "INSERT INTO tuners (name, xml, m3u, tuner_type, sources) VALUES (?, ?, ?, ?, ?)",
-            (name, None, None, "combined", _json.dumps(sources))
-        )
-        conn.commit()
+    tuner = tuners.get(tuner_name)
+    if not tuner:
+        return [], {}, {}
+
+    pairs = []
+    timeouts = {}
+    for source in _feed_sources(tuners, tuner):
+        m3u = source.get("m3u") or None
+        xml = source["xml"] if _is_xmltv_url(source.get("xml")) else None
+        if m3u:
+            timeouts.setdefault(m3u, 10)
+        if xml:
+            timeouts.setdefault(xml, 15)
+        pairs.append((m3u, xml))
+    # Every distinct playlist and guide URL is revalidated at once; a feed
+    # that times out falls back to its cached body like a failed fetch.
+    results = dict(zip(timeouts, _run_concurrently([
+        (functools.partial(_feed_cache.revalidate, FEED_CACHE_DIR, url, timeout=timeout),
+         functools.partial(_feed_cache.cached, FEED_CACHE_DIR, url))
+        for url, timeout in timeouts.items()
+    ])))
+    fetched = [(results.get(m3u), results.get(xml)) for m3u, xml in pairs]
+
+    meta = {
+        "feeds": {r.url: r.sha256 for pair in fetched for r in pair if r is not None},
+        "retention": list(get_epg_retention(tuner_name)),
+        "ingested_at": now.isoformat(),
+    }
+    stored = _epg_store.get_generation_meta(EPG_DB, tuner_name)
+    if stored is not None and _stored_guide_current(stored, meta, now):
+        return None
+
+    # Cached bodies are parsed one at a time: no network wait to overlap,
+    # and only one large guide in flight.
+    playlists = [_channels_from_m3u_lines(_feed_cache.read_text(m3u).splitlines())
+                 for m3u, _ in fetched if m3u is not None and m3u.path]
+    channels, epg = _ingest(tuner_name, playlists, lambda channel_ids, window: (
+        _parse_cached_guide(xml, channel_ids, window)
+        for _, xml in fetched if xml is not None and xml.path
+    ), now)
+    return channels, epg, meta
 
 
 def load_tuner_data(tuner_name):
     """Load channels and EPG for a tuner, supporting combined tuners.
 
+    The guide is filtered at ingest to the tuner's retention window and to
+    the channel ids its playlist(s) reference.
+
     Returns:
         (channels, epg) — lists/dicts as returned by parse_m3u / parse_epg.
     """
@@ -586,22 +820,23 @@ def load_tuner_data(tuner_name):
     if not tuner:
         return [], {}
 
-    if tuner.get("tuner_type") == "combined":
-        merged_channels = []
-        merged_epg = {}
-        for source_name in tuner.get("sources", []):
-            source = tuners.get(source_name)
-            if not source:
-                continue  # skip missing source tuners
-            src_channels = parse_m3u(source["m3u"]) if source.get("m3u") else []
-            src_epg = parse_epg(source["xml"]) if source.get("xml") else {}
-            merged_channels.extend(src_channels)
-            merged_epg.update(src_epg)
-        return merged_channels, merged_epg
-    else:
-        channels = parse_m3u(tuner["m3u"]) if tuner.get("m3u") else []
-        epg = parse_epg(tuner["xml"]) if tuner.get("xml") else {}
-        return channels, epg
+    sources = _feed_sources(tuners, tuner)
+    m3u_urls = [source["m3u"] for source in sources if source.get("m3u")]
+    xml_urls = [source["xml"] for source in sources if source.get("xml")]
+    # Playlists and guides download in one parallel batch, merged in source
+    # order.  The guides' channel-id filter fills in once the playlists are
+    # in; playlist tasks are queued first so they never wait for a worker
+    # behind a guide that is waiting for them.
+    channel_ids = _PendingChannelIds(len(m3u_urls))
+    window = epg_ingest_window(tuner_name)
+    results = _run_concurrently(
+        [(channel_ids.wrap(functools.partial(parse_m3u, url)), list) for url in m3u_urls]
+        + [(functools.partial(parse_epg, url, channel_ids=channel_ids, window=window), dict)
+           for url in xml_urls])
+    playlists, guides = results[:len(m3u_urls)], results[len(m3u_urls):]
+    return _ingest(tuner_name, playlists, lambda _channel_ids, _window: guides)
+
+
 @app.template_filter('format_datetime')
 def format_datetime_filter(iso_string):
     """Format ISO datetime string to human-readable format."""
@@ -639,21 +874,38 @@ _DEFAULT_PREFS = {
 }
 
 
+def _decode_prefs(raw):
+    prefs = dict(_DEFAULT_PREFS)
+    if raw:
+        try:
+            stored = _json.loads(raw)
+        except ValueError:
+            stored = None
+        if isinstance(stored, dict):
+            prefs.update({k: v for k, v in stored.items() if k in _DEFAULT_PREFS})
+    return prefs
+
+
+def _copy_prefs(prefs):
+    # Callers edit the lists/dicts they get back; keep the cached copy intact.
+    return {k: v.copy() if isinstance(v, (list, dict)) else v for k, v in prefs.items()}
+
+
 def get_user_prefs(username):
     """Return the stored preferences for *username*, merged with defaults."""
+    prefs = _prefs_cache.get(username)
+    if prefs is not _MISSING:
+        return _copy_prefs(prefs)
     try:
-        with sqlite3.connect(DATABASE, timeout=10) as conn:
+        with _db_pool.connect(DATABASE) as conn:
             c = conn.cursor()
             c.execute("SELECT prefs FROM user_preferences WHERE username=?", (username,))
             row = c.fetchone()
-        if row and row[0]:
-            stored = _json.loads(row[0])
-            prefs = dict(_DEFAULT_PREFS)
-            prefs.update({k: v for k, v in stored.items() if k in _DEFAULT_PREFS})
-            return prefs
-        return dict(_DEFAULT_PREFS)
     except Exception:
         return dict(_DEFAULT_PREFS)
+    prefs = _decode_prefs(row[0] if row else None)
+    _prefs_cache.put(username, prefs)
+    return _copy_prefs(prefs)
 
 
 def save_user_prefs(username, prefs):
@@ -664,38 +916,190 @@ def save_user_prefs(username, prefs):
     do partial updates.
     """
     try:
-        existing = get_user_prefs(username)
-        merged = dict(existing)
-        merged.update({k: v for k, v in prefs.items() if k in _DEFAULT_PREFS})
-        with sqlite3.connect(DATABASE, timeout=10) as conn:
+        with _db_pool.connect(DATABASE) as conn:
+            # Read and write under one write lock so concurrent partial
+            # updates cannot drop each other's keys.
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
             c = conn.cursor()
+            c.execute("SELECT prefs FROM user_preferences WHERE username=?", (username,))
+            row = c.fetchone()
+            merged = _decode_prefs(row[0] if row else None)
+            merged.update({k: v for k, v in prefs.items() if k in _DEFAULT_PREFS})
             c.execute(
                 "INSERT OR REPLACE INTO user_preferences (username, prefs) VALUES (?, ?)",
                 (username, _json.dumps(merged))
             )
-            conn.commit()
     except sqlite3.OperationalError:
+        _prefs_cache.discard(username)
         # Table may not exist yet on very old installs — auto-heal
         init_db()
         save_user_prefs(username, prefs)
+        return
+    _prefs_cache.put(username, _copy_prefs(merged))
 
 
 cached_channels = []
-cached_epg = {}
+# Active programme-store generation of the current tuner (see utils/epg_store.py);
+# the programmes themselves live in EPG_DB, not in memory.
+_epg_generation = None
 
 # Track currently playing marker (server-side)
 CURRENTLY_PLAYING = None
 
+# ------------------- Data Generation / ETags -------------------
+# Bumped whenever tuner data or settings change (refresh, tuner switch,
+# settings save).  Per-user writes (login, preferences, playback logging)
+# leave it alone.  Cacheable responses derive their ETag from it,
+# plus a per-process token so a restart never answers 304 for stale content.
+_data_generation = 0
+_data_generation_lock = threading.Lock()
+_DATA_ETAG_TOKEN = uuid.uuid4().hex
+
+
+def bump_data_generation():
+    global _data_generation
+    with _data_generation_lock:
+        _data_generation += 1
+        return _data_generation
+
+
+def _data_etag(*parts):
+    """Weak ETag value for a response built from the current data generation and *parts*."""
+    # The tuner generation also moves on tuner edits made by other processes.
+    key = repr((_DATA_ETAG_TOKEN, _data_generation, get_tuner_generation()) + parts)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _etag_matches(etag):
+    return request.if_none_match.contains_weak(etag)
+
+
+def _with_etag(resp, etag, private=False):
+    if resp.status_code == 200:
+        resp.set_etag(etag, weak=True)
+        # Always revalidate; per-user pages must not sit in shared caches.
+        resp.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    return resp
+
+
+def _not_modified(etag, private=False):
+    resp = make_response('', 304)
+    resp.set_etag(etag, weak=True)
+    resp.headers['Cache-Control'] = 'private, no-cache' if private else 'no-cache'
+    return resp
+
+
+# Pushed state changes (guide generations, virtual-channel slots, QR
+# visibility) for /api/events; see utils/event_bus.py.
+from utils.event_bus import EventBus as _EventBus
+_event_bus = _EventBus()
+
+
+# ------------------- Response Compression -------------------
+# Buffered text responses (HTML, JSON, GeoJSON) of at least
+# COMPRESS_MIN_BYTES are gzip/brotli-compressed per Accept-Encoding; see
+# utils/compression.py.  Streams (SSE) and static files are left alone.
+from utils import compression as _compression
+
+COMPRESS_MIN_BYTES = 1024
+_compression_cache = _compression.CompressionCache()
+
+
+@app.after_request
+def _compress_response(resp):
+    if (resp.status_code != 200 or resp.direct_passthrough or resp.is_streamed
+            or 'Content-Encoding' in resp.headers
+            or not _compression.is_compressible(resp.mimetype)):
+        return resp
+    resp.vary.add('Accept-Encoding')
+    encoding = _compression.negotiate(request.accept_encodings)
+    if encoding is None:
+        return resp
+    body = resp.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return resp
+    route = request.url_rule.rule if request.url_rule else request.path
+    resp.set_data(_compression_cache.compress(route, body, encoding))
+    resp.headers['Content-Encoding'] = encoding
+    return resp
+
+
+# Responses with at least JSON_STREAM_MIN_ITEMS list entries are encoded
+# and sent JSON_STREAM_BATCH entries at a time (utils/json_stream.py).
+from utils.json_stream import iter_json_object as _iter_json_object
+
+JSON_STREAM_MIN_ITEMS = 200
+JSON_STREAM_BATCH = 100
+
+
+def _json_list_response(fields, key, items, count):
+    """JSON object of *fields* plus ``key: items``; streamed when *count* is large.
+
+    *items* may be a generator.  Both paths encode with the app's JSON
+    provider settings, so the body does not depend on *count*.  Streamed
+    bodies are gzipped on the fly when the client accepts it, since the
+    buffered compression hook skips them.
+    """
+    if count < JSON_STREAM_MIN_ITEMS:
+        return jsonify({**fields, key: list(items)})
+    chunks = _iter_json_object(fields, key, items, batch=JSON_STREAM_BATCH,
+                               sort_keys=app.json.sort_keys, ensure_ascii=app.json.ensure_ascii,
+                               default=app.json.default)
+    gzip_ok = request.accept_encodings.quality('gzip') > 0
+    resp = Response(_compression.gzip_stream(chunks) if gzip_ok else (c.encode('utf-8') for c in chunks),
+                    mimetype='application/json')
+    if gzip_ok:
+        resp.headers['Content-Encoding'] = 'gzip'
+    resp.vary.add('Accept-Encoding')
+    return resp
+
+
+def get_compression_stats():
+    """Per-route response compression stats (diagnostics)."""
+    return _compression_cache.stats()
+
+
+# ------------------- Static Asset Fingerprints -------------------
+# url_for('static', ...) appends ?v=<content hash>; requests carrying the
+# current hash are cacheable for a year.  See utils/static_assets.py.
+from utils.static_assets import AssetManifest as _AssetManifest
+
+STATIC_IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+_static_manifest = _AssetManifest(app.static_folder)
+
+
+@app.url_defaults
+def _fingerprint_static_url(endpoint, values):
+    if endpoint == 'static' and 'v' not in values:
+        version = _static_manifest.version(values.get('filename', ''))
+        if version:
+            values['v'] = version
+
+
+@app.after_request
+def _cache_fingerprinted_static(resp):
+    if request.endpoint == 'static' and resp.status_code in (200, 304):
+        version = request.args.get('v')
+        if version and version == _static_manifest.version(request.view_args.get('filename', '')):
+            resp.headers['Cache-Control'] = f'public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable'
+    return resp
+
 # ------------------- M3U Parsing -------------------
 def parse_m3u(m3u_url):
-    channels = []
     try:
         r = requests.get(m3u_url, timeout=10)
         r.raise_for_status()
         lines = r.text.splitlines()
     except:
-        return channels
-    
+        return []
+    return _channels_from_m3u_lines(lines)
+
+
+def _channels_from_m3u_lines(lines):
+    """Build the channel list from the lines of an M3U playlist."""
+    channels = []
+
     # Filter out empty lines and comments (except #EXTINF)
     non_empty_lines = [line.strip() for line in lines if line.strip()]
     
@@ -750,7 +1154,58 @@ def parse_m3u(m3u_url):
     return channels
 
 # ------------------- XMLTV EPG Parsing -------------------
-def parse_epg(xml_url):
+from utils.xmltv import ChunkReader as _XmltvChunkReader, iter_epg_elements as _iter_epg_elements
+from utils.xmltv import CHUNK_SIZE as _XMLTV_CHUNK_SIZE, decompressed_chunks as _decompressed_chunks
+from utils.xmltv import parse_time as _xmltv_time
+from utils.programme import Interner as _Interner, Programme as _Programme
+from utils.programme import memory_report as _programme_memory_report
+
+
+def _programme_from_element(prog, interner):
+    """Convert one ``<programme>`` element into a compact Programme record.
+
+    Titles, icons and category/colour tuples go through *interner* so the
+    many repeats in a guide share one object.
+    """
+    start_str = prog.attrib.get('start')
+    stop_str = prog.attrib.get('stop')
+
+    title_el = prog.find('title')
+    desc_el = prog.find('desc')
+    icon_el = prog.find('icon')
+    return _Programme(
+        interner.text(title_el.text if title_el is not None else ''),
+        (desc_el.text or '') if desc_el is not None else '',
+        _xmltv_time(start_str),
+        _xmltv_time(stop_str),
+        interner.text(icon_el.attrib.get('src', '') if icon_el is not None else ''),
+        interner.strings(
+            (cat.text or '').strip()
+            for cat in prog.findall('category')
+            if (cat.text or '').strip()
+        ),
+        interner.strings(
+            (el.text or '').strip()
+            for el in (prog.findall('colour') + prog.findall('color'))
+            if (el.text or '').strip()
+        ),
+    )
+
+
+def parse_epg(xml_url, channel_ids=None, window=None):
+    """Download and parse an XMLTV guide into ``{channel_id: [programme, ...]}``.
+
+    The response is read incrementally (``stream=True``) and fed to
+    ``ET.iterparse``; each ``<channel>``/``<programme>`` element is converted
+    and then cleared, so peak memory tracks the parsed output rather than the
+    size of the XML document.  gzip/xz/bz2 feeds (``.xml.gz`` etc.) are
+    detected by magic bytes or ``Content-Encoding`` and decompressed chunk by
+    chunk on the way in.  A failed download or malformed document yields an
+    empty dict, as before.
+
+    *channel_ids* and *window* filter programmes before they are converted;
+    see _programmes_from_chunks.
+    """
     programs = {}
     
     # ✅ Handle when user pastes same .m3u for XML
@@ -758,78 +1213,167 @@ def parse_epg(xml_url):
         return programs  # empty, fallback will fill it later
         
     try:
-        r = requests.get(xml_url, timeout=15)
-        r.raise_for_status()
-        root = ET.fromstring(r.content)
-    except:
+        r = requests.get(xml_url, timeout=15, stream=True)
+    except Exception:
         return programs
+    try:
+        r.raise_for_status()
+        return _programmes_from_chunks(r.iter_content(chunk_size=_XMLTV_CHUNK_SIZE),
+                                       r.headers.get('Content-Encoding'),
+                                       channel_ids=channel_ids, window=window)
+    except Exception as e:
+        logging.warning("parse_epg: could not parse XMLTV from %s: %s", xml_url, e)
+        return {}
+    finally:
+        r.close()
 
-    for channel in root.findall('channel'):
-        cid = channel.attrib.get('id')
-        programs[cid] = []
 
-    for prog in root.findall('programme'):
-        cid = prog.attrib.get('channel')
-        start_str = prog.attrib.get('start')
-        stop_str = prog.attrib.get('stop')
+def _programmes_from_chunks(chunks, content_encoding=None, channel_ids=None, window=None):
+    """Parse XMLTV bytes *chunks* into ``{channel_id: [programme, ...]}``.
 
-        start = None
-        stop = None
-        try:
-            start = datetime.strptime(start_str[:14], '%Y%m%d%H%M%S').replace(tzinfo=timezone.utc)
-        except:
-            pass
-        if stop_str:
-            try:
-                stop = datetime.strptime(stop_str[:14], '%Y%m%d%H%M%S').replace(tzinfo=timezone.utc)
-            except:
-                stop = None
-
-        title = prog.find('title').text if prog.find('title') is not None else ''
-        desc = prog.find('desc').text if prog.find('desc') is not None else ''
-        icon_el = prog.find('icon')
-        icon = icon_el.attrib.get('src', '') if icon_el is not None else ''
-        categories = [
-            (cat.text or '').strip()
-            for cat in prog.findall('category')
-            if (cat.text or '').strip()
-        ]
-        colors = [
-            (el.text or '').strip()
-            for el in (prog.findall('colour') + prog.findall('color'))
-            if (el.text or '').strip()
-        ]
+    With *channel_ids*, channels and programmes for other ids are skipped.
+    With *window* ``(lo, hi)`` (either bound may be None), programmes that
+    end before ``lo`` or start at/after ``hi`` are skipped.  Both checks only
+    look at element attributes, before any programme record is created.
 
-        if cid not in programs:
-            programs[cid] = []
-        programs[cid].append({
-            'title': title,
-            'desc': desc,
-            'start': start,
-            'stop': stop,
-            'icon': icon,
-            'categories': categories,
-            'colors': colors,
-        })
+    Raises ``ET.ParseError`` for malformed documents.
+    """
+    lo, hi = window or (None, None)
+    lo_ts = int(lo.timestamp()) if lo else None
+    hi_ts = int(hi.timestamp()) if hi else None
+
+    programs = {}
+    interner = _Interner()
+    reader = _XmltvChunkReader(_decompressed_chunks(chunks, content_encoding))
+    for elem in _iter_epg_elements(reader):
+        if elem.tag == 'channel':
+            cid = elem.attrib.get('id')
+            if channel_ids is None or cid in channel_ids:
+                programs.setdefault(cid, [])
+            continue
+        cid = elem.attrib.get('channel')
+        if channel_ids is not None and cid not in channel_ids:
+            continue
+        if hi_ts is not None:
+            start_ts = _xmltv_time(elem.attrib.get('start'))
+            if start_ts is not None and start_ts >= hi_ts:
+                continue
+        if lo_ts is not None:
+            stop_ts = _xmltv_time(elem.attrib.get('stop'))
+            if stop_ts is not None and stop_ts <= lo_ts:
+                continue
+        programs.setdefault(cid, []).append(_programme_from_element(elem, interner))
     return programs
 
 # ------------------- EPG Fallback Helper -------------------
 def apply_epg_fallback(channels, epg):
-    """Ensure each channel has at least one program entry, even if missing in XML."""
+    """Ensure each channel has at least one program entry, even if missing in XML.
+
+    Every channel without data shares one placeholder list, and playlist
+    entries with the same tvg_id share that id's programme list.
+    """
+    placeholder = [_Programme('No Guide Data Available')]
     for ch in channels:
         tvg_id = ch.get('tvg_id')
         if not tvg_id:
             continue
         if tvg_id not in epg or not epg[tvg_id]:
-            epg[tvg_id] = [{
-                'title': 'No Guide Data Available',
-                'desc': '',
-                'start': None,
-                'stop': None
-            }]
+            epg[tvg_id] = placeholder
     return epg
 
 
+# ------------------- EPG Store -------------------
+from utils import epg_store as _epg_store
+from utils import feed_cache as _feed_cache
+from utils.guide_delta import GuideDeltaLog as _GuideDeltaLog
+
+# Per-channel changes of the last few generations of each tuner (/api/guide/delta).
+GUIDE_DELTA_HISTORY = 5
+_guide_delta_log = _GuideDeltaLog(max_deltas=GUIDE_DELTA_HISTORY)
+
+
+def publish_tuner_data(tuner_name, channels, epg, meta=None):
+    """Write a freshly loaded guide to the programme store.
+
+    The new generation replaces the tuner's previous one atomically.  When
+    *tuner_name* is the active tuner, the in-memory channel list and the
+    generation pointer are swapped as well.  *meta* is stored with the
+    generation (e.g. the feed hashes from load_tuner_data_if_changed).
+    """
+    global cached_channels, _epg_generation
+    generation = _epg_store.publish_generation(EPG_DB, tuner_name, channels, epg, meta=meta)
+    try:
+        ingested_at = datetime.fromisoformat((meta or {})["ingested_at"])
+    except (KeyError, TypeError, ValueError):
+        ingested_at = None
+    window = tuple(int(t.timestamp()) if t is not None else None
+                   for t in epg_ingest_window(tuner_name, ingested_at))
+    _guide_delta_log.record(tuner_name, generation["id"], channels, epg, window=window)
+    if tuner_name == get_current_tuner():
+        cached_channels, _epg_generation = channels, generation
+        bump_data_generation()
+        _event_bus.publish('guide', {'tuner': tuner_name, 'generation': generation['id']})
+    return generation
+
+
+def restore_tuner_data(tuner_name):
+    """Activate the stored guide of *tuner_name* without fetching anything.
+
+    Returns True when a stored generation was found.
+    """
+    global cached_channels, _epg_generation
+    generation = _epg_store.get_active_generation(EPG_DB, tuner_name)
+    if not generation:
+        return False
+    cached_channels = generation.pop("channels")
+    _epg_generation = generation
+    bump_data_generation()
+    _event_bus.publish('guide', {'tuner': tuner_name, 'generation': generation['id']})
+    return True
+
+
+def get_epg_window(start, end, include_undated=False, channel_ids=None):
+    """Return ``{tvg_id: [programme, ...]}`` for the active tuner in ``[start, end)``."""
+    if not _epg_generation:
+        return {}
+    return _epg_store.programmes_in_window(EPG_DB, _epg_generation, start, end,
+                                           include_undated=include_undated,
+                                           channel_ids=channel_ids)
+
+
+def get_epg_stats():
+    """Channel / programme counts of the active guide generation."""
+    return _epg_store.generation_stats(EPG_DB, _epg_generation)
+
+
+def get_epg_memory_report():
+    """Bytes per programme, legacy dicts vs compact records, over a sample of the active guide."""
+    return _programme_memory_report(_epg_store.sample_programmes(EPG_DB, _epg_generation))
+
+
+# tvg_id / channel-number lookups over cached_channels.  Rebuilt lazily
+# whenever the list object is swapped (refresh, tuner switch, restore).
+_channel_index = (None, {})
+
+
+def find_channel(key):
+    """Return the first cached channel whose tvg_id or number is *key*."""
+    global _channel_index
+    channels = cached_channels
+    if _channel_index[0] is not channels:
+        # Built in list order with the first match winning, like the linear
+        # scan it replaces, so an id that equals another channel's number
+        # resolves to whichever channel comes first.
+        index = {}
+        for ch in channels:
+            if ch.get('tvg_id') is not None:
+                index.setdefault(ch['tvg_id'], ch)
+            if ch.get('number') is not None:
+                index.setdefault(str(ch['number']), ch)
+        _channel_index = (channels, index)
+    return _channel_index[1].get(str(key))
+
+
 # ------------------- Virtual Channels -------------------
 VIRTUAL_CHANNELS = [
     {
@@ -938,14 +1482,11 @@ def get_virtual_channel_settings():
     Defaults to False (disabled) when no setting has been persisted yet."""
     defaults = {ch['tvg_id']: False for ch in VIRTUAL_CHANNELS}
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for tvg_id in defaults:
-                key = f"virtual_channel.{tvg_id}.enabled"
-                c.execute("SELECT value FROM settings WHERE key=?", (key,))
-                row = c.fetchone()
-                if row is not None:
-                    defaults[tvg_id] = row[0] == "1"
+        stored = _settings.prefix("virtual_channel.")
+        for tvg_id in defaults:
+            value = stored.get(f"virtual_channel.{tvg_id}.enabled")
+            if value is not None:
+                defaults[tvg_id] = value == "1"
     except Exception:
         logging.exception("get_virtual_channel_settings failed, using defaults")
     return defaults
@@ -953,13 +1494,8 @@ def get_virtual_channel_settings():
 def save_virtual_channel_settings(settings_dict):
     """Persist virtual channel enabled states.  settings_dict maps tvg_id -> bool."""
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for tvg_id, enabled in settings_dict.items():
-                key = f"virtual_channel.{tvg_id}.enabled"
-                c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                          (key, "1" if enabled else "0"))
-            conn.commit()
+        _settings.set_many({f"virtual_channel.{tvg_id}.enabled": "1" if enabled else "0"
+                            for tvg_id, enabled in settings_dict.items()})
     except Exception:
         logging.exception("save_virtual_channel_settings failed")
         raise
@@ -971,13 +1507,10 @@ def get_overlay_appearance():
     """Return overlay appearance settings: text_color, bg_color (hex or ''), test_text (str)."""
     result = {'text_color': '', 'bg_color': '', 'test_text': ''}
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for key in _OVERLAY_APPEARANCE_KEYS:
-                c.execute("SELECT value FROM settings WHERE key=?", (f"overlay.{key}",))
-                row = c.fetchone()
-                if row is not None:
-                    result[key] = row[0]
+        stored = _settings.get_many(f"overlay.{key}" for key in _OVERLAY_APPEARANCE_KEYS)
+        for key in _OVERLAY_APPEARANCE_KEYS:
+            if f"overlay.{key}" in stored:
+                result[key] = stored[f"overlay.{key}"]
     except Exception:
         logging.exception("get_overlay_appearance failed, using defaults")
     return result
@@ -992,12 +1525,7 @@ def save_overlay_appearance(appearance_dict):
                 raise ValueError(f"Invalid color value for {key}: {val!r}")
         cleaned[key] = val
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for key, value in cleaned.items():
-                c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                          (f"overlay.{key}", value))
-            conn.commit()
+        _settings.set_many({f"overlay.{key}": value for key, value in cleaned.items()})
     except ValueError:
         raise
     except Exception:
@@ -1009,13 +1537,10 @@ def get_channel_overlay_appearance(tvg_id):
     Keys stored as overlay.{tvg_id}.text_color etc. in the settings table."""
     result = {'text_color': '', 'bg_color': '', 'test_text': ''}
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for key in _OVERLAY_APPEARANCE_KEYS:
-                c.execute("SELECT value FROM settings WHERE key=?", (f"overlay.{tvg_id}.{key}",))
-                row = c.fetchone()
-                if row is not None:
-                    result[key] = row[0]
+        stored = _settings.get_many(f"overlay.{tvg_id}.{key}" for key in _OVERLAY_APPEARANCE_KEYS)
+        for key in _OVERLAY_APPEARANCE_KEYS:
+            if f"overlay.{tvg_id}.{key}" in stored:
+                result[key] = stored[f"overlay.{tvg_id}.{key}"]
     except Exception:
         logging.exception("get_channel_overlay_appearance failed, using defaults")
     return result
@@ -1030,12 +1555,7 @@ def save_channel_overlay_appearance(tvg_id, appearance_dict):
                 raise ValueError(f"Invalid color value for {key}: {val!r}")
         cleaned[key] = val
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for key, value in cleaned.items():
-                c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                          (f"overlay.{tvg_id}.{key}", value))
-            conn.commit()
+        _settings.set_many({f"overlay.{tvg_id}.{key}": value for key, value in cleaned.items()})
     except ValueError:
         raise
     except Exception:
@@ -1054,19 +1574,11 @@ def get_news_feed_urls():
     """
     urls = []
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for i in range(1, 7):
-                c.execute("SELECT value FROM settings WHERE key=?", (f'news.rss_url_{i}',))
-                row = c.fetchone()
-                if row and row[0]:
-                    urls.append(row[0])
-            # Backward compat: if no numbered keys present, check the legacy single key
-            if not urls:
-                c.execute("SELECT value FROM settings WHERE key='news.rss_url'")
-                row = c.fetchone()
-                if row and row[0]:
-                    urls.append(row[0])
+        stored = _settings.prefix('news.')
+        urls = [stored[f'news.rss_url_{i}'] for i in range(1, 7) if stored.get(f'news.rss_url_{i}')]
+        # Backward compat: if no numbered keys present, check the legacy single key
+        if not urls and stored.get('news.rss_url'):
+            urls.append(stored['news.rss_url'])
     except Exception:
         logging.exception("get_news_feed_urls failed")
     return urls
@@ -1093,12 +1605,7 @@ def save_news_feed_urls(urls):
     while len(validated) < 6:
         validated.append('')
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for i, url in enumerate(validated, 1):
-                c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                          (f'news.rss_url_{i}', url))
-            conn.commit()
+        _settings.set_many({f'news.rss_url_{i}': url for i, url in enumerate(validated, 1)})
     except Exception:
         logging.exception("save_news_feed_urls failed")
         raise
@@ -1139,12 +1646,9 @@ _SPORTS_LEAGUE_BY_ID = {lg['id']: lg for lg in SPORTS_LEAGUES}
 def get_sports_mode():
     """Return the sports channel display mode: 'scores' (default) or 'rss'."""
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key='sports.mode'")
-            row = c.fetchone()
-            if row and row[0] in ('rss', 'scores'):
-                return row[0]
+        mode = _settings.get('sports.mode')
+        if mode in ('rss', 'scores'):
+            return mode
     except Exception:
         logging.exception("get_sports_mode failed")
     return 'scores'
@@ -1155,10 +1659,7 @@ def save_sports_mode(mode):
     if mode not in ('rss', 'scores'):
         raise ValueError(f"Invalid sports mode: {mode!r}")
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('sports.mode', ?)", (mode,))
-            conn.commit()
+        _settings.set('sports.mode', mode)
     except Exception:
         logging.exception("save_sports_mode failed")
         raise
@@ -1171,13 +1672,8 @@ def get_sports_feed_urls():
     """
     urls = []
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for i in range(1, 7):
-                c.execute("SELECT value FROM settings WHERE key=?", (f'sports.rss_url_{i}',))
-                row = c.fetchone()
-                if row and row[0]:
-                    urls.append(row[0])
+        stored = _settings.prefix('sports.rss_url_')
+        urls = [stored[f'sports.rss_url_{i}'] for i in range(1, 7) if stored.get(f'sports.rss_url_{i}')]
     except Exception:
         logging.exception("get_sports_feed_urls failed")
     return urls
@@ -1203,12 +1699,7 @@ def save_sports_feed_urls(urls):
     while len(validated) < 6:
         validated.append('')
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for i, url in enumerate(validated, 1):
-                c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                          (f'sports.rss_url_{i}', url))
-            conn.commit()
+        _settings.set_many({f'sports.rss_url_{i}': url for i, url in enumerate(validated, 1)})
     except Exception:
         logging.exception("save_sports_feed_urls failed")
         raise
@@ -1221,12 +1712,9 @@ def get_sports_external_data_enabled():
     user explicitly opts in and configures a source.
     """
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key='sports.external_data_enabled'")
-            row = c.fetchone()
-            if row is not None:
-                return row[0] == '1'
+        value = _settings.get('sports.external_data_enabled')
+        if value is not None:
+            return value == '1'
     except Exception:
         logging.exception("get_sports_external_data_enabled failed")
     return False
@@ -1235,11 +1723,7 @@ def get_sports_external_data_enabled():
 def save_sports_external_data_enabled(enabled):
     """Persist whether external sports data fetching is enabled."""
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES "
-                      "('sports.external_data_enabled', ?)", ('1' if enabled else '0',))
-            conn.commit()
+        _settings.set('sports.external_data_enabled', '1' if enabled else '0')
     except Exception:
         logging.exception("save_sports_external_data_enabled failed")
         raise
@@ -1252,12 +1736,9 @@ def get_sports_scores_base_url():
     users must supply their own compatible endpoint.
     """
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key='sports.scores_base_url'")
-            row = c.fetchone()
-            if row and row[0]:
-                return row[0].rstrip('/')
+        url = _settings.get('sports.scores_base_url')
+        if url:
+            return url.rstrip('/')
     except Exception:
         logging.exception("get_sports_scores_base_url failed")
     return ''
@@ -1275,11 +1756,7 @@ def save_sports_scores_base_url(url):
         if parsed.scheme not in ('http', 'https') or not parsed.netloc:
             raise ValueError(f"Invalid scores base URL: {url!r}. Must be an http or https URL.")
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES "
-                      "('sports.scores_base_url', ?)", (url,))
-            conn.commit()
+        _settings.set('sports.scores_base_url', url)
     except Exception:
         logging.exception("save_sports_scores_base_url failed")
         raise
@@ -1300,13 +1777,11 @@ def get_sports_config():
     scores_base_url = get_sports_scores_base_url()
     league_defaults = {lg['id']: False for lg in SPORTS_LEAGUES}
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for lg_id in league_defaults:
-                c.execute("SELECT value FROM settings WHERE key=?", (f'sports.league.{lg_id}',))
-                row = c.fetchone()
-                if row is not None:
-                    league_defaults[lg_id] = row[0] == '1'
+        stored = _settings.prefix('sports.league.')
+        for lg_id in league_defaults:
+            value = stored.get(f'sports.league.{lg_id}')
+            if value is not None:
+                league_defaults[lg_id] = value == '1'
     except Exception:
         logging.exception("get_sports_config failed")
     return {
@@ -1321,14 +1796,8 @@ def save_sports_config(cfg):
     """Persist sports league enabled states.  cfg maps league_id -> bool."""
     valid_ids = {lg['id'] for lg in SPORTS_LEAGUES}
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for lg_id, enabled in cfg.items():
-                if lg_id not in valid_ids:
-                    continue
-                c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                          (f'sports.league.{lg_id}', '1' if enabled else '0'))
-            conn.commit()
+        _settings.set_many({f'sports.league.{lg_id}': '1' if enabled else '0'
+                            for lg_id, enabled in cfg.items() if lg_id in valid_ids})
     except Exception:
         logging.exception("save_sports_config failed")
         raise
@@ -1432,12 +1901,9 @@ _NASA_APOD_CACHE: dict = {}
 def get_nasa_interval():
     """Return the NASA image-display interval in minutes: '15' or '30'. Default '15'."""
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key='nasa.interval'")
-            row = c.fetchone()
-            if row and row[0] in ('15', '30'):
-                return row[0]
+        interval = _settings.get('nasa.interval')
+        if interval in ('15', '30'):
+            return interval
     except Exception:
         logging.exception("get_nasa_interval failed")
     return '15'
@@ -1448,12 +1914,7 @@ def save_nasa_interval(interval):
     if interval not in ('15', '30'):
         raise ValueError(f"Invalid NASA interval: {interval!r}")
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            conn.execute(
-                "INSERT OR REPLACE INTO settings (key, value) VALUES ('nasa.interval', ?)",
-                (interval,)
-            )
-            conn.commit()
+        _settings.set('nasa.interval', interval)
     except Exception:
         logging.exception("save_nasa_interval failed")
 
@@ -1461,12 +1922,9 @@ def save_nasa_interval(interval):
 def get_nasa_api_key():
     """Return the configured NASA API key, or 'DEMO_KEY' as default."""
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key='nasa.api_key'")
-            row = c.fetchone()
-            if row and row[0]:
-                return row[0].strip()
+        api_key = _settings.get('nasa.api_key')
+        if api_key:
+            return api_key.strip()
     except Exception:
         logging.exception("get_nasa_api_key failed")
     return 'DEMO_KEY'
@@ -1476,12 +1934,7 @@ def save_nasa_api_key(api_key):
     """Persist NASA API key (empty string resets to DEMO_KEY)."""
     api_key = (api_key or '').strip()
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            conn.execute(
-                "INSERT OR REPLACE INTO settings (key, value) VALUES ('nasa.api_key', ?)",
-                (api_key,)
-            )
-            conn.commit()
+        _settings.set('nasa.api_key', api_key)
     except Exception:
         logging.exception("save_nasa_api_key failed")
 
@@ -1498,14 +1951,11 @@ def get_nasa_image_count():
         30-min / 15 images → 120 s (2 min) per image
     """
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key='nasa.image_count'")
-            row = c.fetchone()
-            if row:
-                val = int(row[0])
-                if 1 <= val <= 15:
-                    return val
+        stored = _settings.get('nasa.image_count')
+        if stored is not None:
+            val = int(stored)
+            if 1 <= val <= 15:
+                return val
     except Exception:
         logging.exception("get_nasa_image_count failed")
     # Sensible defaults: 5 for 15-min mode, 10 for 30-min mode.  Since the
@@ -1521,15 +1971,10 @@ def save_nasa_image_count(count):
         if not (1 <= count <= 15):
             raise ValueError(f"Invalid NASA image count: {count!r}")
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            if count is None:
-                conn.execute("DELETE FROM settings WHERE key='nasa.image_count'")
-            else:
-                conn.execute(
-                    "INSERT OR REPLACE INTO settings (key, value) VALUES ('nasa.image_count', ?)",
-                    (str(count),)
-                )
-            conn.commit()
+        if count is None:
+            _settings.delete('nasa.image_count')
+        else:
+            _settings.set('nasa.image_count', str(count))
     except Exception:
         logging.exception("save_nasa_image_count failed")
 
@@ -1627,14 +2072,7 @@ _ON_THIS_DAY_SECONDS_PER_EVENT = 30
 def get_on_this_day_source_enabled(source_id):
     """Return True if the given On This Day source is enabled (default: True)."""
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key=?",
-                      (f'on_this_day.source.{source_id}.enabled',))
-            row = c.fetchone()
-            if row is None:
-                return True
-            return row[0] != '0'
+        return _settings.get(f'on_this_day.source.{source_id}.enabled') != '0'
     except Exception:
         logging.exception("get_on_this_day_source_enabled failed")
         return True
@@ -1646,13 +2084,7 @@ def save_on_this_day_source_enabled(source_id, enabled):
     if source_id not in valid_ids:
         raise ValueError(f"Unknown On This Day source: {source_id!r}")
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute(
-                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                (f'on_this_day.source.{source_id}.enabled', '1' if enabled else '0'),
-            )
-            conn.commit()
+        _settings.set(f'on_this_day.source.{source_id}.enabled', '1' if enabled else '0')
     except Exception:
         logging.exception("save_on_this_day_source_enabled failed")
         raise
@@ -1664,14 +2096,10 @@ def get_on_this_day_custom_events(source_id):
     Each event is a dict: {'year': str, 'text': str, 'category': str}.
     """
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key=?",
-                      (f'on_this_day.custom.{source_id}',))
-            row = c.fetchone()
-            if row is None:
-                return []
-            return _json.loads(row[0]) or []
+        stored = _settings.get(f'on_this_day.custom.{source_id}')
+        if stored is None:
+            return []
+        return _json.loads(stored) or []
     except Exception:
         logging.exception("get_on_this_day_custom_events failed")
         return []
@@ -1688,13 +2116,7 @@ def save_on_this_day_custom_events(source_id, events):
     if not isinstance(events, list):
         raise ValueError("events must be a list")
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute(
-                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                (f'on_this_day.custom.{source_id}', _json.dumps(events)),
-            )
-            conn.commit()
+        _settings.set(f'on_this_day.custom.{source_id}', _json.dumps(events))
     except Exception:
         logging.exception("save_on_this_day_custom_events failed")
         raise
@@ -1770,7 +2192,14 @@ def _fetch_on_this_day_from_wikipedia(api_type, month, day):
     return []
 
 
-def get_current_feed_state(feed_count):
+def _news_feed_slot(feed_count, now_ts):
+    """Return ``(time_slot, feed_index, elapsed_in_slot_s, feed_duration_s)`` at *now_ts*."""
+    feed_duration_s = (30 * 60) / feed_count
+    time_slot = int(now_ts / feed_duration_s)
+    return time_slot, time_slot % feed_count, now_ts % feed_duration_s, feed_duration_s
+
+
+def get_current_feed_state(feed_count, now_ts=None):
     """Return ``(feed_index, ms_until_next_feed, elapsed_in_slot_ms)`` driven entirely by wall-clock time.
 
     The 30-minute block is divided equally across feeds.  All clients receive
@@ -1785,11 +2214,8 @@ def get_current_feed_state(feed_count):
     """
     if feed_count <= 0:
         return 0, 5 * 60 * 1000, 0
-    feed_duration_s = (30 * 60) / feed_count
-    now = time.time()
-    time_slot = int(now / feed_duration_s)
-    feed_index = time_slot % feed_count
-    elapsed_in_slot_s = now % feed_duration_s
+    _, feed_index, elapsed_in_slot_s, feed_duration_s = _news_feed_slot(
+        feed_count, time.time() if now_ts is None else now_ts)
     elapsed_in_slot_ms = int(elapsed_in_slot_s * 1000)
     remaining_ms = int((feed_duration_s - elapsed_in_slot_s) * 1000)
     # Clamp to at least 1 s so clients never schedule a zero-delay reload
@@ -1816,13 +2242,10 @@ def get_weather_config():
               'seconds_per_segment': str(_WEATHER_SECONDS_PER_SEGMENT_DEFAULT),
               'bg_condition_override': ''}
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for key in _WEATHER_CONFIG_KEYS:
-                c.execute("SELECT value FROM settings WHERE key=?", (f"weather.{key}",))
-                row = c.fetchone()
-                if row is not None:
-                    result[key] = row[0]
+        stored = _settings.prefix("weather.")
+        for key in _WEATHER_CONFIG_KEYS:
+            if f"weather.{key}" in stored:
+                result[key] = stored[f"weather.{key}"]
     except Exception:
         logging.exception("get_weather_config failed, using defaults")
     return result
@@ -1852,12 +2275,7 @@ def save_weather_config(config_dict):
                     f"seconds_per_segment must be between 30 and 600, got {sps}.")
         cleaned[key] = val
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for key, value in cleaned.items():
-                c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                          (f"weather.{key}", value))
-            conn.commit()
+        _settings.set_many({f"weather.{key}": value for key, value in cleaned.items()})
     except ValueError:
         raise
     except Exception:
@@ -1942,7 +2360,7 @@ def _generate_demo_incidents(city_name, rng, red_pct):
 
 
 def _init_traffic_demo_db(conn):
-    """Create and seed the traffic_demo_cities table (called from init_tuners_db)."""
+    """Create and seed the traffic_demo_cities table (a tuners.db migration; does not commit)."""
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS traffic_demo_cities
                  (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -1955,7 +2373,6 @@ def _init_traffic_demo_db(conn):
                   weight INTEGER DEFAULT 1,
                   created_at TEXT,
                   updated_at TEXT)''')
-    conn.commit()
     c.execute("SELECT COUNT(*) FROM traffic_demo_cities")
     if c.fetchone()[0] == 0:
         now_iso = datetime.now(timezone.utc).isoformat()
@@ -1967,7 +2384,6 @@ def _init_traffic_demo_db(conn):
                 (city['name'], city['state'], city['lat'], city['lon'],
                  city['population'], now_iso, now_iso)
             )
-        conn.commit()
 
 
 def get_traffic_demo_config():
@@ -1979,13 +2395,10 @@ def get_traffic_demo_config():
         'rotation_seconds': '120',
     }
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for key in defaults:
-                c.execute("SELECT value FROM settings WHERE key=?", (f"traffic_demo.{key}",))
-                row = c.fetchone()
-                if row is not None:
-                    defaults[key] = row[0]
+        stored = _settings.prefix("traffic_demo.")
+        for key in defaults:
+            if f"traffic_demo.{key}" in stored:
+                defaults[key] = stored[f"traffic_demo.{key}"]
     except Exception:
         logging.exception("get_traffic_demo_config failed, using defaults")
     return defaults
@@ -2010,15 +2423,11 @@ def save_traffic_demo_config(cfg):
     except (TypeError, ValueError) as exc:
         raise ValueError(f"Invalid rotation_seconds: {exc}") from exc
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                      ('traffic_demo.mode', mode))
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                      ('traffic_demo.pack_size', str(pack_size)))
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                      ('traffic_demo.rotation_seconds', str(rotation_secs)))
-            conn.commit()
+        _settings.set_many({
+            'traffic_demo.mode': mode,
+            'traffic_demo.pack_size': str(pack_size),
+            'traffic_demo.rotation_seconds': str(rotation_secs),
+        })
     except ValueError:
         raise
     except Exception:
@@ -2029,7 +2438,7 @@ def save_traffic_demo_config(cfg):
 def get_traffic_demo_cities():
     """Return all rows from traffic_demo_cities ordered by population desc."""
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
+        with _db_pool.connect(TUNER_DB) as conn:
             c = conn.cursor()
             c.execute(
                 "SELECT id, name, state, lat, lon, population, enabled, weight "
@@ -2050,13 +2459,12 @@ def save_traffic_demo_city(city_id, enabled, weight=1):
     """Update enabled flag and weight for a single city row."""
     try:
         now_iso = datetime.now(timezone.utc).isoformat()
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
+        with _db_pool.connect(TUNER_DB) as conn:
             c = conn.cursor()
             c.execute(
                 "UPDATE traffic_demo_cities SET enabled=?, weight=?, updated_at=? WHERE id=?",
                 (1 if enabled else 0, max(1, int(weight)), now_iso, int(city_id))
             )
-            conn.commit()
     except Exception:
         logging.exception("save_traffic_demo_city failed for id=%s", city_id)
         raise
@@ -2066,11 +2474,10 @@ def set_all_traffic_demo_cities_enabled(enabled):
     """Enable or disable every city in one shot."""
     try:
         now_iso = datetime.now(timezone.utc).isoformat()
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
+        with _db_pool.connect(TUNER_DB) as conn:
             c = conn.cursor()
             c.execute("UPDATE traffic_demo_cities SET enabled=?, updated_at=?",
                       (1 if enabled else 0, now_iso))
-            conn.commit()
     except Exception:
         logging.exception("set_all_traffic_demo_cities_enabled failed")
         raise
@@ -2086,11 +2493,7 @@ def pick_random_traffic_demo_pack(pack_size=10):
     chosen = _rand.sample(cities, min(pack_size, len(cities)))
     pack_ids = [c['id'] for c in chosen]
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                      ('traffic_demo.pack', _json.dumps(pack_ids)))
-            conn.commit()
+        _settings.set('traffic_demo.pack', _json.dumps(pack_ids))
     except Exception:
         logging.exception("pick_random_traffic_demo_pack failed")
     return chosen
@@ -2223,7 +2626,7 @@ def add_traffic_demo_city(name, state, lat, lon, population):
 
     now_iso = datetime.now(timezone.utc).isoformat()
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
+        with _db_pool.connect(TUNER_DB) as conn:
             c = conn.cursor()
             c.execute(
                 "INSERT INTO traffic_demo_cities "
@@ -2231,7 +2634,6 @@ def add_traffic_demo_city(name, state, lat, lon, population):
                 "VALUES (?, ?, ?, ?, ?, 1, 1, ?, ?)",
                 (name, state, lat, lon, population, now_iso, now_iso),
             )
-            conn.commit()
             new_id = c.lastrowid
     except Exception:
         logging.exception("add_traffic_demo_city failed for name=%r", name)
@@ -2266,10 +2668,9 @@ def delete_traffic_demo_city(city_id):
 
     # Remove DB row
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
+        with _db_pool.connect(TUNER_DB) as conn:
             c = conn.cursor()
             c.execute("DELETE FROM traffic_demo_cities WHERE id=?", (int(city_id),))
-            conn.commit()
     except Exception:
         logging.exception("delete_traffic_demo_city: DB delete failed for id=%s", city_id)
         raise
@@ -2384,6 +2785,13 @@ def _get_congestion_distribution(hour, is_weekend=False):
             return 75, 18, 7
 
 
+def _traffic_rotation_slot(now_ts=None):
+    """Return ``(time_slot, seconds_until_next)`` of the traffic demo city rotation."""
+    now_ts = time.time() if now_ts is None else now_ts
+    rotation_seconds = max(30, int(get_traffic_demo_config().get('rotation_seconds', 120)))
+    return int(now_ts // rotation_seconds), rotation_seconds - (now_ts % rotation_seconds)
+
+
 def _build_traffic_demo_payload():
     """Build the demo traffic payload with deterministic city rotation and
     simulated congestion segments.  Results are cached per rotation slot so
@@ -2393,10 +2801,7 @@ def _build_traffic_demo_payload():
 
     demo_cfg = get_traffic_demo_config()
     mode = demo_cfg.get('mode', 'admin_rotation')
-    rotation_seconds = max(30, int(demo_cfg.get('rotation_seconds', 120)))
-
-    now_ts = time.time()
-    time_slot = int(now_ts // rotation_seconds)
+    time_slot, _ = _traffic_rotation_slot()
 
     all_cities = get_traffic_demo_cities()
 
@@ -3045,12 +3450,7 @@ def _prewarm_basemaps() -> None:
 def get_channel_music_file(tvg_id):
     """Return the selected audio filename (basename only) for a virtual channel, or ''."""
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key=?",
-                      (f"overlay.{tvg_id}.music_file",))
-            row = c.fetchone()
-            return row[0] if row else ''
+        return _settings.get(f"overlay.{tvg_id}.music_file", '')
     except Exception:
         logging.exception("get_channel_music_file failed")
         return ''
@@ -3070,11 +3470,7 @@ def save_channel_music_file(tvg_id, filename):
         if not os.path.isfile(target):
             raise ValueError(f"Audio file not found: {safe!r}")
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                      (f"overlay.{tvg_id}.music_file", filename))
-            conn.commit()
+        _settings.set(f"overlay.{tvg_id}.music_file", filename)
     except ValueError:
         raise
     except Exception:
@@ -3125,11 +3521,7 @@ _ICON_PACK_LOGOS = {
 def get_use_icon_pack():
     """Return True if the icon pack is enabled for virtual channel logos."""
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key='virtual_channel.use_icon_pack'")
-            row = c.fetchone()
-            return row[0] == '1' if row else False
+        return _settings.get('virtual_channel.use_icon_pack') == '1'
     except Exception:
         logging.exception("get_use_icon_pack failed")
         return False
@@ -3138,11 +3530,7 @@ def get_use_icon_pack():
 def set_use_icon_pack(enabled):
     """Persist the icon pack preference (True = use icon pack, False = use default SVG logos)."""
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                      ('virtual_channel.use_icon_pack', '1' if enabled else '0'))
-            conn.commit()
+        _settings.set('virtual_channel.use_icon_pack', '1' if enabled else '0')
     except Exception:
         logging.exception("set_use_icon_pack failed")
         raise
@@ -3169,11 +3557,7 @@ def _resolve_channel_logo(tvg_id, default_logo, custom_filename, use_icon_pack):
 def get_channel_custom_logo(tvg_id):
     """Return the custom logo filename for a virtual channel, or '' if none is set."""
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key=?", (f"channel.{tvg_id}.logo",))
-            row = c.fetchone()
-            return row[0] if row else ''
+        return _settings.get(f"channel.{tvg_id}.logo", '')
     except Exception:
         logging.exception("get_channel_custom_logo failed")
         return ''
@@ -3197,11 +3581,7 @@ def save_channel_custom_logo(tvg_id, filename):
         if not os.path.isfile(target):
             raise ValueError(f"Logo file not found: {safe!r}")
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                      (f"channel.{tvg_id}.logo", filename))
-            conn.commit()
+        _settings.set(f"channel.{tvg_id}.logo", filename)
     except ValueError:
         raise
     except Exception:
@@ -3645,12 +4025,9 @@ def fetch_rss_headlines(feed_url, max_items=20):
 def get_virtual_channel_order():
     """Return the saved tvg_id order list, or None if not set."""
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key='virtual_channel.order'")
-            row = c.fetchone()
-            if row:
-                return _json.loads(row[0])
+        stored = _settings.get('virtual_channel.order')
+        if stored is not None:
+            return _json.loads(stored)
     except Exception:
         logging.exception("get_virtual_channel_order failed")
     return None
@@ -3670,23 +4047,18 @@ def get_channel_mix_config():
     """
     result = {'name': 'Channel Mix', 'channels': []}
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key='channel_mix.name'")
-            row = c.fetchone()
-            if row and row[0]:
-                result['name'] = row[0]
-            c.execute("SELECT value FROM settings WHERE key='channel_mix.channels'")
-            row = c.fetchone()
-            if row and row[0]:
-                channels = _json.loads(row[0])
-                valid = []
-                for entry in channels:
-                    if entry.get('tvg_id') in _CHANNEL_MIX_VALID_IDS:
-                        minutes = int(entry.get('duration_minutes', 120))
-                        minutes = max(1, min(minutes, 1440))
-                        valid.append({'tvg_id': entry['tvg_id'], 'duration_minutes': minutes})
-                result['channels'] = valid
+        stored = _settings.prefix('channel_mix.')
+        if stored.get('channel_mix.name'):
+            result['name'] = stored['channel_mix.name']
+        if stored.get('channel_mix.channels'):
+            channels = _json.loads(stored['channel_mix.channels'])
+            valid = []
+            for entry in channels:
+                if entry.get('tvg_id') in _CHANNEL_MIX_VALID_IDS:
+                    minutes = int(entry.get('duration_minutes', 120))
+                    minutes = max(1, min(minutes, 1440))
+                    valid.append({'tvg_id': entry['tvg_id'], 'duration_minutes': minutes})
+            result['channels'] = valid
     except Exception:
         logging.exception("get_channel_mix_config failed, using defaults")
     return result
@@ -3714,19 +4086,14 @@ def save_channel_mix_config(config):
             raise ValueError(f"duration_minutes must be 1–1440, got {minutes}")
         validated.append({'tvg_id': tvg_id, 'duration_minutes': minutes})
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('channel_mix.name', ?)", (name,))
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('channel_mix.channels', ?)",
-                      (_json.dumps(validated),))
-            conn.commit()
+        _settings.set_many({'channel_mix.name': name, 'channel_mix.channels': _json.dumps(validated)})
     except ValueError:
         raise
     except Exception:
         logging.exception("save_channel_mix_config failed")
         raise
 
-def _get_active_channel_mix_slot(channels):
+def _get_active_channel_mix_slot(channels, now_ts=None):
     """Return (active_tvg_id, seconds_remaining) for the channel mix based on wall-clock time.
 
     Uses Unix timestamp modulo the total cycle duration so all viewers are
@@ -3738,7 +4105,7 @@ def _get_active_channel_mix_slot(channels):
     total_seconds = sum(ch['duration_minutes'] * 60 for ch in channels)
     if total_seconds == 0:
         return None, 0
-    offset = int(time.time()) % total_seconds
+    offset = int(time.time() if now_ts is None else now_ts) % total_seconds
     elapsed = 0
     for ch in channels:
         slot_seconds = ch['duration_minutes'] * 60
@@ -3760,11 +4127,7 @@ def save_virtual_channel_order(order):
         without_mix.append('virtual.channel_mix')
     order = without_mix
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('virtual_channel.order', ?)",
-                      (_json.dumps(order),))
-            conn.commit()
+        _settings.set('virtual_channel.order', _json.dumps(order))
     except Exception:
         logging.exception("save_virtual_channel_order failed")
         raise
@@ -3861,11 +4224,11 @@ def login():
         user = get_user(username)
         if user and check_password_hash(user.password_hash, password):
             # Update last_login timestamp
-            with sqlite3.connect(DATABASE, timeout=10) as conn:
+            with _db_pool.connect(DATABASE) as conn:
                 c = conn.cursor()
                 c.execute('UPDATE users SET last_login=? WHERE username=?',
                           (datetime.now(timezone.utc).isoformat(), username))
-                conn.commit()
+            forget_user(username)
             
             login_user(user, remember=remember)
             log_event(username, "Logged in")
@@ -3916,6 +4279,7 @@ def revoke_user_sessions(username):
     session_key = f"user_session_{username}"
     if session_key in session:
         session.pop(session_key, None)
+    forget_user(username)
     log_event("admin", f"Revoked sessions for {username}")
 
 @app.route('/change_password', methods=['GET','POST'])
@@ -3927,11 +4291,11 @@ def change_password():
         new = request.form['new_password']
         user = get_user(current_user.username)
         if user and check_password_hash(user.password_hash, old):
-            with sqlite3.connect(DATABASE, timeout=10) as conn:
+            with _db_pool.connect(DATABASE) as conn:
                 c = conn.cursor()
                 c.execute('UPDATE users SET password=?, must_change_password=0 WHERE id=?',
                           (generate_password_hash(new), current_user.id))
-                conn.commit()
+            forget_user(current_user.username)
             log_event(current_user.username, "Changed password")
             flash("Password updated successfully.")
             return redirect(url_for('guide'))
@@ -3951,11 +4315,10 @@ def add_user_route():
         new_username = request.form['username']
         new_password = request.form['password']
         try:
-            with sqlite3.connect(DATABASE, timeout=10) as conn:
+            with _db_pool.connect(DATABASE) as conn:
                 c = conn.cursor()
                 c.execute('INSERT INTO users (username, password) VALUES (?, ?)',
                           (new_username, generate_password_hash(new_password)))
-                conn.commit()
             log_event(current_user.username, f"Added user {new_username}")
             flash(f"User {new_username} added successfully.")
             return redirect(url_for('guide'))
@@ -3978,15 +4341,15 @@ def delete_user():
             flash("You cannot delete the admin account.")
             return redirect(url_for('delete_user'))
 
-        with sqlite3.connect(DATABASE, timeout=10) as conn:
+        with _db_pool.connect(DATABASE) as conn:
             c = conn.cursor()
             c.execute('DELETE FROM users WHERE username=?', (del_username,))
-            conn.commit()
+        forget_user(del_username)
         log_event(current_user.username, f"Deleted user {del_username}")
         flash(f"User {del_username} deleted (if they existed).")
         return redirect(url_for('guide'))
 
-    with sqlite3.connect(DATABASE, timeout=10) as conn:
+    with _db_pool.connect(DATABASE) as conn:
         c = conn.cursor()
         c.execute('SELECT username FROM users WHERE username != "admin"')
         users = [row[0] for row in c.fetchall()]
@@ -4018,11 +4381,10 @@ def manage_users():
                 flash("Please provide both username and password.")
             else:
                 try:
-                    with sqlite3.connect(DATABASE, timeout=10) as conn:
+                    with _db_pool.connect(DATABASE) as conn:
                         c = conn.cursor()
                         c.execute('INSERT INTO users (username, password) VALUES (?, ?)',
                                   (username, generate_password_hash(password)))
-                        conn.commit()
                     log_event(current_user.username, f"Added user {username}")
                     flash(f"✅ User '{username}' added successfully.")
                 except sqlite3.IntegrityError:
@@ -4032,10 +4394,10 @@ def manage_users():
             if username == 'admin':
                 flash("❌ Cannot delete the admin account.")
             else:
-                with sqlite3.connect(DATABASE, timeout=10) as conn:
+                with _db_pool.connect(DATABASE) as conn:
                     c = conn.cursor()
                     c.execute('DELETE FROM users WHERE username=?', (username,))
-                    conn.commit()
+                forget_user(username)
                 log_event(current_user.username, f"Deleted user {username}")
                 flash(f"🗑 Deleted user '{username}'.")
 
@@ -4063,13 +4425,12 @@ def manage_users():
         elif action == 'assign_tuner':
             new_tuner = request.form.get('tuner_name', '').strip() or None
             # Fetch current assigned tuner before updating
-            with sqlite3.connect(DATABASE, timeout=10) as conn:
+            with _db_pool.connect(DATABASE) as conn:
                 c = conn.cursor()
                 c.execute('SELECT assigned_tuner FROM users WHERE username=?', (username,))
                 row = c.fetchone()
                 old_tuner = row[0] if row else None
                 c.execute('UPDATE users SET assigned_tuner=? WHERE username=?', (new_tuner, username))
-                conn.commit()
             # Clear auto-load channel when tuner assignment changes
             if new_tuner != old_tuner:
                 prefs = get_user_prefs(username)
@@ -4081,7 +4442,7 @@ def manage_users():
         return redirect(url_for('manage_users'))
 
     # ---- Build user list with prefs and channel_list ----
-    with sqlite3.connect(DATABASE, timeout=10) as conn:
+    with _db_pool.connect(DATABASE) as conn:
         c = conn.cursor()
         c.execute('SELECT username, last_login, assigned_tuner FROM users WHERE username != "admin"')
         rows = c.fetchall()
@@ -4151,9 +4512,8 @@ def set_tuner(name):
     set_current_tuner(name)
 
     # Refresh cached guide data (use load_tuner_data so combined tuners work).
-    global cached_channels, cached_epg
-    cached_channels, cached_epg = load_tuner_data(name)
-    cached_epg = apply_epg_fallback(cached_channels, cached_epg)
+    channels, epg = load_tuner_data(name)
+    publish_tuner_data(name, channels, apply_epg_fallback(channels, epg))
 
     log_event(current_user.username, f"Quick switched active tuner to {name}")
     flash(f"Active tuner switched to {name}", "success")
@@ -4388,10 +4748,9 @@ def change_tuner():
             flash(f"Active tuner switched to {new_tuner}")
 
             # ✅ Refresh cached guide data immediately (use load_tuner_data so combined tuners work)
-            global cached_channels, cached_epg
-            cached_channels, cached_epg = load_tuner_data(new_tuner)
+            channels, epg = load_tuner_data(new_tuner)
             # ✅ Apply “No Guide Data Available” fallback
-            cached_epg = apply_epg_fallback(cached_channels, cached_epg)
+            publish_tuner_data(new_tuner, channels, apply_epg_fallback(channels, epg))
 
         elif action == "update_urls":
             tuner = request.form["tuner"]
@@ -4459,6 +4818,24 @@ def change_tuner():
                     flash(str(e), "warning")
                     log_event(current_user.username, f"Failed to add tuner {name}: {str(e)}")
 
+        elif action == "update_epg_retention":
+            tuner = request.form.get("tuner", "")
+            lookback = request.form.get("epg_lookback_hours", "")
+            lookahead = request.form.get("epg_lookahead_hours", "")
+            valid = tuner in get_tuners()
+            for value, presets in ((lookback, EPG_LOOKBACK_PRESETS), (lookahead, EPG_LOOKAHEAD_PRESETS)):
+                if value != "" and (not value.isdigit() or int(value) not in presets):
+                    valid = False
+            if not valid:
+                flash("Invalid guide retention settings.", "warning")
+            else:
+                set_setting(f"epg_lookback_hours:{tuner}", lookback)
+                set_setting(f"epg_lookahead_hours:{tuner}", lookahead)
+                log_event(current_user.username,
+                          f"Updated guide retention for {tuner}: lookback={lookback or 'all'} "
+                          f"lookahead={lookahead or 'all'}")
+                flash(f"Guide retention for {tuner} updated. It applies from the next refresh.", "success")
+
         elif action == "update_auto_refresh":
             # Expect form fields: auto_refresh_enabled ('0' or '1') and auto_refresh_interval_hours (2/4/6/12/24)
             enabled = request.form.get("auto_refresh_enabled", "0")
@@ -4480,14 +4857,10 @@ def change_tuner():
             else:
                 # persist using existing settings table
                 try:
-                    with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-                        c = conn.cursor()
-                        c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", ("auto_refresh_enabled", "1" if enabled == "1" else "0"))
-                        if intval:
-                            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", ("auto_refresh_interval_hours", str(intval)))
-                        else:
-                            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", ("auto_refresh_interval_hours", ""))
-                        conn.commit()
+                    _settings.set_many({
+                        "auto_refresh_enabled": "1" if enabled == "1" else "0",
+                        "auto_refresh_interval_hours": str(intval) if intval else "",
+                    })
                 except Exception:
                     logging.exception("Failed to persist auto-refresh settings")
                     flash("Failed to save auto-refresh settings.", "warning")
@@ -4502,11 +4875,7 @@ def change_tuner():
     # read auto-refresh status for template display
     def _get_setting_inline(key, default=None):
         try:
-            with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-                c = conn.cursor()
-                c.execute("SELECT value FROM settings WHERE key=?", (key,))
-                row = c.fetchone()
-            return row[0] if row else default
+            return _settings.get(key, default)
         except Exception:
             return default
 
@@ -4529,6 +4898,11 @@ def change_tuner():
             sync_dt = ''
         tuner_sync_info[tname] = {'status': sync_status, 'last_sync': sync_dt}
 
+    epg_retention = {}
+    for tname in tuners:
+        lookback, lookahead = get_epg_retention(tname)
+        epg_retention[tname] = {'lookback': lookback, 'lookahead': lookahead}
+
     return render_template(
         "change_tuner.html",
         tuners=tuners.keys(),
@@ -4539,22 +4913,169 @@ def change_tuner():
         auto_refresh_interval_hours=auto_refresh_interval_hours,
         last_auto_refresh=last_auto_refresh,
         tuner_sync_info=tuner_sync_info,
+        epg_retention=epg_retention,
+        EPG_LOOKBACK_PRESETS=EPG_LOOKBACK_PRESETS,
+        EPG_LOOKAHEAD_PRESETS=EPG_LOOKAHEAD_PRESETS,
     )
 
 
 
+GUIDE_MIN_BLOCK_PX = 24  # narrowest programme block drawn in the grid
+GUIDE_PLACEHOLDER = 'No Guide Data Available'
+
+
+def _guide_rows(epg, grid_start, now):
+    """Precompute the programme blocks of each guide row.
+
+    *epg* is already clipped to the grid window; this turns every programme
+    into the values guide.html prints (pixel offset and width, "now" flag,
+    ISO times, joined categories/colours) so the template only loops and
+    prints.  Rows without data get a single placeholder block.
+    """
+    rows = {}
+    placeholder = [{'placeholder': True, 'title': GUIDE_PLACEHOLDER, 'left': 0, 'width': 60 * SCALE}]
+    for cid, progs in epg.items():
+        blocks = []
+        for prog in progs:
+            title = prog.get('title')
+            if title == GUIDE_PLACEHOLDER:
+                blocks.append(placeholder[0])
+                continue
+            start, stop = prog.get('start'), prog.get('stop')
+            if not (start and stop):
+                continue
+            width = (stop - start).total_seconds() / 60 * SCALE
+            blocks.append({
+                'placeholder': False,
+                'left': ((start - grid_start).total_seconds() / 60) * SCALE,
+                'width': GUIDE_MIN_BLOCK_PX if width < GUIDE_MIN_BLOCK_PX else width,
+                'now': start <= now <= stop,
+                'start': start.isoformat(),
+                'stop': stop.isoformat(),
+                'title': title,
+                'desc': prog.get('desc'),
+                'icon': prog.get('icon') or '',
+                'categories': ' | '.join(prog.get('categories') or ()),
+                'colors': ' | '.join(prog.get('colors') or ()),
+            })
+        rows[cid] = blocks if progs else placeholder
+    return rows
+
+
+from utils.guide_cache import GuideRowCache as _GuideRowCache
+from utils.single_flight import SingleFlightCache as _SingleFlightCache
+
+# Rendered rows of the tuner's channels, shared by every /guide request in
+# the same grid slot (see utils/guide_cache.py).
+_guide_row_cache = _GuideRowCache()
+# The next slot's rows are rendered this many seconds before it starts.
+GUIDE_PREWARM_SECONDS = 120
+
+
+def _guide_grid_start(now):
+    """Start of the 30-minute grid slot containing *now*."""
+    return now.replace(minute=(0 if now.minute < 30 else 30), second=0, microsecond=0)
+
+
+def _enabled_virtual_channels():
+    vc_settings = get_virtual_channel_settings()
+    return [ch for ch in get_virtual_channels() if vc_settings.get(ch['tvg_id'], True)]
+
+
+def _guide_row_expiry(progs, now):
+    """When the "now" highlight of any of *progs* next changes after *now*, or None."""
+    soonest = None
+    for prog in progs:
+        start, stop = prog.get('start'), prog.get('stop')
+        if not (start and stop):
+            continue
+        if start > now:
+            changes = start
+        elif stop >= now:
+            changes = stop + timedelta(microseconds=1)
+        else:
+            continue
+        if soonest is None or changes < soonest:
+            soonest = changes
+    return soonest
+
+
+def _guide_row_slot(grid_start, offset):
+    channels = cached_channels
+    generation = _epg_generation['id'] if _epg_generation else None
+    return _guide_row_cache.slot(
+        (generation, grid_start, offset), channels,
+        lambda: get_epg_window(grid_start, grid_start + timedelta(hours=HOURS_SPAN), include_undated=True))
+
+
+def _guide_highlight_version(slot, now):
+    """How many "now" highlight changes in *slot* have happened by *now*."""
+    if slot.boundaries is None:
+        times = set()
+        for progs in slot.data.values():
+            for prog in progs:
+                start, stop = prog.get('start'), prog.get('stop')
+                if start and stop:
+                    times.add(start)
+                    times.add(stop + timedelta(microseconds=1))
+        slot.boundaries = sorted(times)
+    return bisect.bisect_right(slot.boundaries, now)
+
+
+def _tuner_guide_rows(grid_start, now, offset):
+    """Markup of every tuner channel row for the slot starting at *grid_start*.
+
+    Rows are rendered once per (generation, grid_start, offset) and reused
+    until the slot ends, the tuner data changes, or the row's "now"
+    highlight moves.  *offset* is the number of rows above (virtual
+    channels), which shifts the fallback channel numbers.
+    """
+    slot = _guide_row_slot(grid_start, offset)
+    channels = slot.channels
+    render_row = get_template_attribute('_guide_row.html', 'guide_row')
+
+    def render(index):
+        ch = channels[index]
+        cid = ch.get('tvg_id')
+        progs = slot.data.get(cid)
+        blocks = _guide_rows({cid: progs}, grid_start, now)[cid] if progs is not None else None
+        return (render_row(ch, offset + index + 1, blocks, 60 * SCALE),
+                _guide_row_expiry(progs or (), now))
+
+    return [_guide_row_cache.row(slot, i, now, render) for i in range(len(channels))]
+
+
+def _warm_next_guide_slot(now=None):
+    """Render the tuner rows of the slot after *now* ahead of time."""
+    now = now or datetime.now(timezone.utc)
+    next_start = _guide_grid_start(now) + timedelta(minutes=SLOT_MINUTES)
+    with app.app_context():
+        _tuner_guide_rows(next_start, next_start, offset=len(_enabled_virtual_channels()))
+    return next_start
+
+
+def _guide_prewarm_loop():
+    """Background thread: warm each slot GUIDE_PREWARM_SECONDS before it starts."""
+    while True:
+        now = datetime.now(timezone.utc)
+        next_start = _guide_grid_start(now) + timedelta(minutes=SLOT_MINUTES)
+        wait = (next_start - now).total_seconds() - GUIDE_PREWARM_SECONDS
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            _warm_next_guide_slot(next_start - timedelta(seconds=1))
+        except Exception:
+            logging.exception("guide row pre-warm failed")
+        time.sleep(max(0.0, (next_start - datetime.now(timezone.utc)).total_seconds()) + 1)
+
+
 @app.route('/guide')
 @login_required
 def guide():
     log_event(current_user.username, "Loaded guide page")
-    # Check and run auto-refresh if due (minimal preset-based approach)
-    try:
-        refresh_if_due()
-    except Exception:
-        logging.exception("refresh_if_due from guide() failed")
 
     now = datetime.now(timezone.utc)
-    grid_start = now.replace(minute=(0 if now.minute < 30 else 30), second=0, microsecond=0)
+    grid_start = _guide_grid_start(now)
     slots = int((HOURS_SPAN * 60) / SLOT_MINUTES)
     hours_header = [grid_start + timedelta(minutes=SLOT_MINUTES * i) for i in range(slots)]
     total_width = slots * SLOT_MINUTES * SCALE
@@ -4567,26 +5088,43 @@ def guide():
     #for ch in cached_channels[:5]:
     #    print("  ", ch.get('tvg_id'))
 
-    #print("\nFirst 5 EPG keys:")
-    #for key in list(cached_epg.keys())[:5]:
-    #    print("  ", key)
     #print("==========================================\n")
 
 
+    virtual_ch = _enabled_virtual_channels()
     user_prefs = get_user_prefs(current_user.username)
+    # The page changes with the data/settings generation, the user and their
+    # preferences, the grid slot and whenever a "now" highlight moves within
+    # the slot.
+    etag = _data_etag('guide', current_user.username, _json.dumps(user_prefs, sort_keys=True),
+                      grid_start, len(virtual_ch),
+                      _guide_highlight_version(_guide_row_slot(grid_start, len(virtual_ch)), now))
+    if _etag_matches(etag):
+        return _not_modified(etag, private=True)
+
     user_default_theme = user_prefs.get("default_theme") or None
 
-    virtual_ch = get_virtual_channels()
-    vc_settings = get_virtual_channel_settings()
-    virtual_ch = [ch for ch in virtual_ch if vc_settings.get(ch['tvg_id'], True)]
     virtual_epg = get_virtual_epg(grid_start, HOURS_SPAN)
-    all_channels = virtual_ch + cached_channels
-    all_epg = {**virtual_epg, **cached_epg}
+    channel_appearances = get_all_channel_appearances()
+    channel_music_files = {
+        ch['tvg_id']: (f'/static/audio/{f}' if (f := get_channel_music_file(ch['tvg_id'])) else '')
+        for ch in virtual_ch
+    }
+    # Virtual rows depend on per-channel settings and are rendered every
+    # time; tuner rows come from the shared row cache.  Hidden channels and
+    # favourites are applied on top by user-prefs.js.
+    render_row = get_template_attribute('_guide_row.html', 'guide_row')
+    virtual_blocks = _guide_rows(virtual_epg, grid_start, now)
+    rows = [
+        render_row(ch, i, virtual_blocks.get(ch['tvg_id']), 60 * SCALE,
+                   channel_appearances, channel_music_files)
+        for i, ch in enumerate(virtual_ch, start=1)
+    ]
+    rows.extend(_tuner_guide_rows(grid_start, now, offset=len(virtual_ch)))
 
-    return render_template(
+    return _with_etag(make_response(render_template(
         'guide.html',
-        channels=all_channels,
-        epg=all_epg,
+        guide_rows=rows,
         now=now,
         grid_start=grid_start,
         hours_header=hours_header,
@@ -4597,12 +5135,7 @@ def guide():
         user_prefs=user_prefs,
         user_default_theme=user_default_theme,
         overlay_appearance=get_overlay_appearance(),
-        channel_appearances=get_all_channel_appearances(),
-        channel_music_files={
-                ch['tvg_id']: (f'/static/audio/{f}' if (f := get_channel_music_file(ch['tvg_id'])) else '')
-                for ch in virtual_ch
-            },
-    )
+    )), etag, private=True)
 
 @app.route('/play_channel', methods=['POST'])
 @login_required
@@ -4639,25 +5172,49 @@ def crt():
 def api_auto_refresh_status():
     """
     Return auto-refresh status for the current tuner:
-      { tuner, enabled (bool), interval_hours (int|null), last_run (string|null) }
+      { tuner, enabled (bool), interval_hours (int|null), last_run (string|null),
+        state ("idle"|"running"), started_at, last_duration_seconds, next_due,
+        scheduler (background thread and per-tuner progress) }
     """
     try:
         tuner = get_current_tuner()
         enabled = get_setting("auto_refresh_enabled", "0")
         interval = get_setting("auto_refresh_interval_hours", "")
         last = get_setting(f"last_auto_refresh:{tuner}", None) if tuner else None
+        progress = _refresh_scheduler.status(tuner) if tuner else {}
 
         return jsonify({
             "tuner": tuner,
             "enabled": bool(str(enabled) in ("1", "true", "True")),
             "interval_hours": int(interval) if interval not in (None, "") else None,
-            "last_run": last
+            "last_run": last,
+            "state": progress.get("state", "idle"),
+            "started_at": progress.get("started_at"),
+            "last_duration_seconds": progress.get("last_duration_seconds"),
+            "next_due": progress.get("next_due"),
+            "scheduler": _refresh_scheduler.status(),
         })
     except Exception as e:
         logging.exception("api_auto_refresh_status failed: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 
+@app.route('/api/auto_refresh/trigger', methods=['POST'])
+@login_required
+def api_auto_refresh_trigger():
+    """Queue an immediate background refresh of the current tuner ("Run Now")."""
+    if current_user.username != 'admin':
+        log_event(current_user.username, "Unauthorized access attempt to /api/auto_refresh/trigger")
+        return jsonify({"ok": False, "error": "Forbidden"}), 403
+    tuner = get_current_tuner()
+    if not tuner:
+        return jsonify({"ok": False, "error": "No active tuner"}), 400
+    _refresh_scheduler.trigger(tuner)
+    _refresh_scheduler.start()
+    log_event(current_user.username, f"Triggered refresh of tuner {tuner}")
+    return jsonify({"ok": True, "tuner": tuner})
+
+
 @app.route('/api/user_prefs', methods=['GET'])
 @login_required
 def api_user_prefs_get():
@@ -4710,20 +5267,39 @@ def api_user_prefs_post():
 def api_channels():
     """
     Return JSON list of cached channels for remote UIs.
+    Optional ?offset=N&limit=N return one page and add "paging"
+    ({offset, limit, total, next_offset}); without them every channel is
+    returned.  Large lists are streamed.
     """
-    out = []
-    for ch in cached_channels:
-        out.append({
-            'tvg_id': ch.get('tvg_id'),
-            'name': ch.get('name'),
-            'logo': ch.get('logo'),
-            'url': ch.get('url'),
-            'number': ch.get('tvg_chno') if ch.get('tvg_chno') else ch.get('number'),
-            'playlist_index': ch.get('playlist_index') if ch.get('playlist_index') is not None else None,
-            'group': ch.get('group'),
-            'source': ch.get('source')
-        })
-    return jsonify({'channels': out, 'timestamp': datetime.now(timezone.utc).isoformat()})
+    channels = cached_channels
+    offset = max(0, request.args.get('offset', default=0, type=int))
+    limit = request.args.get('limit', type=int)
+    etag = _data_etag('channels', offset, limit)
+    if _etag_matches(etag):
+        return _not_modified(etag, private=True)
+
+    total = len(channels)
+    end = total if limit is None else min(total, offset + max(1, limit))
+    fields = {'timestamp': datetime.now(timezone.utc).isoformat()}
+    if limit is not None:
+        fields['paging'] = {
+            'offset': offset,
+            'limit': max(1, limit),
+            'total': total,
+            'next_offset': end if end < total else None,
+        }
+    out = ({
+        'tvg_id': ch.get('tvg_id'),
+        'name': ch.get('name'),
+        'logo': ch.get('logo'),
+        'url': ch.get('url'),
+        'number': ch.get('tvg_chno') if ch.get('tvg_chno') else ch.get('number'),
+        'playlist_index': ch.get('playlist_index') if ch.get('playlist_index') is not None else None,
+        'group': ch.get('group'),
+        'source': ch.get('source')
+    } for ch in itertools.islice(channels, offset, end))
+    return _with_etag(_json_list_response(fields, 'channels', out, max(0, end - offset)),
+                      etag, private=True)
 
 @app.route('/api/news', methods=['GET'])
 @login_required
@@ -4899,6 +5475,19 @@ def nasa_page():
     return render_template('nasa.html')
 
 
+def _nasa_image_slot(nasa_cfg, now_ts):
+    """Return ``(cycle, image_index, elapsed_in_cycle)`` of the NASA rotation at *now_ts*.
+
+    See api_nasa() for the cycle logic.
+    """
+    cycle_seconds = int(nasa_cfg['interval']) * 60
+    elapsed_in_cycle = now_ts % cycle_seconds
+    image_index = int(elapsed_in_cycle / nasa_cfg['seconds_per_image'])
+    # Guard against floating-point overshoot at cycle boundaries
+    image_index = min(image_index, nasa_cfg['image_count'] - 1)
+    return int(now_ts // cycle_seconds), image_index, elapsed_in_cycle
+
+
 @app.route('/api/nasa', methods=['GET'])
 @login_required
 def api_nasa():
@@ -4952,10 +5541,7 @@ def api_nasa():
             images = fetched
             _NASA_APOD_CACHE[cache_key] = (images, _now_ts)
 
-    elapsed_in_cycle = _now_ts % cycle_seconds
-    image_index = int(elapsed_in_cycle / seconds_per_image)
-    # Guard against floating-point overshoot at cycle boundaries
-    image_index = min(image_index, image_count - 1)
+    _, image_index, elapsed_in_cycle = _nasa_image_slot(nasa_cfg, _now_ts)
     ms_until_next = int((seconds_per_image - (elapsed_in_cycle % seconds_per_image)) * 1000)
     slot_start_ts = _now_ts - (elapsed_in_cycle % seconds_per_image)
     slot_start = datetime.fromtimestamp(slot_start_ts, tz=timezone.utc)
@@ -5169,11 +5755,8 @@ def api_traffic():
     payload = dict(_build_traffic_demo_payload())
     music_filename = get_channel_music_file('virtual.traffic')
     payload['music_file'] = f'/static/audio/{music_filename}' if music_filename else ''
-    _now_ts = time.time()
-    rotation_seconds = max(30, int(get_traffic_demo_config().get('rotation_seconds', 120)))
-    payload['ms_until_next'] = int(
-        (rotation_seconds - (_now_ts % rotation_seconds)) * 1000
-    )
+    _, seconds_until_next = _traffic_rotation_slot()
+    payload['ms_until_next'] = int(seconds_until_next * 1000)
     return jsonify(payload)
 
 
@@ -5460,13 +6043,10 @@ def get_updates_config() -> dict:
     """
     defaults = {"show_beta": "0"}
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            for key in defaults:
-                c.execute("SELECT value FROM settings WHERE key=?", (f"updates.{key}",))
-                row = c.fetchone()
-                if row is not None:
-                    defaults[key] = row[0]
+        stored = _settings.prefix("updates.")
+        for key in defaults:
+            if f"updates.{key}" in stored:
+                defaults[key] = stored[f"updates.{key}"]
     except Exception:
         logging.exception("get_updates_config failed, using defaults")
     return {"show_beta": defaults["show_beta"] == "1"}
@@ -5476,13 +6056,7 @@ def save_updates_config(cfg: dict) -> None:
     """Persist updates channel configuration."""
     show_beta = bool(cfg.get("show_beta", False))
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute(
-                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
-                ("updates.show_beta", "1" if show_beta else "0"),
-            )
-            conn.commit()
+        _settings.set("updates.show_beta", "1" if show_beta else "0")
     except Exception:
         logging.exception("save_updates_config failed")
         raise
@@ -5761,9 +6335,14 @@ def api_overlay_settings():
     """Return overlay appearance settings. Use ?channel=tvg_id for per-channel settings."""
     channel = request.args.get('channel', '').strip()
     valid_ids = {ch['tvg_id'] for ch in VIRTUAL_CHANNELS}
-    if channel and channel in valid_ids:
-        return jsonify(get_channel_overlay_appearance(channel))
-    return jsonify(get_overlay_appearance())
+    if channel not in valid_ids:
+        channel = ''
+    etag = _data_etag('overlay_settings', channel)
+    if _etag_matches(etag):
+        return _not_modified(etag, private=True)
+    if channel:
+        return _with_etag(jsonify(get_channel_overlay_appearance(channel)), etag, private=True)
+    return _with_etag(jsonify(get_overlay_appearance()), etag, private=True)
 
 @app.route('/api/current_program', methods=['GET'])
 @login_required
@@ -5772,6 +6351,7 @@ def api_current_program():
     Return the currently playing program info for a given channel id.
     Query params:
       - tvg_id (preferred) OR id (fallback) — the channel identifier used in cached_channels
+      - next (optional, 0–10) — also return the following N programmes as "next"
     Response:
       { ok: True, channel: "<name>", tvg_id: "<id>", logo: "<url>", program: { title, desc, start_iso, stop_iso } }
       or { ok: False, error: "..." }
@@ -5779,56 +6359,53 @@ def api_current_program():
     tvg_id = request.args.get('tvg_id') or request.args.get('id') or ''
     if not tvg_id:
         return jsonify({"ok": False, "error": "missing tvg_id or id"}), 400
+    next_count = max(0, min(request.args.get('next', default=0, type=int) or 0, 10))
 
     try:
         now = datetime.now(timezone.utc)
         # find channel name and logo
-        channel_name = None
-        channel_logo = ''
-        for ch in cached_channels:
-            if ch.get('tvg_id') == tvg_id or str(ch.get('number')) == str(tvg_id):
-                channel_name = ch.get('name')
-                channel_logo = ch.get('logo') or ''
-                break
-
-        # get epg entries for tvg_id
-        programs = cached_epg.get(tvg_id) or []
-        current_prog = None
-        for prog in programs:
-            start = prog.get('start')
-            stop = prog.get('stop')
-            # some programs may be missing start/stop (fallback entries)
-            if start and stop:
-                # ensure timezone-aware comparison — cached_epg should use UTC timezone if parsed as such
-                if start <= now <= stop:
-                    current_prog = prog
-                    break
+        ch = find_channel(tvg_id)
+        channel_name = ch.get('name') if ch else None
+        channel_logo = (ch.get('logo') or '') if ch else ''
 
-        # if not found, maybe the first fallback entry or nearest upcoming/current
-        if not current_prog and programs:
-            # prefer any entry with a real title
-            for prog in programs:
-                if prog.get('title') and prog.get('title') != 'No Guide Data Available':
-                    current_prog = prog
-                    break
+        # current programme via an indexed range query on the programme store
+        current_prog = None
+        if _epg_generation:
+            current_prog = _epg_store.current_programme(EPG_DB, _epg_generation, tvg_id, now)
+            # if not found, fall back to the first entry (preferring a real title)
             if not current_prog:
-                current_prog = programs[0]
+                current_prog = _epg_store.fallback_programme(EPG_DB, _epg_generation, tvg_id)
+
+        upcoming = []
+        if next_count and _epg_generation:
+            upcoming = _epg_store.upcoming_programmes(EPG_DB, _epg_generation, tvg_id,
+                                                      now, limit=next_count)
+        # Identified by the programmes it shows, checked before building the body.
+        etag = _data_etag('current_program', tvg_id, next_count,
+                          current_prog.start_ts if current_prog else None,
+                          current_prog.stop_ts if current_prog else None,
+                          tuple(p.start_ts for p in upcoming))
+        if _etag_matches(etag):
+            return _not_modified(etag, private=True)
+
+        def _program_json(prog):
+            return {
+                "title": prog.get('title') or '',
+                "desc": prog.get('desc') or '',
+                "start_iso": (prog.get('start').isoformat() if prog.get('start') else None),
+                "stop_iso": (prog.get('stop').isoformat() if prog.get('stop') else None)
+            }
 
         if current_prog:
-            return jsonify({
+            body = {
                 "ok": True,
                 "channel": channel_name,
                 "tvg_id": tvg_id,
                 "logo": channel_logo,
-                "program": {
-                    "title": current_prog.get('title') or '',
-                    "desc": current_prog.get('desc') or '',
-                    "start_iso": (current_prog.get('start').isoformat() if current_prog.get('start') else None),
-                    "stop_iso": (current_prog.get('stop').isoformat() if current_prog.get('stop') else None)
-                }
-            })
+                "program": _program_json(current_prog)
+            }
         else:
-            return jsonify({
+            body = {
                 "ok": True,
                 "channel": channel_name,
                 "tvg_id": tvg_id,
@@ -5839,7 +6416,10 @@ def api_current_program():
                     "start_iso": None,
                     "stop_iso": None
                 }
-            })
+            }
+        if next_count:
+            body["next"] = [_program_json(p) for p in upcoming]
+        return _with_etag(jsonify(body), etag, private=True)
     except Exception as e:
         logging.exception("api_current_program error: %s", e)
         return jsonify({"ok": False, "error": "Internal server error"}), 500
@@ -5856,7 +6436,7 @@ def view_logs():
     entry_count = 0
 
     try:
-        with sqlite3.connect(DATABASE, timeout=10) as conn:
+        with _db_pool.connect(DATABASE) as conn:
             c = conn.cursor()
             c.execute(
                 "SELECT username, action, timestamp FROM activity_logs ORDER BY id ASC"
@@ -5890,9 +6470,8 @@ def clear_logs():
         return redirect(url_for('guide'))
 
     try:
-        with sqlite3.connect(DATABASE, timeout=10) as conn:
+        with _db_pool.connect(DATABASE) as conn:
             conn.execute("DELETE FROM activity_logs")
-            conn.commit()
     except Exception as e:  # noqa: BLE001
         logging.exception("clear_logs: failed to clear activity_logs: %s", e)
         flash("⚠️ Failed to clear logs.")
@@ -5907,130 +6486,237 @@ SCALE = 5
 HOURS_SPAN = 6
 SLOT_MINUTES = 30
 
-# ------------------- Main -------------------
-def ensure_default_tuner():
-    conn = sqlite3.connect(TUNER_DB)
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM tuners")
-    count = c.fetchone()[0]
-    if count == 0:
-        # Insert a safe default
-        c.execute(
-            "INSERT INTO tuners (name, xml, m3u) VALUES (?, ?, ?)",
-            ("Tuner 1", "http://example.com/guide.xml", "http://example.com/playlist.m3u")
-        )
-        conn.commit()
-    conn.close()
-
 # ------------------- Public Unified Guide + Theme APIs -------------------
-from flask import Response
+
+# Snapshot payloads per (generation, window, hours); see utils/single_flight.py.
+_guide_snapshot_cache = _SingleFlightCache(max_entries=16)
+GUIDE_SNAPSHOT_DEFAULT_LIMIT = 50   # channels per page when ?limit is not given
+GUIDE_SNAPSHOT_MAX_LIMIT = 500
+
+# Compact pages (utils/compact_snapshot.py), built once per snapshot page.
+from utils import compact_snapshot as _compact_snapshot
+_compact_snapshot_cache = _SingleFlightCache(max_entries=64)
+
+
+def _wants_compact_snapshot():
+    if request.args.get("format") == "compact":
+        return True
+    # Only when named explicitly, so "*/*" clients keep getting the JSON form.
+    return any(value == _compact_snapshot.MEDIA_TYPE and quality > 0
+               for value, quality in request.accept_mimetypes)
+
+
+def _snapshot_channel(ch, progs, start, end):
+    """Snapshot entry of one channel: its programmes clipped to ``[start, end)``."""
+    visible_programs = []
+
+    for p in progs:
+        st, sp = p.get('start'), p.get('stop')
+        if not st or not sp:
+            continue
+
+        # include any program overlapping [start, end)
+        if st < end and sp > start:
+            clipped_start = max(st, start)
+            clipped_stop = min(sp, end)
+            dur_min = max(
+                1,
+                int((clipped_stop - clipped_start).total_seconds() // 60)
+            )
+
+            visible_programs.append({
+                "title": p.get('title') or "No Data",
+                "desc":  p.get('desc')  or "",
+                "start": st.isoformat(),
+                "stop":  sp.isoformat(),
+                "clipped_start": clipped_start.isoformat(),
+                "clipped_stop":  clipped_stop.isoformat(),
+                "duration": dur_min
+            })
+
+    if not visible_programs:
+        visible_programs = [{
+            "title": "No Data",
+            "desc":  "",
+            "start": None,
+            "stop":  None,
+            "clipped_start": start.isoformat(),
+            "clipped_stop": (start + timedelta(minutes=30)).isoformat(),
+            "duration": 30
+        }]
+
+    return {
+        "tvg_id": ch.get('tvg_id'),
+        "number": ch.get('number') or ch.get('tvg_chno'),
+        "name": ch.get('name'),
+        "logo": ch.get('logo'),
+        "programs": visible_programs
+    }
+
+
+def _snapshot_window(now, hours_param):
+    """(start, hours) of the snapshot window: the current half hour, 0.5–8 h in half-hour steps."""
+    if hours_param is None:
+        hours = 2.0
+    else:
+        hours = max(0.5, min(hours_param, 8.0))  # clamp 0.5–8h
+    hours = max(0.5, round(hours * 2) / 2)  # quantise so callers share entries
+    start = now.replace(
+        minute=(0 if now.minute < 30 else 30),
+        second=0,
+        microsecond=0
+    )
+    return start, hours
+
+
+def _build_guide_snapshot(tuner_name, start, hours):
+    """Build the full (unpaginated) snapshot payload for one window."""
+    end = start + timedelta(hours=hours)
+
+    # 30-minute timeline labels across the window
+    slot_count = int((hours * 60) / 30) + 1
+    slots = [start + timedelta(minutes=30 * i) for i in range(slot_count)]
+    timeline = [s.strftime("%I:%M %p").lstrip("0") for s in slots]
+
+    tuner_info = get_tuners().get(tuner_name, {})
+
+    window_epg = get_epg_window(start, end)
+    channels_out = [
+        _snapshot_channel(ch, window_epg.get(ch.get('tvg_id'), []), start, end)
+        for ch in cached_channels
+    ]
+
+    return {
+        "meta": {
+            "generated": datetime.utcnow().isoformat() + "Z",
+            "tuner": tuner_name,
+            "generation": _epg_generation['id'] if _epg_generation else None,
+            "tuner_xml": tuner_info.get('xml'),
+            "tuner_m3u": tuner_info.get('m3u'),
+            "theme": "default_crt_blue",
+            "version": APP_VERSION,
+        },
+        "timeline": timeline,
+        "window": {
+            "start_iso": start.isoformat(),
+            "end_iso": end.isoformat(),
+            "minutes": int(hours * 60),
+        },
+        "channels": channels_out
+    }
+
 
 @app.route('/api/guide_snapshot', methods=['GET'])
 def api_guide_snapshot():
     """
     Public unified guide data for framebuffer/RetroIPTV OS clients.
-    Supports ?hours=N (0.5–8) to control window size.
+    Supports ?hours=N (0.5–8, in half-hour steps) to control window size and
+    ?offset=N&limit=N (limit 1–500, default 50) to page through the channels;
+    "paging.next_offset" is null on the last page.
+
+    ?format=compact (or Accept: application/vnd.retroiptv.compact+json)
+    returns the columnar form described in utils/compact_snapshot.py.
+
+    The full payload is built once per (guide generation, half-hour window,
+    hours) and shared by all callers; concurrent misses wait for one build.
     """
     try:
-        # Run auto-refresh if due so CRT clients get fresh data when they poll
-        try:
-            refresh_if_due()
-        except Exception:
-            logging.exception("refresh_if_due from api_guide_snapshot failed")
-
         now = datetime.now(timezone.utc)
 
-        # Read optional hours parameter
-        hours_param = request.args.get("hours", type=float)
-        if hours_param is None:
-            hours = 2.0
-        else:
-            hours = max(0.5, min(hours_param, 8.0))  # clamp 0.5–8h
+        start, hours = _snapshot_window(now, request.args.get("hours", type=float))
 
-        start = now.replace(
-            minute=(0 if now.minute < 30 else 30),
-            second=0,
-            microsecond=0
-        )
-        end = start + timedelta(hours=hours)
+        offset = max(0, request.args.get("offset", default=0, type=int))
+        limit = request.args.get("limit", default=GUIDE_SNAPSHOT_DEFAULT_LIMIT, type=int)
+        limit = max(1, min(limit, GUIDE_SNAPSHOT_MAX_LIMIT))
 
-        # 30-minute timeline labels across the window
-        slot_count = int((hours * 60) / 30) + 1
-        slots = [start + timedelta(minutes=30 * i) for i in range(slot_count)]
-        timeline = [s.strftime("%I:%M %p").lstrip("0") for s in slots]
+        compact = _wants_compact_snapshot()
+        etag = _data_etag('guide_snapshot', start, hours, offset, limit, compact)
+        if _etag_matches(etag):
+            resp = _not_modified(etag)
+            resp.vary.add('Accept')
+            return resp
 
         tuner_name = get_current_tuner()
-        tuners = get_tuners()
-        tuner_info = tuners.get(tuner_name, {})
-
-        channels_out = []
-        for ch in cached_channels[:50]:  # perf cap
-            tvg_id = ch.get('tvg_id')
-            progs = cached_epg.get(tvg_id, [])
-            visible_programs = []
-
-            for p in progs:
-                st, sp = p.get('start'), p.get('stop')
-                if not st or not sp:
-                    continue
+        generation = _epg_generation['id'] if _epg_generation else None
+        key = (tuner_name, generation, id(cached_channels), start, hours)
+        full = _guide_snapshot_cache.get(key, lambda: _build_guide_snapshot(tuner_name, start, hours))
+
+        total = len(full["channels"])
+        next_offset = offset + limit if offset + limit < total else None
+        payload = {k: v for k, v in full.items() if k != "channels"}
+        payload["paging"] = {
+            "offset": offset,
+            "limit": limit,
+            "total": total,
+            "next_offset": next_offset,
+        }
+        if compact:
+            body = _compact_snapshot_cache.get(
+                key + (offset, limit),
+                lambda: _json.dumps(_compact_snapshot.compact_snapshot(
+                    payload, full["channels"][offset:offset + limit]), separators=(',', ':')))
+            resp = Response(body, mimetype=_compact_snapshot.MEDIA_TYPE)
+        else:
+            page = itertools.islice(full["channels"], offset, offset + limit)
+            resp = _json_list_response(payload, "channels", page, max(0, min(total, offset + limit) - offset))
+        resp.vary.add('Accept')
+        return _with_etag(resp, etag)
+    except Exception as e:
+        logging.exception("api_guide_snapshot failed: %s", e)
+        return jsonify({"error": "Internal server error"}), 500
 
-                # include any program overlapping [start, end)
-                if st < end and sp > start:
-                    clipped_start = max(st, start)
-                    clipped_stop = min(sp, end)
-                    dur_min = max(
-                        1,
-                        int((clipped_stop - clipped_start).total_seconds() // 60)
-                    )
 
-                    visible_programs.append({
-                        "title": p.get('title') or "No Data",
-                        "desc":  p.get('desc')  or "",
-                        "start": st.isoformat(),
-                        "stop":  sp.isoformat(),
-                        "clipped_start": clipped_start.isoformat(),
-                        "clipped_stop":  clipped_stop.isoformat(),
-                        "duration": dur_min
-                    })
+@app.route('/api/guide/delta', methods=['GET'])
+def api_guide_delta():
+    """
+    Channels changed since guide generation ?since=N (meta.generation of a
+    snapshot or "generation" of an earlier delta), for the same window
+    parameters as /api/guide_snapshot (?hours=N).
+
+    Response: { generation, since, resync, changed: [snapshot channel entries],
+    removed: [tvg_id, ...], order: [tvg_id, ...] or null }.  Apply by
+    dropping "removed", replacing changed channels in place and appending
+    new ones; "order" (the full lineup order) is sent only when that does
+    not give the new lineup.  resync=true (with no
+    channel data) means the server no longer knows what changed since N:
+    refetch /api/guide_snapshot.
+    """
+    since = request.args.get("since", type=int)
+    if since is None:
+        return jsonify({"error": "missing or invalid since"}), 400
+    try:
+        start, hours = _snapshot_window(datetime.now(timezone.utc),
+                                        request.args.get("hours", type=float))
+        etag = _data_etag('guide_delta', since, start, hours)
+        if _etag_matches(etag):
+            return _not_modified(etag)
 
-            if not visible_programs:
-                visible_programs = [{
-                    "title": "No Data",
-                    "desc":  "",
-                    "start": None,
-                    "stop":  None,
-                    "clipped_start": start.isoformat(),
-                    "clipped_stop": (start + timedelta(minutes=30)).isoformat(),
-                    "duration": 30
-                }]
-
-            channels_out.append({
-                "number": ch.get('number') or ch.get('tvg_chno'),
-                "name": ch.get('name'),
-                "logo": ch.get('logo'),
-                "programs": visible_programs
-            })
+        tuner_name = get_current_tuner()
+        generation = _epg_generation['id'] if _epg_generation else None
+        delta = _guide_delta_log.since(tuner_name, since) if generation is not None else None
+        if delta is None or delta["generation"] != generation:
+            return _with_etag(jsonify({
+                "generation": generation, "since": since, "resync": True,
+                "changed": [], "removed": [], "order": None,
+            }), etag)
 
-        payload = {
-            "meta": {
-                "generated": datetime.utcnow().isoformat() + "Z",
-                "tuner": tuner_name,
-                "tuner_xml": tuner_info.get('xml'),
-                "tuner_m3u": tuner_info.get('m3u'),
-                "theme": "default_crt_blue",
-                "version": APP_VERSION,
-            },
-            "timeline": timeline,
-            "window": {
-                "start_iso": start.isoformat(),
-                "end_iso": end.isoformat(),
-                "minutes": int(hours * 60),
-            },
-            "channels": channels_out
-        }
-        return jsonify(payload)
+        end = start + timedelta(hours=hours)
+        changed_ids = delta["changed"]
+        window_epg = get_epg_window(start, end, channel_ids=sorted(i for i in changed_ids if i))
+        changed = [
+            _snapshot_channel(ch, window_epg.get(ch.get('tvg_id'), []), start, end)
+            for ch in cached_channels if ch.get('tvg_id') in changed_ids
+        ]
+        return _with_etag(jsonify({
+            "generation": generation,
+            "since": since,
+            "resync": False,
+            "changed": changed,
+            "removed": sorted(i for i in delta["removed"] if i),
+            "order": delta["order"],
+        }), etag)
     except Exception as e:
-        logging.exception("api_guide_snapshot failed: %s", e)
+        logging.exception("api_guide_delta failed: %s", e)
         return jsonify({"error": "Internal server error"}), 500
 
 
@@ -6070,20 +6756,33 @@ crt_qr_visible = True
 qr_hide_time = None
 QR_AUTO_RESHOW_MINUTES = 15  # inactivity window
 
+def _set_qr_visible(visible):
+    global crt_qr_visible, qr_hide_time
+    crt_qr_visible = visible
+    qr_hide_time = None if visible else datetime.utcnow()
+    _event_bus.publish('qr', {'visible': visible}, only_if_changed=True)
+
+
+def _qr_visible():
+    """Current QR visibility, auto-re-enabled after the inactivity window."""
+    if not crt_qr_visible and qr_hide_time:
+        elapsed = datetime.utcnow() - qr_hide_time
+        if elapsed > timedelta(minutes=QR_AUTO_RESHOW_MINUTES):
+            _set_qr_visible(True)
+            logging.info(f"QR overlay auto-restored after {elapsed}")
+    return crt_qr_visible
+
+
+_event_bus.publish('qr', {'visible': crt_qr_visible})
+
+
 @app.route('/api/qr_status', methods=['GET'])
 def api_qr_status():
     """
     Returns current QR visibility. If QR was hidden longer than the
     inactivity window, auto-re-enable it.
     """
-    global crt_qr_visible, qr_hide_time
-    if not crt_qr_visible and qr_hide_time:
-        elapsed = datetime.utcnow() - qr_hide_time
-        if elapsed > timedelta(minutes=QR_AUTO_RESHOW_MINUTES):
-            crt_qr_visible = True
-            qr_hide_time = None
-            logging.info(f"QR overlay auto-restored after {elapsed}")
-    return jsonify({"visible": crt_qr_visible})
+    return jsonify({"visible": _qr_visible()})
 
 @app.route('/api/qr_hide', methods=['POST'])
 def api_qr_hide():
@@ -6091,9 +6790,7 @@ def api_qr_hide():
     Called when a user reaches /remote (after login).
     Hides the QR and starts the inactivity timer.
     """
-    global crt_qr_visible, qr_hide_time
-    crt_qr_visible = False
-    qr_hide_time = datetime.utcnow()
+    _set_qr_visible(False)
     logging.info("QR overlay hidden; inactivity timer started")
     return jsonify({"status": "hidden"})
 
@@ -6102,13 +6799,151 @@ def api_qr_show():
     """
     Manual override: instantly re-enable QR (resets timer).
     """
-    global crt_qr_visible, qr_hide_time
-    crt_qr_visible = True
-    qr_hide_time = None
+    _set_qr_visible(True)
     logging.info("QR overlay manually shown via /api/qr_show")
     return jsonify({"status": "visible"})
 
 
+# ------------------- Event Stream -------------------
+# One multiplexed stream of state changes instead of per-page polling:
+#   guide              {tuner, generation}           after a refresh / tuner switch
+#   qr                 {visible}                     QR overlay flips
+#   slot.news          {feed_index, slot}            news feed rotation
+#   slot.nasa          {image_index, slot}           NASA image rotation
+#   slot.traffic       {slot}                        traffic demo city rotation
+#   slot.channel_mix   {active_tvg_id, slot}         channel-mix switch
+# Slots are wall-clock driven; _event_ticker_loop re-evaluates them at each
+# transition and publishes the ones that moved.
+
+EVENTS_KEEPALIVE_SECONDS = 15
+EVENTS_LONG_POLL_SECONDS = 25
+EVENTS_TICK_MAX_SECONDS = 30
+
+
+def _virtual_slot_states(now_ts=None):
+    """``({topic: data}, seconds until the next transition)`` of the virtual-channel slots."""
+    now_ts = time.time() if now_ts is None else now_ts
+    states, waits = {}, []
+
+    feed_count = len(get_news_feed_urls())
+    if feed_count:
+        time_slot, feed_index, elapsed, feed_seconds = _news_feed_slot(feed_count, now_ts)
+        states['slot.news'] = {'feed_index': feed_index, 'slot': time_slot}
+        waits.append(feed_seconds - elapsed)
+
+    nasa_cfg = get_nasa_config()
+    per_image = nasa_cfg['seconds_per_image']
+    if nasa_cfg['interval'] and per_image:
+        cycle, image_index, elapsed = _nasa_image_slot(nasa_cfg, now_ts)
+        states['slot.nasa'] = {'image_index': image_index,
+                               'slot': cycle * nasa_cfg['image_count'] + image_index}
+        waits.append(per_image - elapsed % per_image)
+
+    time_slot, seconds_until_next = _traffic_rotation_slot(now_ts)
+    states['slot.traffic'] = {'slot': time_slot}
+    waits.append(seconds_until_next)
+
+    active_tvg_id, seconds_remaining = _get_active_channel_mix_slot(
+        get_channel_mix_config()['channels'], now_ts)
+    if active_tvg_id:
+        # The whole second the slot ends on identifies it.
+        states['slot.channel_mix'] = {'active_tvg_id': active_tvg_id,
+                                      'slot': int(now_ts) + seconds_remaining}
+        waits.append(seconds_remaining)
+
+    return states, min(waits)
+
+
+def _publish_virtual_slots(now_ts=None):
+    """Publish the slots that moved; return seconds until the next check."""
+    states, wait = _virtual_slot_states(now_ts)
+    for topic, data in states.items():
+        _event_bus.publish(topic, data, only_if_changed=True)
+    _qr_visible()
+    if not crt_qr_visible and qr_hide_time:
+        reshow_at = qr_hide_time + timedelta(minutes=QR_AUTO_RESHOW_MINUTES)
+        wait = min(wait, (reshow_at - datetime.utcnow()).total_seconds())
+    return min(max(wait, 0.5), EVENTS_TICK_MAX_SECONDS)
+
+
+def _event_ticker_loop():
+    """Background thread: publish virtual-channel slot transitions as they happen."""
+    while True:
+        try:
+            wait = _publish_virtual_slots()
+        except Exception:
+            logging.exception("event ticker failed")
+            wait = EVENTS_TICK_MAX_SECONDS
+        # Wake just after the boundary so the new slot is already current.
+        time.sleep(wait + 0.05)
+
+
+def _event_topics():
+    raw = request.args.get('topics', '')
+    topics = {t.strip() for t in raw.split(',') if t.strip()}
+    return topics or None
+
+
+def _event_json(event):
+    return {'id': event.id, 'topic': event.topic, 'data': event.data}
+
+
+@app.route('/api/events', methods=['GET'])
+def api_events():
+    """
+    Server-Sent Events stream of state changes (topics above).
+    ?topics=guide,qr,slot limits the stream ("slot" matches every slot.*).
+    Each event's SSE "event" field is its topic and "data" its JSON payload.
+    The current state of every subscribed topic is sent on connect, so a
+    reconnecting client (EventSource resends Last-Event-ID) never misses a
+    change; a comment line is sent every EVENTS_KEEPALIVE_SECONDS.
+    """
+    topics = _event_topics()
+
+    def stream():
+        events, cursor = _event_bus.latest(topics)
+        yield 'retry: 5000\n\n'
+        while True:
+            if not events:
+                yield ': keepalive\n\n'
+            for event in events:
+                yield f'id: {event.id}\nevent: {event.topic}\ndata: {_json.dumps(event.data)}\n\n'
+            events, cursor = _event_bus.wait(cursor, topics, timeout=EVENTS_KEEPALIVE_SECONDS)
+            if events is None:
+                events, cursor = _event_bus.latest(topics)
+
+    resp = Response(stream(), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'  # let reverse proxies stream it
+    return resp
+
+
+@app.route('/api/events/poll', methods=['GET'])
+def api_events_poll():
+    """
+    Long-poll fallback for /api/events.  ?after=<cursor> waits up to
+    EVENTS_LONG_POLL_SECONDS (or ?timeout=N, at most that) for events after
+    the cursor; without it, or when the cursor is too old, the current state
+    of every subscribed topic is returned at once with "resync": true.
+    Response: { cursor, resync, events: [{id, topic, data}, ...] }.
+    """
+    topics = _event_topics()
+    after = request.args.get('after', type=int)
+    timeout = request.args.get('timeout', default=EVENTS_LONG_POLL_SECONDS, type=float)
+    timeout = max(0.0, min(timeout, EVENTS_LONG_POLL_SECONDS))
+    events = None
+    if after is not None:
+        events, cursor = _event_bus.wait(after, topics, timeout=timeout)
+    resync = events is None
+    if resync:
+        events, cursor = _event_bus.latest(topics)
+    return jsonify({
+        'cursor': cursor,
+        'resync': resync,
+        'events': [_event_json(e) for e in events],
+    })
+
+
 def check_url_reachable(url, timeout=5):
     try:
         r = requests.head(url, timeout=timeout)
@@ -6123,31 +6958,21 @@ def check_xmltv_freshness(xml_url, max_age_hours=6):
 
         root = ET.fromstring(r.content)
 
-        now = datetime.now(timezone.utc)
+        now = int(time.time())
         past_starts = []
 
         for prog in root.findall(".//programme"):
-            start = prog.get("start")
-            if not start:
-                continue
-
             # example format: "20251115051031 +0000"
-            parts = start.split()
-            ts = parts[0]  # 20251115051031
-            if len(ts) >= 14:
-                try:
-                    dt = datetime.strptime(ts[:14], "%Y%m%d%H%M%S").replace(tzinfo=timezone.utc)
-                    if dt <= now:
-                        past_starts.append(dt)
-                except:
-                    pass
+            ts = _xmltv_time(prog.get("start"))
+            if ts is not None and ts <= now:
+                past_starts.append(ts)
 
         if not past_starts:
             # If no past events, assume fresh
             return (True, 0.0)
 
         latest_past = max(past_starts)
-        age_hours = (now - latest_past).total_seconds() / 3600.0
+        age_hours = (now - latest_past) / 3600.0
 
         return (age_hours <= max_age_hours, age_hours)
 
@@ -6155,27 +6980,23 @@ def check_xmltv_freshness(xml_url, max_age_hours=6):
         print("XMLTV freshness error:", e)
         return (False, None)
 
-# ------------------- Minimal Auto-refresh (preset-based, no scheduler) -------------------
+# ------------------- Auto-refresh (preset-based, background scheduler) -------------------
+from utils.refresh_scheduler import RefreshScheduler as _RefreshScheduler
+
 AUTO_REFRESH_PRESETS = [2, 4, 6, 12, 24]  # allowed hours
+AUTO_REFRESH_POLL_SECONDS = 60  # how often the scheduler looks for due tuners
 _auto_refresh_locks = {}  # in-memory locks (OK for single-process)
 
 def get_setting(key, default=None):
     """Read key from tuners.settings table (existing settings table)."""
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("SELECT value FROM settings WHERE key=?", (key,))
-            row = c.fetchone()
-        return row[0] if row else default
+        return _settings.get(key, default)
     except Exception:
         return default
 
 def set_setting(key, value):
     try:
-        with sqlite3.connect(TUNER_DB, timeout=10) as conn:
-            c = conn.cursor()
-            c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, str(value)))
-            conn.commit()
+        _settings.set(key, str(value))
     except Exception:
         logging.exception("set_setting failed for %s", key)
 
@@ -6214,15 +7035,19 @@ def refresh_current_tuner(tuner_name=None):
             logging.warning("refresh_current_tuner: tuner %s not found", tuner_name)
             return False
 
-        # Use load_tuner_data so combined tuners (which have no direct m3u/xml)
-        # are handled correctly by merging their source tuners' feeds.
-        new_channels, new_epg = load_tuner_data(tuner_name)
-        new_epg = apply_epg_fallback(new_channels, new_epg)
+        # Conditional fetch of every feed (combined tuners included); nothing
+        # is parsed when the provider has not changed anything.
+        loaded = load_tuner_data_if_changed(tuner_name)
+        if loaded is None:
+            logging.info("refresh_current_tuner: feeds unchanged for %s", tuner_name)
+            if not _epg_generation and tuner_name == get_current_tuner():
+                restore_tuner_data(tuner_name)
+        else:
+            new_channels, new_epg, ingest_meta = loaded
+            new_epg = apply_epg_fallback(new_channels, new_epg)
 
-        # atomic swap
-        global cached_channels, cached_epg
-        cached_channels = new_channels
-        cached_epg = new_epg
+            # atomic swap (single transaction in the programme store)
+            publish_tuner_data(tuner_name, new_channels, new_epg, meta=ingest_meta)
 
         now_iso = datetime.now(timezone.utc).isoformat()
         set_setting(f"last_auto_refresh:{tuner_name}", f"success|{now_iso}")
@@ -6241,56 +7066,44 @@ def refresh_current_tuner(tuner_name=None):
         except Exception:
             pass
 
-def refresh_if_due(tuner_name=None):
-    """Check settings and last-run timestamp; refresh if interval elapsed."""
+def _auto_refresh_interval_hours():
+    """The configured auto-refresh interval in hours, or None when disabled."""
+    # global enabling (simple): stored as 'auto_refresh_enabled' = "1" or "0"
+    enabled = get_setting("auto_refresh_enabled", "0")
+    if str(enabled) not in ("1", "true", "True"):
+        return None
+    interval_value = get_setting("auto_refresh_interval_hours", None)
     try:
-        # global enabling (simple): stored as 'auto_refresh_enabled' = "1" or "0"
-        enabled = get_setting("auto_refresh_enabled", "0")
-        if str(enabled) not in ("1", "true", "True"):
-            return False
-
-        interval_value = get_setting("auto_refresh_interval_hours", None)
-        try:
-            interval_hours = int(interval_value) if interval_value is not None and interval_value != "" else None
-        except:
-            interval_hours = None
-
-        # Only allow preset intervals for simplicity/safety
-        if interval_hours not in AUTO_REFRESH_PRESETS:
-            logging.debug("refresh_if_due: interval %s not in presets %s", interval_hours, AUTO_REFRESH_PRESETS)
-            return False
-
-        if not tuner_name:
-            tuner_name = get_current_tuner()
-        if not tuner_name:
-            return False
+        interval_hours = int(interval_value) if interval_value is not None and interval_value != "" else None
+    except (TypeError, ValueError):
+        interval_hours = None
+    # Only allow preset intervals for simplicity/safety
+    if interval_hours not in AUTO_REFRESH_PRESETS:
+        return None
+    return interval_hours
 
-        last_raw = get_setting(f"last_auto_refresh:{tuner_name}", None)
-        if last_raw:
-            # stored as "success|{ISO}" or "failed|{ISO}|msg"
-            try:
-                last_iso = last_raw.split("|")[1]
-                last_dt = datetime.fromisoformat(last_iso)
-            except Exception:
-                last_dt = None
-        else:
-            last_dt = None
 
-        now = datetime.now(timezone.utc)
-        if last_dt is None:
-            due = True
-        else:
-            elapsed_hours = (now - last_dt).total_seconds() / 3600.0
-            due = (elapsed_hours >= interval_hours)
+def _last_auto_refresh_ts(tuner_name):
+    """Epoch seconds of the last refresh attempt of *tuner_name*, or None."""
+    last_raw = get_setting(f"last_auto_refresh:{tuner_name}", None)
+    if not last_raw:
+        return None
+    # stored as "success|{ISO}" or "failed|{ISO}|msg"
+    try:
+        return datetime.fromisoformat(last_raw.split("|")[1]).timestamp()
+    except Exception:
+        return None
 
-        if due:
-            logging.info("refresh_if_due: due for tuner %s (interval=%s)", tuner_name, interval_hours)
-            return refresh_current_tuner(tuner_name)
-        return False
 
-    except Exception:
-        logging.exception("refresh_if_due unexpected error")
-        return False
+# Refreshes every tuner in the background; request handlers only read the
+# last published guide.  Started from __main__.
+_refresh_scheduler = _RefreshScheduler(
+    list_tuners=lambda: list(get_tuners()),
+    refresh=refresh_current_tuner,
+    interval_hours=_auto_refresh_interval_hours,
+    last_run=_last_auto_refresh_ts,
+    poll_seconds=AUTO_REFRESH_POLL_SECONDS,
+)
 
 # ------------------- QR Visibility Control (with auto-restore) -------------------
 
@@ -6354,16 +7167,27 @@ if __name__ == '__main__':
         _record_db_init("tuners.db", TUNER_DB, success=False, error=str(_dberr))
         raise
 
-    # make sure there’s at least one tuner in the DB
-    ensure_default_tuner()
-
     # preload guide cache
     tuners = get_tuners()
     current_tuner = get_current_tuner()
     if not current_tuner and tuners:  # fallback if no active tuner set
         current_tuner = list(tuners.keys())[0]
-    # Use load_tuner_data so combined tuners are handled correctly at startup.
-    cached_channels, cached_epg = load_tuner_data(current_tuner)
+        set_current_tuner(current_tuner)
+    # Conditional fetch so combined tuners are handled and unchanged feeds are
+    # not re-parsed at startup.  If the providers are unreachable, keep
+    # serving the guide stored by the previous run instead of starting empty.
+    _startup_loaded = load_tuner_data_if_changed(current_tuner) if current_tuner else None
+    if _startup_loaded is None:
+        if current_tuner:
+            restore_tuner_data(current_tuner)
+    else:
+        _startup_channels, _startup_epg, _startup_meta = _startup_loaded
+        if _startup_channels or _startup_epg or not restore_tuner_data(current_tuner):
+            publish_tuner_data(current_tuner, _startup_channels,
+                               apply_epg_fallback(_startup_channels, _startup_epg),
+                               meta=_startup_meta)
+        del _startup_channels, _startup_epg, _startup_meta
+    del _startup_loaded
 
     _record_startup_event("info", "cache_load",
                           f"Loaded {len(cached_channels)} channel(s) from tuner '{current_tuner}'")
@@ -6379,5 +7203,10 @@ if __name__ == '__main__':
     # Mark startup complete before handing off to Flask
     _finalise_startup(success=True)
 
-    # No background scheduler — auto-refresh is triggered lazily on page/API hits.
+    logging.info("Static asset manifest: %d files fingerprinted", _static_manifest.build())
+
+    # Auto-refresh runs in the background for every tuner.
+    _refresh_scheduler.start()
+    threading.Thread(target=_guide_prewarm_loop, daemon=True, name="guide-prewarm").start()
+    threading.Thread(target=_event_ticker_loop, daemon=True, name="event-ticker").start()
     app.run(host='0.0.0.0', port=5000, debug=False)
@@ -473,12 +473,12 @@ def diagnostics_tuner_sources():
     Only tuners that have a non-empty M3U URL are included.
     """
     _require_admin()
-    import sqlite3 as _sqlite3  # noqa: PLC0415
+    from utils import db_pool  # noqa: PLC0415
 
     _, _, tuner_db_path, _, _ = _get_config()
     tuners = []
     try:
-        with _sqlite3.connect(tuner_db_path, timeout=5) as conn:
+        with db_pool.connect(tuner_db_path) as conn:
             cur = conn.execute("SELECT name, m3u FROM tuners ORDER BY name")
             for row in cur.fetchall():
                 name, m3u_url = row
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Benchmark XMLTV ingest: legacy ``ET.fromstring`` vs. streaming ``parse_epg``.
+
+Generates a synthetic XMLTV guide, then parses it once with the original
+buffer-everything implementation and once with the streaming
+``app.parse_epg``.  Each run happens in its own subprocess so the reported
+peak RSS (``ru_maxrss``) belongs to that parser alone.
+
+Usage
+-----
+    # From the repository root:
+    python scripts/benchmark_epg_parse.py                      # 500 ch x 336 progs
+    python scripts/benchmark_epg_parse.py --channels 3000 --programmes 336
+    python scripts/benchmark_epg_parse.py --xml /path/to/guide.xml
+
+Both parsers are fed the same bytes through a fake ``requests.get`` so the
+network is not involved; the numbers isolate parse time and memory.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def generate_xmltv(path: str, channels: int, programmes: int) -> None:
+    """Write a synthetic guide with *channels* x *programmes* 30-minute slots."""
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write('<?xml version="1.0" encoding="UTF-8"?>\n<tv generator-info-name="bench">\n')
+        for c in range(channels):
+            fh.write(f'  <channel id="ch{c}.bench"><display-name>Channel {c}</display-name></channel>\n')
+        for c in range(channels):
+            for p in range(programmes):
+                st = start + timedelta(minutes=30 * p)
+                sp = st + timedelta(minutes=30)
+                fh.write(
+                    f'  <programme channel="ch{c}.bench" start="{st:%Y%m%d%H%M%S} +0000" '
+                    f'stop="{sp:%Y%m%d%H%M%S} +0000">\n'
+                    f'    <title>Programme {p % 97}</title>\n'
+                    f'    <desc>Synthetic description for programme {p} on channel {c}, '
+                    f'padded to look like a real listing.</desc>\n'
+                    f'    <category>Category {p % 7}</category>\n'
+                    f'  </programme>\n'
+                )
+        fh.write("</tv>\n")
+
+
+class _FileResponse:
+    """Serves a file through the subset of requests.Response both parsers use."""
+
+    headers = {}
+
+    def __init__(self, path):
+        self._path = path
+
+    @property
+    def content(self):
+        with open(self._path, "rb") as fh:
+            return fh.read()
+
+    def raise_for_status(self):
+        return None
+
+    def iter_content(self, chunk_size=1):
+        with open(self._path, "rb") as fh:
+            while True:
+                chunk = fh.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def close(self):
+        return None
+
+
+def _legacy_parse_epg(content):
+    """The pre-streaming ``parse_epg`` body, kept verbatim for comparison."""
+    import xml.etree.ElementTree as ET
+
+    programs = {}
+    root = ET.fromstring(content)
+    for channel in root.findall('channel'):
+        programs[channel.attrib.get('id')] = []
+    for prog in root.findall('programme'):
+        cid = prog.attrib.get('channel')
+        start_str = prog.attrib.get('start')
+        stop_str = prog.attrib.get('stop')
+        start = datetime.strptime(start_str[:14], '%Y%m%d%H%M%S').replace(tzinfo=timezone.utc)
+        stop = datetime.strptime(stop_str[:14], '%Y%m%d%H%M%S').replace(tzinfo=timezone.utc)
+        title = prog.find('title').text if prog.find('title') is not None else ''
+        desc = prog.find('desc').text if prog.find('desc') is not None else ''
+        icon_el = prog.find('icon')
+        icon = icon_el.attrib.get('src', '') if icon_el is not None else ''
+        categories = [(c.text or '').strip() for c in prog.findall('category') if (c.text or '').strip()]
+        colors = [(e.text or '').strip() for e in (prog.findall('colour') + prog.findall('color'))
+                  if (e.text or '').strip()]
+        programs.setdefault(cid, []).append({
+            'title': title, 'desc': desc, 'start': start, 'stop': stop,
+            'icon': icon, 'categories': categories, 'colors': colors,
+        })
+    return programs
+
+
+def _run_single(mode: str, xml_path: str) -> None:
+    """Child-process entry point: parse once and print a JSON result line."""
+    sys.path.insert(0, REPO_ROOT)
+    import app as app_module  # imported in both modes so the baseline matches
+
+    baseline = _peak_rss_mb()
+    resp = _FileResponse(xml_path)
+    t0 = time.perf_counter()
+    if mode == "legacy":
+        epg = _legacy_parse_epg(resp.content)
+    else:
+        app_module.requests.get = lambda *_a, **_k: resp
+        epg = app_module.parse_epg("http://bench.invalid/guide.xml")
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({
+        "mode": mode,
+        "seconds": round(elapsed, 3),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "peak_over_baseline_mb": round(_peak_rss_mb() - baseline, 1),
+        "programmes": sum(len(v) for v in epg.values()),
+    }))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--channels", type=int, default=500)
+    parser.add_argument("--programmes", type=int, default=336, help="programmes per channel (336 = 7 days)")
+    parser.add_argument("--xml", help="benchmark an existing XMLTV file instead of a synthetic one")
+    parser.add_argument("--run", choices=("legacy", "streaming"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        _run_single(args.run, args.xml)
+        return 0
+
+    tmp = None
+    xml_path = args.xml
+    if not xml_path:
+        tmp = tempfile.NamedTemporaryFile(suffix=".xml", delete=False)
+        tmp.close()
+        xml_path = tmp.name
+        print(f"Generating {args.channels} channels x {args.programmes} programmes ...")
+        generate_xmltv(xml_path, args.channels, args.programmes)
+    print(f"XMLTV size: {os.path.getsize(xml_path) / (1024 * 1024):.1f} MB\n")
+
+    try:
+        print(f"{'mode':<10} {'seconds':>8} {'peak RSS MB':>12} {'over base MB':>13} {'programmes':>11}")
+        for mode in ("legacy", "streaming"):
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--run", mode, "--xml", xml_path],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+            r = json.loads(out)
+            print(f"{r['mode']:<10} {r['seconds']:>8} {r['peak_rss_mb']:>12} "
+                  f"{r['peak_over_baseline_mb']:>13} {r['programmes']:>11}")
+    finally:
+        if tmp is not None:
+            os.unlink(xml_path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
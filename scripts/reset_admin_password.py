@@ -204,8 +204,8 @@ def reset_password(db_path: str, new_password: str) -> None:
             conn.commit()
 
             # Apply all known column migrations so the DB is fully up to date after
-            # running this script.  This list must stay in sync with
-            # _apply_users_schema_migrations() in app.py; importing app directly is
+            # running this script.  This list must stay in sync with the column
+            # migrations in _USERS_MIGRATIONS in app.py; importing app directly is
             # intentionally avoided here to keep this script self-contained and
             # free of Flask initialisation overhead.
             _COLUMN_MIGRATIONS = [
@@ -0,0 +1,46 @@
+// Subscribe to server-pushed state changes (/api/events).
+//
+//   RetroEvents.subscribe(['guide', 'qr'], (topic, data) => { ... });
+//
+// Uses EventSource when available and falls back to long-polling
+// /api/events/poll. The handler is called with the current state of every
+// topic on connect and again whenever one changes.
+(() => {
+  if (window.RetroEvents) return;
+
+  function subscribe(topics, handler) {
+    const query = 'topics=' + encodeURIComponent(topics.join(','));
+
+    if (window.EventSource) {
+      const source = new EventSource('/api/events?' + query);
+      // Events are named by their full topic, so name slot topics in full
+      // ("slot.news", not "slot").
+      topics.forEach(topic => {
+        source.addEventListener(topic, ev => handler(topic, JSON.parse(ev.data)));
+      });
+      return () => source.close();
+    }
+
+    let stopped = false;
+    let cursor = null;
+    async function poll() {
+      while (!stopped) {
+        try {
+          const url = '/api/events/poll?' + query + (cursor === null ? '' : '&after=' + cursor);
+          const res = await fetch(url, { cache: 'no-store' });
+          if (!res.ok) throw new Error(`HTTP ${res.status}`);
+          const body = await res.json();
+          cursor = body.cursor;
+          body.events.forEach(ev => handler(ev.topic, ev.data));
+        } catch (err) {
+          console.warn('[event-stream] poll failed, retrying', err);
+          await new Promise(r => setTimeout(r, 5000));
+        }
+      }
+    }
+    poll();
+    return () => { stopped = true; };
+  }
+
+  window.RetroEvents = { subscribe };
+})();
@@ -23,7 +23,7 @@
 
   async function syncWindowFromAPI() {
     try {
-      const res = await fetch(ENDPOINT, { cache: 'no-store' });
+      const res = await fetch(ENDPOINT, { cache: 'no-cache' });
       if (!res.ok) throw new Error(`HTTP ${res.status}`);
       const data = await res.json();
       if (!data.window || !data.window.start_iso || !data.window.minutes) return;
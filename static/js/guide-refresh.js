@@ -25,7 +25,7 @@
     }
 
     try {
-      const res = await fetch(ENDPOINT, { cache: 'no-store' });
+      const res = await fetch(ENDPOINT, { cache: 'no-cache' });
       if (!res.ok) throw new Error(`HTTP ${res.status}`);
 
       // You can either rebuild just the EPG grid, or simply reload the page
@@ -54,5 +54,15 @@
 
   // Run once every X minutes so the grid rolls forward with real time
   setInterval(refreshGuide, REFRESH_INTERVAL_MIN * 60 * 1000);
+
+  // Reload as soon as the server publishes a new guide (tuner refreshed or
+  // switched) instead of waiting for the next timer tick.
+  if (window.RetroEvents) {
+    let generation;
+    window.RetroEvents.subscribe(['guide'], (topic, data) => {
+      if (generation !== undefined && data.generation !== generation) refreshGuide();
+      generation = data.generation;
+    });
+  }
 })();
 
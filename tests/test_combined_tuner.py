@@ -10,7 +10,7 @@ from app import (
     app, init_db, init_tuners_db, add_tuner, add_combined_tuner,
     get_tuners, load_tuner_data
 )
-from unittest.mock import patch, Mock
+from unittest.mock import ANY, patch, Mock
 import tempfile
 import sqlite3
 
@@ -138,7 +138,9 @@ class TestCombinedTuner:
         channels, epg = load_tuner_data("Std")
 
         mock_m3u.assert_called_once_with("https://example.com/p.m3u")
-        mock_epg.assert_called_once_with("https://example.com/g.xml")
+        mock_epg.assert_called_once_with("https://example.com/g.xml", channel_ids=ANY, window=ANY)
+        channel_ids = mock_epg.call_args.kwargs["channel_ids"]
+        assert "ch" in channel_ids and "other" not in channel_ids
         assert len(channels) == 1
 
     @patch('app.parse_m3u')
@@ -157,6 +159,76 @@ class TestCombinedTuner:
         assert len(channels) == 1
         assert channels[0]["name"] == "Ch1"
 
+    def test_load_tuner_data_combined_fetches_in_parallel_in_source_order(self):
+        """Playlists and guides are fetched in one concurrent batch but merged in source order."""
+        import threading
+        import time
+        add_tuner("Source A", "https://example.com/a.xml", "https://example.com/a.m3u")
+        add_tuner("Source B", "https://example.com/b.xml", "https://example.com/b.m3u")
+        add_tuner("Source C", "https://example.com/c.xml", "https://example.com/c.m3u")
+        add_combined_tuner("Merged", ["Source A", "Source B", "Source C"])
+        # Every download must be in flight at once to pass the barrier; if the
+        # guides waited for the playlists, the wait would time out and every
+        # fetch would fall back to an empty result.
+        in_flight = threading.Barrier(6)
+        delays = {"a": 0.03, "b": 0.01, "c": 0.02}  # finish out of source order
+
+        def fake_m3u(url):
+            key = url[-5]
+            in_flight.wait(timeout=5)
+            time.sleep(delays[key])
+            return [{"name": key, "url": "", "logo": "", "tvg_id": key}]
+
+        def fake_epg(url, **_kwargs):
+            key = url[-5]
+            in_flight.wait(timeout=5)
+            time.sleep(delays[key])
+            return {"shared": [{"title": key}], key: []}
+
+        with patch('app.parse_m3u', side_effect=fake_m3u), \
+                patch('app.parse_epg', side_effect=fake_epg):
+            channels, epg = load_tuner_data("Merged")
+
+        assert [c["name"] for c in channels] == ["a", "b", "c"]
+        # Later sources still win on duplicate ids, as with sequential merging.
+        assert epg["shared"] == [{"title": "c"}]
+
+    def test_pending_channel_ids_stop_waiting_after_timeout(self, monkeypatch):
+        """Once a lookup times out, every channel is kept without waiting again."""
+        import threading
+        import app as app_module
+        monkeypatch.setattr(app_module, "FEED_FETCH_TIMEOUT", 0.05)
+        pending = app_module._PendingChannelIds(1)
+        release = threading.Event()
+        task = pending.wrap(lambda: release.wait(5) and [{"tvg_id": "late"}])
+        worker = threading.Thread(target=task)
+        worker.start()
+        try:
+            assert "x" in pending
+            # Later lookups find the filter settled instead of waiting again.
+            assert pending._ready.is_set()
+            assert "y" in pending
+        finally:
+            release.set()
+            worker.join()
+        # The late playlist does not narrow the filter mid-parse.
+        assert "z" in pending
+
+    def test_run_concurrently_falls_back_on_error_and_timeout(self):
+        """Failed and slow tasks contribute their fallback; order is kept."""
+        import time
+        import app as app_module
+
+        def boom():
+            raise RuntimeError("down")
+
+        results = app_module._run_concurrently([
+            (lambda: time.sleep(1) or "slow", lambda: "slow-fallback"),
+            (boom, lambda: "boom-fallback"),
+            (lambda: "ok", lambda: "unused"),
+        ], timeout=0.2)
+        assert results == ["slow-fallback", "boom-fallback", "ok"]
+
     # ------------------------------------------------------------------ #
     # /api/health — combined tuner returns N/A fields                     #
     # ------------------------------------------------------------------ #
@@ -0,0 +1,99 @@
+"""Tests for the compact columnar guide snapshot (utils/compact_snapshot.py)
+served by /api/guide_snapshot?format=compact."""
+import json
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app, init_db, init_tuners_db, add_user
+from utils.compact_snapshot import FORMAT, MEDIA_TYPE, compact_snapshot
+
+START = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _snapshot():
+    def prog(title, start_min, stop_min):
+        return {"title": title, "desc": "Shared description",
+                "start": (START + timedelta(minutes=start_min)).isoformat(),
+                "stop": (START + timedelta(minutes=stop_min)).isoformat()}
+
+    return {
+        "meta": {"tuner": "T"},
+        "timeline": ["12:00 PM"],
+        "window": {"start_iso": START.isoformat(), "end_iso": "", "minutes": 120},
+        "paging": {"offset": 0},
+        "channels": [
+            {"tvg_id": "a", "number": "1", "name": "A", "logo": "",
+             "programs": [prog("Running", -15, 30), prog("Next", 30, 90)]},
+            {"tvg_id": "b", "number": None, "name": "B", "logo": "",
+             "programs": [{"title": "No Data", "desc": "", "start": None, "stop": None}]},
+        ],
+    }
+
+
+class TestCompactSnapshot:
+    def test_columns_string_table_and_minute_offsets(self):
+        snap = _snapshot()
+        out = compact_snapshot(snap, snap["channels"])
+        assert out["format"] == FORMAT
+        assert out["window"]["start_epoch"] == int(START.timestamp())
+        s = out["strings"]
+        ch = out["channels"]
+        assert [s[i] for i in ch["name"]] == ["A", "B"]
+        assert ch["number"] == ["1", None]
+        assert ch["programs"][1] == []
+        t1, d1, start1, length1, t2, d2, start2, length2 = ch["programs"][0]
+        assert (s[t1], start1, length1) == ("Running", -15, 45)
+        assert (s[t2], start2, length2) == ("Next", 30, 60)
+        assert d1 == d2 and s.count("Shared description") == 1
+        assert out["meta"] == {"tuner": "T"} and out["paging"] == {"offset": 0}
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "DATABASE", str(tmp_path / "users_test.db"))
+    monkeypatch.setattr(app_module, "TUNER_DB", str(tmp_path / "tuners_test.db"))
+    monkeypatch.setattr(app_module, "EPG_DB", str(tmp_path / "epg_test.db"))
+    monkeypatch.setattr(app_module, "cached_channels", [])
+    monkeypatch.setattr(app_module, "_epg_generation", None)
+    init_db()
+    init_tuners_db()
+    add_user("admin", "adminpass")
+    app.config["TESTING"] = True
+    now = datetime.now(timezone.utc)
+    channels = [{"tvg_id": f"ch{i}", "name": f"Channel {i}", "logo": f"http://logos/{i}.png"}
+                for i in range(100)]
+    epg = {
+        f"ch{i}": [{"title": f"Show {j % 7}", "desc": "An episode of a long-running series " * 3,
+                    "start": now + timedelta(minutes=30 * j - 10),
+                    "stop": now + timedelta(minutes=30 * j + 20)} for j in range(6)]
+        for i in range(100)
+    }
+    with app.test_client() as c:
+        app_module.publish_tuner_data("Tuner 1", channels, epg)
+        yield c
+
+
+class TestCompactEndpoint:
+    def test_query_and_accept_negotiation(self, client):
+        by_query = client.get("/api/guide_snapshot?format=compact&limit=100")
+        assert by_query.mimetype == MEDIA_TYPE
+        by_accept = client.get("/api/guide_snapshot?limit=100", headers={"Accept": MEDIA_TYPE})
+        assert by_accept.data == by_query.data
+        assert "Accept" in by_accept.headers["Vary"]
+        default = client.get("/api/guide_snapshot?limit=100", headers={"Accept": "*/*"})
+        assert default.mimetype == "application/json"
+        assert by_query.headers["ETag"] != default.headers["ETag"]
+
+    def test_much_smaller_than_json(self, client):
+        verbose = client.get("/api/guide_snapshot?hours=3&limit=100").data
+        compact = client.get("/api/guide_snapshot?hours=3&limit=100&format=compact").data
+        assert len(verbose) > 5 * len(compact)
+        body = json.loads(compact)
+        assert len(body["channels"]["name"]) == 100
+        assert body["paging"]["total"] == 100
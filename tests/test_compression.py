@@ -0,0 +1,87 @@
+"""Tests for negotiated response compression (utils/compression.py and the
+after_request hook in app.py)."""
+import gzip
+import os
+import sys
+
+import pytest
+from werkzeug.datastructures import Accept
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app, init_db, init_tuners_db, add_user
+from utils import compression
+from utils.compression import CompressionCache
+
+
+class TestCompressionHelpers:
+    def test_negotiate(self, monkeypatch):
+        monkeypatch.setattr(compression, "BROTLI_AVAILABLE", False)
+        assert compression.negotiate(Accept([("gzip", 1), ("br", 1)])) == "gzip"
+        assert compression.negotiate(Accept([("identity", 1)])) is None
+        assert compression.negotiate(Accept([("gzip", 0)])) is None
+
+    def test_compressible_types(self):
+        assert compression.is_compressible("text/html")
+        assert compression.is_compressible("application/json")
+        assert not compression.is_compressible("image/png")
+        assert not compression.is_compressible(None)
+
+    def test_cache_reuses_compressed_body(self):
+        cache = CompressionCache()
+        body = b'{"channels": []}' * 200
+        first = cache.compress("/api/x", body, "gzip")
+        assert gzip.decompress(first) == body
+        assert cache.compress("/api/x", body, "gzip") is first
+        stats = cache.stats()["routes"]["/api/x"]
+        assert stats["responses"] == 2 and stats["cache_hits"] == 1
+        assert stats["ratio"] < 0.1
+
+    def test_cache_is_bounded(self):
+        cache = CompressionCache(max_bytes=100)
+        for i in range(20):
+            cache.compress("/r", os.urandom(64) + bytes([i]), "gzip")
+        assert cache.stats()["cache_bytes"] <= 100
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "DATABASE", str(tmp_path / "users_test.db"))
+    monkeypatch.setattr(app_module, "TUNER_DB", str(tmp_path / "tuners_test.db"))
+    monkeypatch.setattr(app_module, "EPG_DB", str(tmp_path / "epg_test.db"))
+    monkeypatch.setattr(app_module, "cached_channels", [])
+    monkeypatch.setattr(app_module, "_epg_generation", None)
+    monkeypatch.setattr(app_module, "_compression_cache", CompressionCache())
+    monkeypatch.setattr(compression, "BROTLI_AVAILABLE", False)
+    init_db()
+    init_tuners_db()
+    add_user("admin", "adminpass")
+    app.config["TESTING"] = True
+    with app.test_client() as c:
+        c.post("/login", data={"username": "admin", "password": "adminpass"})
+        channels = [{"tvg_id": f"ch{i}", "name": f"Channel {i}"} for i in range(100)]
+        app_module.publish_tuner_data("Tuner 1", channels, {})
+        yield c
+
+
+class TestCompressedResponses:
+    def test_large_json_is_gzipped(self, client):
+        resp = client.get("/api/channels", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in resp.headers["Vary"]
+        plain = client.get("/api/channels")
+        assert "Content-Encoding" not in plain.headers
+        assert len(resp.data) < len(plain.data)
+        assert gzip.decompress(resp.data).startswith(b'{"channels"')
+
+    def test_small_bodies_are_not_compressed(self, client):
+        resp = client.get("/api/qr_status", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in resp.headers
+
+    def test_repeat_hits_come_from_cache_and_show_in_diagnostics(self, client):
+        for _ in range(3):
+            client.get("/api/guide_snapshot?limit=100", headers={"Accept-Encoding": "gzip"})
+        stats = app_module.get_compression_stats()["routes"]["/api/guide_snapshot"]
+        assert stats["responses"] == 3
+        assert stats["cache_hits"] == 2
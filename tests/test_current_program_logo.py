@@ -19,6 +19,9 @@ def isolated_db(tmp_path, monkeypatch):
     tuners_db = str(tmp_path / "tuners_test.db")
     monkeypatch.setattr(app_module, "DATABASE", users_db)
     monkeypatch.setattr(app_module, "TUNER_DB",  tuners_db)
+    monkeypatch.setattr(app_module, "EPG_DB",    str(tmp_path / "epg_test.db"))
+    monkeypatch.setattr(app_module, "cached_channels", [])
+    monkeypatch.setattr(app_module, "_epg_generation", None)
     init_db()
     init_tuners_db()
     add_user("admin", "adminpass")
@@ -60,6 +63,11 @@ def _make_epg(tvg_id="test.ch1"):
     }
 
 
+def _publish(channels, epg):
+    """Store *epg* as the active tuner's guide generation."""
+    app_module.publish_tuner_data(app_module.get_current_tuner(), channels, epg)
+
+
 # ─── Tests ───────────────────────────────────────────────────────────────────
 
 class TestCurrentProgramLogoField:
@@ -67,8 +75,7 @@ class TestCurrentProgramLogoField:
 
     def test_logo_present_in_response(self, client, monkeypatch):
         """Response includes 'logo' key with the channel's logo URL."""
-        monkeypatch.setattr(app_module, "cached_channels", _make_channels())
-        monkeypatch.setattr(app_module, "cached_epg",      _make_epg())
+        _publish(_make_channels(), _make_epg())
         login(client)
         resp = client.get("/api/current_program?tvg_id=test.ch1")
         assert resp.status_code == 200
@@ -79,8 +86,7 @@ class TestCurrentProgramLogoField:
 
     def test_logo_empty_string_when_no_logo(self, client, monkeypatch):
         """When the channel has no logo, 'logo' is an empty string (not None/absent)."""
-        monkeypatch.setattr(app_module, "cached_channels", _make_channels(logo=""))
-        monkeypatch.setattr(app_module, "cached_epg",      _make_epg())
+        _publish(_make_channels(logo=""), _make_epg())
         login(client)
         resp = client.get("/api/current_program?tvg_id=test.ch1")
         assert resp.status_code == 200
@@ -91,8 +97,7 @@ class TestCurrentProgramLogoField:
     def test_logo_empty_string_when_logo_is_none(self, client, monkeypatch):
         """When the channel logo field is None, 'logo' is normalised to ''."""
         channels = [{"tvg_id": "test.ch1", "name": "Test Channel", "logo": None, "number": "1"}]
-        monkeypatch.setattr(app_module, "cached_channels", channels)
-        monkeypatch.setattr(app_module, "cached_epg",      _make_epg())
+        _publish(channels, _make_epg())
         login(client)
         resp = client.get("/api/current_program?tvg_id=test.ch1")
         assert resp.status_code == 200
@@ -102,8 +107,7 @@ class TestCurrentProgramLogoField:
 
     def test_logo_present_when_no_guide_data(self, client, monkeypatch):
         """'logo' is returned even when no EPG program is available."""
-        monkeypatch.setattr(app_module, "cached_channels", _make_channels())
-        monkeypatch.setattr(app_module, "cached_epg",      {})
+        _publish(_make_channels(), {})
         login(client)
         resp = client.get("/api/current_program?tvg_id=test.ch1")
         assert resp.status_code == 200
@@ -114,8 +118,7 @@ class TestCurrentProgramLogoField:
 
     def test_program_fields_still_present(self, client, monkeypatch):
         """Existing program fields are not broken by the logo addition."""
-        monkeypatch.setattr(app_module, "cached_channels", _make_channels())
-        monkeypatch.setattr(app_module, "cached_epg",      _make_epg())
+        _publish(_make_channels(), _make_epg())
         login(client)
         resp = client.get("/api/current_program?tvg_id=test.ch1")
         body = resp.get_json()
@@ -0,0 +1,144 @@
+"""Tests for the pooled SQLite connections (utils/db_pool.py)."""
+import os
+import sqlite3
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db_pool import ConnectionPool
+
+
+@pytest.fixture()
+def db(tmp_path):
+    path = str(tmp_path / "tuners.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (k TEXT PRIMARY KEY, v TEXT)")
+    return path
+
+
+def _in_thread(fn):
+    out = []
+    t = threading.Thread(target=lambda: out.append(fn()))
+    t.start()
+    t.join()
+    return out[0]
+
+
+def test_pragmas_and_same_connection_per_thread(db):
+    pool = ConnectionPool()
+    conn = pool.connect(db)
+    assert pool.connect(db) is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    other = _in_thread(lambda: id(pool.connect(db)))
+    assert other != id(conn)
+
+
+def test_finished_threads_return_connections(db):
+    pool = ConnectionPool()
+    first = _in_thread(lambda: id(pool.connect(db)))
+    second = _in_thread(lambda: id(pool.connect(db)))
+    assert first == second
+    stats = pool.stats()["tuners.db"]
+    assert stats["opened"] == 1 and stats["reused"] == 1
+    assert stats["leased"] == 0 and stats["idle"] == 1
+
+
+def test_with_block_commits_and_rolls_back(db):
+    pool = ConnectionPool()
+    with pool.connect(db) as conn:
+        conn.execute("INSERT INTO t VALUES ('a', '1')")
+    with pytest.raises(RuntimeError):
+        with pool.connect(db) as conn:
+            conn.execute("INSERT INTO t VALUES ('b', '2')")
+            raise RuntimeError
+    with sqlite3.connect(db) as check:
+        assert check.execute("SELECT k FROM t").fetchall() == [("a",)]
+    stats = pool.stats()["tuners.db"]
+    assert stats["transactions"] == 2 and stats["busy_ms_total"] >= 0
+
+
+def test_only_outermost_block_commits(db):
+    pool = ConnectionPool()
+    with pytest.raises(RuntimeError):
+        with pool.connect(db) as outer:
+            outer.execute("INSERT INTO t VALUES ('a', '1')")
+            with pool.connect(db) as inner:
+                inner.execute("INSERT INTO t VALUES ('b', '2')")
+            raise RuntimeError
+    assert pool.connect(db).execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_nested_commit_and_close_leave_the_outer_transaction_alone(db):
+    pool = ConnectionPool()
+
+    def helper():
+        with pool.connect(db) as conn:
+            conn.execute("INSERT INTO t VALUES ('b', '2')")
+            conn.commit()
+        pool.connect(db).close()
+
+    with pytest.raises(RuntimeError):
+        with pool.connect(db) as outer:
+            outer.execute("INSERT INTO t VALUES ('a', '1')")
+            helper()
+            assert outer.in_transaction
+            raise RuntimeError
+    assert pool.connect(db).execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_close_keeps_connection_but_drops_uncommitted_work(db):
+    pool = ConnectionPool()
+    conn = pool.connect(db)
+    conn.execute("INSERT INTO t VALUES ('a', '1')")
+    conn.close()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    assert pool.connect(db) is conn
+
+
+def test_replaced_file_gets_a_new_connection(db):
+    pool = ConnectionPool()
+    with pool.connect(db) as conn:
+        conn.execute("INSERT INTO t VALUES ('old', '1')")
+    for suffix in ("", "-wal", "-shm"):  # what a restore has to do with a WAL database
+        os.remove(db + suffix)
+    with sqlite3.connect(db) as r:
+        r.execute("CREATE TABLE t (k TEXT PRIMARY KEY, v TEXT)")
+        r.execute("INSERT INTO t VALUES ('new', '1')")
+    assert pool.connect(db).execute("SELECT k FROM t").fetchall() == [("new",)]
+
+
+def test_init_runs_once_per_connection(tmp_path):
+    pool = ConnectionPool()
+    path = str(tmp_path / "epg.db")
+    calls = []
+
+    def init(conn):
+        calls.append(1)
+        conn.execute("CREATE TABLE IF NOT EXISTS p (k TEXT)")
+
+    pool.connect(path, init).execute("SELECT * FROM p")
+    pool.connect(path, init)
+    assert len(calls) == 1
+    # A finished thread's connection is reused without running init again.
+    _in_thread(lambda: pool.connect(path, init).execute("SELECT * FROM p").fetchall())
+    _in_thread(lambda: pool.connect(path, init).execute("SELECT * FROM p").fetchall())
+    assert len(calls) == 2
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    pool.connect(path, init).execute("SELECT * FROM p")
+    assert len(calls) == 3
+
+
+def test_leases_per_thread_are_bounded(tmp_path):
+    pool = ConnectionPool(max_leases=2)
+    paths = [str(tmp_path / f"db{i}.db") for i in range(4)]
+    for p in paths:
+        pool.connect(p).execute("SELECT 1")
+    leased = sum(s["leased"] for s in pool.stats().values())
+    idle = sum(s["idle"] for s in pool.stats().values())
+    assert leased == 2 and idle == 2
@@ -0,0 +1,397 @@
+"""Tests for the persistent SQLite programme store (utils/epg_store.py) and
+its use by the guide / API endpoints in place of the old cached_epg dict."""
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app, init_db, init_tuners_db, add_user
+from utils import db_pool, epg_store
+from utils.programme import EMPTY, Interner, Programme, as_programme, memory_report
+
+
+T0 = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _prog(title, start_min, length_min, **extra):
+    p = {
+        "title": title,
+        "desc": f"{title} desc",
+        "start": T0 + timedelta(minutes=start_min),
+        "stop": T0 + timedelta(minutes=start_min + length_min),
+        "icon": "",
+        "categories": [],
+        "colors": [],
+    }
+    p.update(extra)
+    return p
+
+
+def _epg():
+    return {
+        "ch1": [
+            _prog("Morning", -120, 60),
+            _prog("Long Movie", -60, 180, categories=["Movies"], colors=["Blue"]),
+            _prog("Late", 120, 30),
+        ],
+        "ch2": [{"title": "No Guide Data Available", "desc": "", "start": None, "stop": None}],
+    }
+
+
+@pytest.fixture()
+def db_path(tmp_path):
+    return str(tmp_path / "epg.db")
+
+
+class TestProgrammeRecords:
+    def test_record_reads_like_the_old_dict(self):
+        p = as_programme(_prog("Show", 0, 30, categories=["News"]))
+        assert isinstance(p, Programme)
+        assert p["title"] == "Show" and p.get("desc") == "Show desc"
+        assert p["start"] == T0 and p.stop == T0 + timedelta(minutes=30)
+        assert p.start_ts == int(T0.timestamp())
+        assert p["categories"] == ("News",) and p.colors is EMPTY
+        assert p.get("missing", "x") == "x"
+        with pytest.raises(KeyError):
+            p["missing"]
+
+    def test_interner_shares_strings_and_tuples(self):
+        interner = Interner()
+        a = interner.strings(["Movies", "Drama"])
+        b = interner.strings(iter(["Movies", "Drama"]))
+        assert a is b
+        assert interner.strings([]) is EMPTY
+        assert interner.text("".join(["Even", "ing News"])) is interner.text("Evening News")
+
+    def test_parsed_records_share_repeated_values(self):
+        xml = (b'<tv>' + b''.join(
+            b'<programme channel="ch1" start="2026010112%02d00 +0000" stop="2026010112%02d00 +0000">'
+            b'<title>News</title><category>News</category></programme>' % (m, m + 1)
+            for m in range(0, 4)) + b'</tv>')
+        progs = app_module._programmes_from_chunks([xml])["ch1"]
+        assert len(progs) == 4
+        assert all(p.title is progs[0].title for p in progs)
+        assert all(p.categories is progs[0].categories for p in progs)
+        assert all(p.colors is EMPTY for p in progs)
+
+    def test_fallback_channels_share_one_placeholder_list(self):
+        epg = app_module.apply_epg_fallback([{"tvg_id": "a"}, {"tvg_id": "b"}], {})
+        assert epg["a"] is epg["b"]
+        assert epg["a"][0].title == "No Guide Data Available"
+
+    def test_memory_report_compact_is_smaller(self, db_path):
+        gen = epg_store.publish_generation(db_path, "Tuner 1", [], _epg())
+        report = memory_report(epg_store.sample_programmes(db_path, gen))
+        assert report["sample_size"] == 4
+        assert report["compact_bytes_per_programme"] < report["legacy_bytes_per_programme"]
+        assert memory_report([])["legacy_bytes_per_programme"] is None
+
+
+class TestPublishGeneration:
+    def test_publish_sets_active_generation(self, db_path):
+        gen = epg_store.publish_generation(db_path, "Tuner 1", [{"tvg_id": "ch1"}], _epg())
+        active = epg_store.get_active_generation(db_path, "Tuner 1")
+        assert active["id"] == gen["id"]
+        assert active["channels"] == [{"tvg_id": "ch1"}]
+        assert active["programme_count"] == 4
+        assert active["max_duration"] == 180 * 60
+
+    def test_republish_replaces_previous_generation(self, db_path):
+        first = epg_store.publish_generation(db_path, "Tuner 1", [], _epg())
+        second = epg_store.publish_generation(db_path, "Tuner 1", [], {"ch1": [_prog("New", 0, 30)]})
+        assert second["id"] != first["id"]
+        with sqlite3.connect(db_path) as conn:
+            gens = {r[0] for r in conn.execute("SELECT DISTINCT generation FROM programmes")}
+        assert gens == {second["id"]}
+
+    def test_generations_are_per_tuner(self, db_path):
+        a = epg_store.publish_generation(db_path, "A", [], _epg())
+        epg_store.publish_generation(db_path, "B", [], {})
+        assert epg_store.get_active_generation(db_path, "A")["id"] == a["id"]
+
+    def test_failed_publish_keeps_previous_generation(self, db_path):
+        good = epg_store.publish_generation(db_path, "Tuner 1", [], _epg())
+        bad = {"ch1": [{"title": "x", "start": "not-a-datetime", "stop": None}]}
+        with pytest.raises(Exception):
+            epg_store.publish_generation(db_path, "Tuner 1", [], bad)
+        assert epg_store.get_active_generation(db_path, "Tuner 1")["id"] == good["id"]
+
+    def test_drop_and_rename_tuner(self, db_path):
+        epg_store.publish_generation(db_path, "Old", [], _epg())
+        epg_store.rename_tuner(db_path, "Old", "New")
+        assert epg_store.get_active_generation(db_path, "Old") is None
+        assert epg_store.get_active_generation(db_path, "New") is not None
+        epg_store.drop_tuner(db_path, "New")
+        assert epg_store.get_active_generation(db_path, "New") is None
+
+
+class TestNormalise:
+    def test_sorts_and_repairs_stops(self):
+        progs = [
+            _prog("C", 60, 30),
+            {"title": "A", "start": T0, "stop": None},
+            _prog("B", 30, 60),           # overlaps C
+            _prog("B dup", 30, 10),       # same start as B
+            {"title": "D", "start": T0 + timedelta(minutes=90), "stop": T0},
+        ]
+        out = epg_store.normalise_programmes(progs)
+        assert [p["title"] for p in out] == ["A", "B", "C", "D"]
+        assert out[0]["stop"] == T0 + timedelta(minutes=30)
+        assert out[1]["stop"] == T0 + timedelta(minutes=60)
+        assert out[3]["stop"] == out[3]["start"] + epg_store.DEFAULT_PROGRAMME_LENGTH
+        assert progs[1]["stop"] is None  # input not modified
+
+    def test_undated_placeholders_kept_first(self):
+        placeholder = {"title": "No Guide Data Available", "start": None, "stop": None}
+        out = epg_store.normalise_programmes([_prog("A", 0, 30), placeholder])
+        assert out[0].title == "No Guide Data Available" and out[0].start is None
+
+
+class TestRangeQueries:
+    def test_window_returns_overlapping_programmes(self, db_path):
+        gen = epg_store.publish_generation(db_path, "T", [], _epg())
+        window = epg_store.programmes_in_window(db_path, gen, T0, T0 + timedelta(hours=1))
+        # "Long Movie" started an hour before the window and is still included.
+        assert [p["title"] for p in window["ch1"]] == ["Long Movie"]
+        assert window["ch1"][0]["categories"] == ("Movies",)
+        assert window["ch1"][0]["start"] == T0 - timedelta(minutes=60)
+        assert "ch2" not in window
+
+    def test_window_with_undated_placeholders(self, db_path):
+        gen = epg_store.publish_generation(db_path, "T", [], _epg())
+        window = epg_store.programmes_in_window(db_path, gen, T0, T0 + timedelta(hours=3),
+                                                include_undated=True)
+        assert [p["title"] for p in window["ch1"]] == ["Long Movie", "Late"]
+        assert window["ch2"][0]["title"] == "No Guide Data Available"
+        assert window["ch2"][0]["start"] is None
+
+    def test_current_and_fallback_programme(self, db_path):
+        gen = epg_store.publish_generation(db_path, "T", [], _epg())
+        assert epg_store.current_programme(db_path, gen, "ch1", T0)["title"] == "Long Movie"
+        assert epg_store.current_programme(db_path, gen, "ch1", T0 + timedelta(hours=5)) is None
+        assert epg_store.fallback_programme(db_path, gen, "ch1")["title"] == "Morning"
+        assert epg_store.fallback_programme(db_path, gen, "ch2")["title"] == "No Guide Data Available"
+
+    def test_current_after_overlap_repair(self, db_path):
+        epg = {"ch1": [_prog("First", 0, 90), _prog("Second", 30, 30)]}
+        gen = epg_store.publish_generation(db_path, "T", [], epg)
+        at = T0 + timedelta(minutes=45)
+        assert epg_store.current_programme(db_path, gen, "ch1", at)["title"] == "Second"
+
+    def test_upcoming_programmes(self, db_path):
+        gen = epg_store.publish_generation(db_path, "T", [], _epg())
+        upcoming = epg_store.upcoming_programmes(db_path, gen, "ch1", T0 - timedelta(hours=3), limit=2)
+        assert [p["title"] for p in upcoming] == ["Morning", "Long Movie"]
+        assert epg_store.upcoming_programmes(db_path, gen, "ch1", T0)[0]["title"] == "Late"
+        assert epg_store.upcoming_programmes(db_path, gen, "ch2", T0) == []
+
+    def test_now_next_lookups_reuse_one_connection(self, db_path):
+        epg = {f"ch{c}": [_prog(f"Show {i}", 30 * i, 30) for i in range(-48, 48)] for c in range(100)}
+        gen = epg_store.publish_generation(db_path, "T", [], epg)
+        opened = db_pool.stats()["epg.db"]["opened"]
+        for i in range(1000):
+            at, cid = T0 + timedelta(minutes=i % 600), f"ch{i % 100}"
+            assert epg_store.current_programme(db_path, gen, cid, at) is not None
+            epg_store.upcoming_programmes(db_path, gen, cid, at, limit=2)
+        assert db_pool.stats()["epg.db"]["opened"] == opened
+
+    def test_window_query_uses_index(self, db_path):
+        gen = epg_store.publish_generation(db_path, "T", [], _epg())
+        with sqlite3.connect(db_path) as conn:
+            plan = " ".join(str(r) for r in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT * FROM programmes "
+                "WHERE generation=? AND channel_id=? AND start >= ? AND start <= ? AND stop >= ?",
+                (gen["id"], "ch1", 0, 1, 1),
+            ))
+        assert "idx_programmes_channel_range" in plan
+
+
+# ─── App integration ─────────────────────────────────────────────────────────
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "DATABASE", str(tmp_path / "users_test.db"))
+    monkeypatch.setattr(app_module, "TUNER_DB", str(tmp_path / "tuners_test.db"))
+    monkeypatch.setattr(app_module, "EPG_DB", str(tmp_path / "epg_test.db"))
+    monkeypatch.setattr(app_module, "cached_channels", [])
+    monkeypatch.setattr(app_module, "_epg_generation", None)
+    init_db()
+    init_tuners_db()
+    add_user("admin", "adminpass")
+    app.config["TESTING"] = True
+    with app.test_client() as c:
+        c.post("/login", data={"username": "admin", "password": "adminpass"})
+        yield c
+
+
+class TestAppUsesStore:
+    def test_publish_for_active_tuner_swaps_memory_state(self, client):
+        channels = [{"tvg_id": "ch1", "name": "One"}]
+        gen = app_module.publish_tuner_data("Tuner 1", channels, _epg())
+        assert app_module.cached_channels is channels
+        assert app_module._epg_generation["id"] == gen["id"]
+
+    def test_publish_for_inactive_tuner_leaves_memory_state(self, client):
+        app_module.publish_tuner_data("Tuner 2", [{"tvg_id": "x"}], {})
+        assert app_module.cached_channels == []
+        assert app_module._epg_generation is None
+
+    def test_restore_tuner_data(self, client):
+        app_module.publish_tuner_data("Tuner 2", [{"tvg_id": "ch1"}], _epg())
+        assert app_module.restore_tuner_data("Tuner 2") is True
+        assert app_module.cached_channels == [{"tvg_id": "ch1"}]
+        assert app_module.restore_tuner_data("Missing") is False
+
+    def test_guide_snapshot_reads_window(self, client):
+        now = datetime.now(timezone.utc)
+        app_module.publish_tuner_data("Tuner 1", [{"tvg_id": "ch1", "name": "One"}], {
+            "ch1": [{"title": "On Now", "desc": "", "start": now - timedelta(minutes=5),
+                     "stop": now + timedelta(minutes=30)},
+                    {"title": "Next Week", "desc": "", "start": now + timedelta(days=7),
+                     "stop": now + timedelta(days=7, minutes=30)}],
+        })
+        body = client.get("/api/guide_snapshot").get_json()
+        ch = next(c for c in body["channels"] if c["name"] == "One")
+        titles = [p["title"] for p in ch["programs"]]
+        assert titles == ["On Now"]
+
+    def test_guide_rows_precompute_layout(self):
+        grid_start = T0
+        now = T0 + timedelta(minutes=10)
+        rows = app_module._guide_rows({
+            "ch1": [_prog("Running", -30, 60, categories=["News", "Local"]), _prog("Short", 30, 2)],
+            "ch2": [{"title": "No Guide Data Available", "start": None, "stop": None}],
+            "ch3": [],
+        }, grid_start, now)
+        running, short = rows["ch1"]
+        assert running["left"] == -30 * app_module.SCALE
+        assert running["width"] == 60 * app_module.SCALE
+        assert running["now"] is True and short["now"] is False
+        assert running["categories"] == "News | Local"
+        assert running["start"] == (T0 - timedelta(minutes=30)).isoformat()
+        assert short["width"] == app_module.GUIDE_MIN_BLOCK_PX
+        assert rows["ch2"][0]["placeholder"] is True
+        assert rows["ch3"][0]["placeholder"] is True
+
+    def test_guide_renders_only_the_visible_window(self, client):
+        now = datetime.now(timezone.utc)
+        app_module.publish_tuner_data("Tuner 1", [{"tvg_id": "ch1", "name": "One"}], {
+            "ch1": [{"title": "On Now", "desc": "", "start": now - timedelta(minutes=5),
+                     "stop": now + timedelta(minutes=30)},
+                    {"title": "Next Week", "desc": "", "start": now + timedelta(days=7),
+                     "stop": now + timedelta(days=7, minutes=30)}],
+        })
+        html = client.get("/guide").get_data(as_text=True)
+        assert 'data-title="On Now"' in html
+        assert "Next Week" not in html
+
+    def test_guide_rows_are_cached_per_slot_and_generation(self, client):
+        now = datetime.now(timezone.utc)
+        channels = [{"tvg_id": f"ch{i}", "name": f"Ch {i}"} for i in range(3)]
+        epg = {c["tvg_id"]: [{"title": "All Day", "desc": "", "start": now - timedelta(hours=1),
+                              "stop": now + timedelta(hours=12)}] for c in channels}
+        app_module.publish_tuner_data("Tuner 1", channels, epg)
+        cache = app_module._guide_row_cache
+        first = client.get("/guide").get_data(as_text=True)
+        renders = cache.renders
+        second = client.get("/guide").get_data(as_text=True)
+        assert cache.renders == renders
+        assert first.count('data-title="All Day"') == second.count('data-title="All Day"') == 3
+
+        epg["ch0"] = [{"title": "Changed", "desc": "", "start": now - timedelta(hours=1),
+                       "stop": now + timedelta(hours=12)}]
+        app_module.publish_tuner_data("Tuner 1", channels, epg)
+        assert 'data-title="Changed"' in client.get("/guide").get_data(as_text=True)
+
+    def test_guide_row_rerenders_when_now_highlight_moves(self, client):
+        grid_start = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+        app_module.publish_tuner_data("Tuner 1", [{"tvg_id": "ch1", "name": "One"}], {
+            "ch1": [{"title": "Early", "desc": "", "start": grid_start,
+                     "stop": grid_start + timedelta(minutes=10)},
+                    {"title": "Later", "desc": "", "start": grid_start + timedelta(minutes=10),
+                     "stop": grid_start + timedelta(minutes=30)}],
+        })
+        with app.app_context():
+            at_start = app_module._tuner_guide_rows(grid_start, grid_start + timedelta(minutes=1), 0)[0]
+            same = app_module._tuner_guide_rows(grid_start, grid_start + timedelta(minutes=5), 0)[0]
+            moved = app_module._tuner_guide_rows(grid_start, grid_start + timedelta(minutes=15), 0)[0]
+        assert same is at_start
+        assert 'program now"' in at_start.split('data-title="Early"')[0]
+        assert 'program now"' in moved.split('data-title="Early"')[1]
+
+    def test_next_slot_is_prewarmed(self, client):
+        app_module.publish_tuner_data("Tuner 1", [{"tvg_id": "ch1", "name": "One"}], {})
+        now = datetime(2026, 1, 1, 12, 28, tzinfo=timezone.utc)
+        next_start = app_module._warm_next_guide_slot(now)
+        assert next_start == datetime(2026, 1, 1, 12, 30, tzinfo=timezone.utc)
+        renders = app_module._guide_row_cache.renders
+        with app.app_context():
+            offset = len(app_module._enabled_virtual_channels())
+            app_module._tuner_guide_rows(next_start, next_start + timedelta(minutes=1), offset)
+        assert app_module._guide_row_cache.renders == renders
+
+    def test_guide_snapshot_pages_through_all_channels(self, client):
+        channels = [{"tvg_id": f"ch{i}", "name": f"Ch {i}"} for i in range(120)]
+        app_module.publish_tuner_data("Tuner 1", channels, {})
+        first = client.get("/api/guide_snapshot").get_json()
+        assert len(first["channels"]) == 50
+        assert first["paging"] == {"offset": 0, "limit": 50, "total": 120, "next_offset": 50}
+        last = client.get("/api/guide_snapshot?offset=100&limit=50").get_json()
+        assert [c["name"] for c in last["channels"]] == [f"Ch {i}" for i in range(100, 120)]
+        assert last["paging"]["next_offset"] is None
+
+    def test_guide_snapshot_is_built_once_per_window(self, client):
+        app_module.publish_tuner_data("Tuner 1", [{"tvg_id": "ch1", "name": "One"}], {})
+        cache = app_module._guide_snapshot_cache
+        client.get("/api/guide_snapshot?hours=2")
+        builds = cache.builds
+        client.get("/api/guide_snapshot?hours=2.1&offset=0&limit=10")
+        assert cache.builds == builds
+        client.get("/api/guide_snapshot?hours=3")
+        assert cache.builds == builds + 1
+        app_module.publish_tuner_data("Tuner 1", [{"tvg_id": "ch2", "name": "Two"}], {})
+        body = client.get("/api/guide_snapshot?hours=2").get_json()
+        assert [c["name"] for c in body["channels"]] == ["Two"]
+
+    def test_cache_state_counts_come_from_store(self, client):
+        from utils.health_checks import check_cache_state
+
+        app_module.publish_tuner_data("Tuner 1", [{"tvg_id": "ch1"}], _epg())
+        state = check_cache_state(app_module.TUNER_DB)
+        assert state["epg_channel_count"] == 2
+        assert state["epg_entry_count"] == 4
+        assert state["epg_generation"] == app_module._epg_generation["id"]
+        assert state["compact_bytes_per_programme"] < state["legacy_bytes_per_programme"]
+
+    def test_find_channel_by_id_and_number(self, client):
+        channels = [{"tvg_id": "ch1", "name": "One", "number": "101"},
+                    {"tvg_id": "ch2", "name": "Two", "number": "7"},
+                    {"tvg_id": "101", "name": "Id clash", "tvg_chno": "5"}]
+        app_module.publish_tuner_data("Tuner 1", channels, {})
+        assert app_module.find_channel("ch1")["name"] == "One"
+        assert app_module.find_channel("101")["name"] == "One"
+        assert app_module.find_channel("7")["name"] == "Two"
+        assert app_module.find_channel("5") is None
+        assert app_module.find_channel("missing") is None
+        # The index follows a swapped channel list.
+        app_module.cached_channels = [{"tvg_id": "ch3", "name": "Three"}]
+        assert app_module.find_channel("ch3")["name"] == "Three"
+        assert app_module.find_channel("ch1") is None
+
+    def test_current_program_next(self, client):
+        now = datetime.now(timezone.utc)
+        app_module.publish_tuner_data("Tuner 1", [{"tvg_id": "ch1", "name": "One"}], {
+            "ch1": [{"title": "On Now", "desc": "", "start": now - timedelta(minutes=5),
+                     "stop": now + timedelta(minutes=30)},
+                    {"title": "Up Next", "desc": "", "start": now + timedelta(minutes=30),
+                     "stop": now + timedelta(minutes=60)}],
+        })
+        body = client.get("/api/current_program?tvg_id=ch1&next=3").get_json()
+        assert body["program"]["title"] == "On Now"
+        assert [p["title"] for p in body["next"]] == ["Up Next"]
+        assert "next" not in client.get("/api/current_program?tvg_id=ch1").get_json()
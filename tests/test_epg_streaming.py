@@ -0,0 +1,331 @@
+"""Tests for the streaming XMLTV ingest path (utils/xmltv.py + app.parse_epg),
+including transparent gzip / xz / bz2 decompression."""
+import bz2
+import gzip
+import lzma
+import os
+import sys
+from datetime import datetime, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import parse_epg
+from utils.xmltv import (
+    MAX_DECOMPRESSED_PIECE,
+    ChunkReader,
+    decompressed_chunks,
+    detect_compression,
+    iter_epg_elements,
+    parse_time,
+)
+
+
+XMLTV = b"""<?xml version="1.0" encoding="UTF-8"?>
+<tv generator-info-name="test">
+  <channel id="ch1"><display-name>Channel One</display-name></channel>
+  <channel id="ch2"><display-name>Channel Two</display-name></channel>
+  <programme channel="ch1" start="20260101010000 +0000" stop="20260101020000 +0000">
+    <title>Morning Show</title>
+    <desc>Wake up</desc>
+    <icon src="http://example.test/a.png"/>
+  </programme>
+  <programme channel="ch1" start="20260101020000 +0000" stop="20260101030000 +0000">
+    <title>Midday News</title>
+  </programme>
+  <programme channel="ch3" start="20260101010000 +0000" stop="20260101013000 +0000">
+    <title>Orphan</title>
+  </programme>
+</tv>
+"""
+
+
+class _StreamingResponse:
+    """Mimics the parts of requests.Response used by the streaming parser."""
+
+    def __init__(self, content: bytes, status_ok: bool = True, headers=None):
+        self.content = content
+        self.headers = headers or {}
+        self.status_ok = status_ok
+        self.closed = False
+        self.requested_chunk_size = None
+
+    def raise_for_status(self):
+        if not self.status_ok:
+            raise app_module.requests.HTTPError("500")
+
+    def iter_content(self, chunk_size=1):
+        self.requested_chunk_size = chunk_size
+        # Serve deliberately tiny chunks so elements straddle chunk boundaries.
+        for i in range(0, len(self.content), 7):
+            yield self.content[i:i + 7]
+
+    def close(self):
+        self.closed = True
+
+
+class TestChunkReader:
+    def test_reads_across_chunk_boundaries(self):
+        reader = ChunkReader([b"ab", b"", b"cde", b"f"])
+        assert reader.read(3) == b"abc"
+        assert reader.read(10) == b"def"
+        assert reader.read(10) == b""
+
+    def test_read_all(self):
+        reader = ChunkReader([b"ab", b"cd"])
+        assert reader.read(1) == b"a"
+        assert reader.read() == b"bcd"
+
+
+class TestIterEpgElements:
+    def test_yields_channels_and_programmes_in_document_order(self):
+        tags = [e.tag for e in iter_epg_elements(ChunkReader([XMLTV]))]
+        assert tags == ["channel", "channel", "programme", "programme", "programme"]
+
+    def test_root_does_not_accumulate_children(self):
+        gen = iter_epg_elements(ChunkReader([XMLTV]))
+        first = next(gen)
+        for _ in gen:
+            pass
+        # After exhaustion the first element has been cleared from the tree.
+        assert len(first) == 0 and not first.attrib
+
+    def test_malformed_document_raises(self):
+        import xml.etree.ElementTree as ET
+        with pytest.raises(ET.ParseError):
+            list(iter_epg_elements(ChunkReader([b"<tv><programme></tv>"])))
+
+
+class TestParseEpgStreaming:
+    def test_parse_epg_streams_response(self, monkeypatch):
+        captured = {}
+        resp = _StreamingResponse(XMLTV)
+
+        def fake_get(url, **kwargs):
+            captured.update(kwargs)
+            return resp
+
+        monkeypatch.setattr(app_module.requests, "get", fake_get)
+        epg = parse_epg("http://example.test/guide.xml")
+
+        assert captured.get("stream") is True
+        assert resp.requested_chunk_size and resp.requested_chunk_size > 7
+        assert resp.closed is True
+        assert set(epg) == {"ch1", "ch2", "ch3"}
+        assert epg["ch2"] == []
+        assert [p["title"] for p in epg["ch1"]] == ["Morning Show", "Midday News"]
+        first = epg["ch1"][0]
+        assert first["desc"] == "Wake up"
+        assert first["icon"] == "http://example.test/a.png"
+        assert first["start"] == datetime(2026, 1, 1, 1, 0, tzinfo=timezone.utc)
+        assert first["stop"] == datetime(2026, 1, 1, 2, 0, tzinfo=timezone.utc)
+        assert first["categories"] == () and first["colors"] == ()
+
+    def test_malformed_feed_returns_empty_dict(self, monkeypatch):
+        resp = _StreamingResponse(XMLTV[:-40])
+        monkeypatch.setattr(app_module.requests, "get", lambda *_a, **_k: resp)
+        assert parse_epg("http://example.test/guide.xml") == {}
+        assert resp.closed is True
+
+    def test_http_error_returns_empty_dict(self, monkeypatch):
+        resp = _StreamingResponse(XMLTV, status_ok=False)
+        monkeypatch.setattr(app_module.requests, "get", lambda *_a, **_k: resp)
+        assert parse_epg("http://example.test/guide.xml") == {}
+
+
+class TestCompressedFeeds:
+    """gzip / xz / bz2 XMLTV payloads are unwrapped chunk by chunk."""
+
+    @pytest.mark.parametrize("compress", [
+        gzip.compress,
+        lzma.compress,
+        bz2.compress,
+    ], ids=["gzip", "xz", "bz2"])
+    def test_parse_epg_decompresses_by_magic_bytes(self, monkeypatch, compress):
+        resp = _StreamingResponse(compress(XMLTV))
+        monkeypatch.setattr(app_module.requests, "get", lambda *_a, **_k: resp)
+        epg = parse_epg("http://example.test/guide.xml.gz")
+        assert [p["title"] for p in epg["ch1"]] == ["Morning Show", "Midday News"]
+
+    def test_content_encoding_selects_codec(self):
+        assert detect_compression(b"\x00\x00", "xz") == "xz"
+        assert detect_compression(b"\x00\x00", "x-bzip2") == "bz2"
+        # gzip Content-Encoding is decoded by requests itself, so plain XML stays plain.
+        assert detect_compression(b"<?xml", "gzip") is None
+
+    def test_plain_xml_passes_through(self):
+        assert b"".join(decompressed_chunks([XMLTV[:3], XMLTV[3:]])) == XMLTV
+
+    def test_concatenated_gzip_members(self):
+        half = len(XMLTV) // 2
+        blob = gzip.compress(XMLTV[:half]) + gzip.compress(XMLTV[half:])
+        pieces = [blob[i:i + 5] for i in range(0, len(blob), 5)]
+        assert b"".join(decompressed_chunks(pieces)) == XMLTV
+
+    def test_output_is_bounded_per_piece(self):
+        blob = gzip.compress(b"x" * (3 * MAX_DECOMPRESSED_PIECE + 10))
+        pieces = list(decompressed_chunks([blob]))
+        assert max(len(p) for p in pieces) <= MAX_DECOMPRESSED_PIECE
+        assert sum(len(p) for p in pieces) == 3 * MAX_DECOMPRESSED_PIECE + 10
+
+    def test_tuner_diag_analyses_gzip_feed(self, monkeypatch):
+        from utils import tuner_diag
+
+        monkeypatch.setattr(tuner_diag, "_check_dns", lambda url: {"ok": True})
+        monkeypatch.setattr(tuner_diag, "_fetch_url", lambda url, timeout=15: {
+            "ok": True, "raw_bytes": gzip.compress(XMLTV), "content_type": "application/gzip",
+            "content_encoding": None,
+        })
+        trace = tuner_diag._trace_xmltv("http://example.test/guide.xml.gz")
+        assert trace["compression"] == "gzip"
+        assert trace["parse"]["valid_xmltv"] is True
+        assert trace["parse"]["programme_count"] == 3
+
+
+class TestIngestFilters:
+    """Channel and retention-window filtering applied during the streaming parse."""
+
+    def _parse(self, monkeypatch, **kwargs):
+        resp = _StreamingResponse(XMLTV)
+        monkeypatch.setattr(app_module.requests, "get", lambda *_a, **_k: resp)
+        return parse_epg("http://example.test/guide.xml", **kwargs)
+
+    def test_unknown_channels_are_dropped(self, monkeypatch):
+        epg = self._parse(monkeypatch, channel_ids={"ch1"})
+        assert set(epg) == {"ch1"}
+        assert len(epg["ch1"]) == 2
+
+    def test_window_drops_programmes_outside(self, monkeypatch):
+        window = (datetime(2026, 1, 1, 2, 0, tzinfo=timezone.utc),
+                  datetime(2026, 1, 1, 3, 0, tzinfo=timezone.utc))
+        epg = self._parse(monkeypatch, window=window)
+        # "Morning Show" ends exactly at lo; "Orphan" ends before it.
+        assert [p["title"] for p in epg["ch1"]] == ["Midday News"]
+        assert "ch3" not in epg
+
+    def test_open_ended_window(self, monkeypatch):
+        window = (None, datetime(2026, 1, 1, 2, 0, tzinfo=timezone.utc))
+        epg = self._parse(monkeypatch, window=window)
+        assert [p["title"] for p in epg["ch1"]] == ["Morning Show"]
+
+    def test_filtered_programmes_are_never_converted(self, monkeypatch):
+        converted = []
+        original = app_module._programme_from_element
+
+        def spy(elem, *args):
+            converted.append(elem.attrib.get("channel"))
+            return original(elem, *args)
+
+        monkeypatch.setattr(app_module, "_programme_from_element", spy)
+        self._parse(monkeypatch, channel_ids={"ch2"})
+        assert converted == []
+
+
+class TestXmltvTime:
+    def _utc(self, *args):
+        return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+    def test_offsets_are_applied(self):
+        assert parse_time("20260101120000 +0000") == self._utc(2026, 1, 1, 12)
+        assert parse_time("20260101120000 +0200") == self._utc(2026, 1, 1, 10)
+        assert parse_time("20260101003000 -0530") == self._utc(2026, 1, 1, 6)
+        assert parse_time("20260101120000 +02:00") == self._utc(2026, 1, 1, 10)
+
+    @pytest.mark.parametrize("value", [
+        "20260101140000+0200", "20260101140000+02:00", "20260101140000 +02:00",
+    ])
+    def test_offsets_without_space(self, value):
+        assert parse_time(value) == self._utc(2026, 1, 1, 12)
+
+    def test_negative_offset_without_space(self):
+        assert parse_time("20260101070000-0500") == self._utc(2026, 1, 1, 12)
+
+    @pytest.mark.parametrize("value", [
+        "20260101120000 UTC", "20260101120000Z", "20260101120000 GMT",
+        "20260101120000 0200", "20260101120000 +2", "202601011200000",
+    ])
+    def test_unknown_suffix_is_utc(self, value):
+        assert parse_time(value) == self._utc(2026, 1, 1, 12)
+
+    def test_missing_offset_and_short_forms_are_utc(self):
+        assert parse_time("20260101120000") == self._utc(2026, 1, 1, 12)
+        assert parse_time("202601011230") == self._utc(2026, 1, 1, 12, 30)
+        assert parse_time("20240229235959 +0000") == self._utc(2024, 2, 29, 23, 59, 59)
+
+    @pytest.mark.parametrize("value", [
+        None, "", "2026", "2026010112000x", "20261301120000", "20250229120000",
+        "20260101250000", "202601011", "20260101123 +0200",
+    ])
+    def test_malformed_values(self, value):
+        assert parse_time(value) is None
+
+    def test_parse_epg_uses_offsets(self, monkeypatch):
+        xml = (b'<tv><programme channel="ch1" start="20260101120000 +0200" '
+               b'stop="20260101130000 +0200"><title>Noon Local</title></programme></tv>')
+        monkeypatch.setattr(app_module.requests, "get", lambda *_a, **_k: _StreamingResponse(xml))
+        prog = parse_epg("http://example.test/guide.xml")["ch1"][0]
+        assert prog["start"] == datetime(2026, 1, 1, 10, tzinfo=timezone.utc)
+        # The retention window is compared in UTC too.
+        window = (datetime(2026, 1, 1, 11, 0, tzinfo=timezone.utc), None)
+        monkeypatch.setattr(app_module.requests, "get", lambda *_a, **_k: _StreamingResponse(xml))
+        assert parse_epg("http://example.test/guide.xml", window=window) == {}
+
+    def test_tuner_diag_range_is_utc(self):
+        from utils.tuner_diag import _analyse_xmltv_bytes
+
+        xml = (b'<tv><channel id="a"/>'
+               b'<programme channel="a" start="20260101090000 +0000" stop="20260101100000 +0000"/>'
+               b'<programme channel="a" start="20260101100000 +0200" stop="20260101110000 +0200"/>'
+               b'</tv>')
+        result = _analyse_xmltv_bytes(xml)
+        assert result["earliest_programme"] == "20260101080000 +0000"
+        assert result["latest_programme"] == "20260101090000 +0000"
+
+
+class TestRetentionSettings:
+    @pytest.fixture(autouse=True)
+    def isolated_db(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(app_module, "DATABASE", str(tmp_path / "users_test.db"))
+        monkeypatch.setattr(app_module, "TUNER_DB", str(tmp_path / "tuners_test.db"))
+        app_module.init_db()
+        app_module.init_tuners_db()
+
+    def test_defaults(self):
+        assert app_module.get_epg_retention("Tuner 1") == (
+            app_module.EPG_LOOKBACK_DEFAULT, app_module.EPG_LOOKAHEAD_DEFAULT)
+
+    def test_default_keeps_all_upcoming_programmes(self):
+        now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        lo, hi = app_module.epg_ingest_window("Tuner 1", now)
+        assert (now - lo).total_seconds() == app_module.EPG_LOOKBACK_DEFAULT * 3600
+        assert hi is None
+
+    def test_stored_values_and_entire_feed(self):
+        app_module.set_setting("epg_lookback_hours:Tuner 1", "")
+        app_module.set_setting("epg_lookahead_hours:Tuner 1", "72")
+        assert app_module.get_epg_retention("Tuner 1") == (None, 72)
+        now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        lo, hi = app_module.epg_ingest_window("Tuner 1", now)
+        assert lo is None and (hi - now).total_seconds() == 72 * 3600
+
+    def test_unknown_value_falls_back_to_default(self):
+        app_module.set_setting("epg_lookahead_hours:Tuner 1", "5")
+        assert app_module.get_epg_retention("Tuner 1")[1] == app_module.EPG_LOOKAHEAD_DEFAULT
+
+    def test_change_tuner_form_saves_retention(self):
+        app_module.add_user("admin", "adminpass")
+        app_module.app.config["TESTING"] = True
+        with app_module.app.test_client() as client:
+            client.post("/login", data={"username": "admin", "password": "adminpass"})
+            client.post("/change_tuner", data={
+                "action": "update_epg_retention", "tuner": "Tuner 2",
+                "epg_lookback_hours": "6", "epg_lookahead_hours": "",
+            })
+            client.post("/change_tuner", data={
+                "action": "update_epg_retention", "tuner": "Tuner 1",
+                "epg_lookback_hours": "999", "epg_lookahead_hours": "24",
+            })
+        assert app_module.get_epg_retention("Tuner 2") == (6, None)
+        assert app_module.get_setting("epg_lookahead_hours:Tuner 1") is None
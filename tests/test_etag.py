@@ -0,0 +1,96 @@
+"""Tests for the ETag / 304 validators on the guide and JSON endpoints, driven
+by the global data generation counter in app.py."""
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app, init_db, init_tuners_db, add_user
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "DATABASE", str(tmp_path / "users_test.db"))
+    monkeypatch.setattr(app_module, "TUNER_DB", str(tmp_path / "tuners_test.db"))
+    monkeypatch.setattr(app_module, "EPG_DB", str(tmp_path / "epg_test.db"))
+    monkeypatch.setattr(app_module, "cached_channels", [])
+    monkeypatch.setattr(app_module, "_epg_generation", None)
+    init_db()
+    init_tuners_db()
+    add_user("admin", "adminpass")
+    app.config["TESTING"] = True
+    with app.test_client() as c:
+        c.post("/login", data={"username": "admin", "password": "adminpass"})
+        now = datetime.now(timezone.utc)
+        app_module.publish_tuner_data("Tuner 1", [{"tvg_id": "ch1", "name": "One"}], {
+            "ch1": [{"title": "On Now", "desc": "", "start": now - timedelta(minutes=5),
+                     "stop": now + timedelta(minutes=30)}],
+        })
+        yield c
+
+
+ENDPOINTS = [
+    "/api/channels",
+    "/api/guide_snapshot",
+    "/api/current_program?tvg_id=ch1&next=2",
+    "/api/overlay/settings",
+    "/guide",
+]
+
+
+@pytest.mark.parametrize("url", ENDPOINTS)
+def test_matching_etag_gets_304(client, url):
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert "no-cache" in first.headers["Cache-Control"]
+
+    again = client.get(url, headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+
+
+def test_snapshot_etag_covers_the_requested_page(client):
+    etag = client.get("/api/guide_snapshot").headers["ETag"]
+    other = client.get("/api/guide_snapshot?offset=50", headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    assert other.headers["ETag"] != etag
+
+
+def test_refresh_changes_etag(client):
+    etag = client.get("/api/channels").headers["ETag"]
+    app_module.publish_tuner_data("Tuner 1", [{"tvg_id": "ch2", "name": "Two"}], {})
+    resp = client.get("/api/channels", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert [c["name"] for c in resp.get_json()["channels"]] == ["Two"]
+
+
+def test_settings_changes_etag(client):
+    etag = client.get("/api/overlay/settings").headers["ETag"]
+    app_module.set_setting("overlay.text_color", "#ff0000")
+    assert client.get("/api/overlay/settings", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_per_user_writes_keep_shared_etags(client):
+    etag = client.get("/api/channels").headers["ETag"]
+    client.post("/api/user_prefs", json={"hidden_channels": ["ch1"]})
+    client.post("/play_channel", data={"channel_name": "One"})
+    assert client.get("/api/channels", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_user_prefs_change_guide_etag(client):
+    etag = client.get("/guide").headers["ETag"]
+    client.post("/api/user_prefs", json={"hidden_channels": ["ch1"]})
+    assert client.get("/guide", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_settings_store_writes_bump_generation(client):
+    before = app_module._data_generation
+    app_module._settings.set_many({"overlay.text_color": "#00ff00"})
+    assert app_module._data_generation > before
@@ -0,0 +1,125 @@
+"""Tests for the event bus (utils/event_bus.py) and the /api/events stream
+and long-poll endpoints."""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app, init_db, init_tuners_db, add_user
+from utils.event_bus import EventBus
+
+
+class TestEventBus:
+    def test_wait_returns_events_after_cursor(self):
+        bus = EventBus()
+        bus.publish("guide", {"generation": 1})
+        bus.publish("qr", {"visible": False})
+        events, cursor = bus.wait(0, timeout=0)
+        assert [e.topic for e in events] == ["guide", "qr"]
+        assert cursor == 2
+        assert bus.wait(cursor, timeout=0) == ([], 2)
+
+    def test_topic_prefix_and_cursor_skip_other_topics(self):
+        bus = EventBus()
+        bus.publish("qr", {"visible": False})
+        bus.publish("slot.news", {"feed_index": 1})
+        events, cursor = bus.wait(0, topics=["slot"], timeout=0)
+        assert [e.topic for e in events] == ["slot.news"]
+        bus.publish("qr", {"visible": True})
+        assert bus.wait(cursor, topics=["slot"], timeout=0) == ([], 3)
+
+    def test_only_if_changed(self):
+        bus = EventBus()
+        assert bus.publish("slot.nasa", {"image_index": 0}, only_if_changed=True)
+        assert bus.publish("slot.nasa", {"image_index": 0}, only_if_changed=True) is None
+        assert bus.last_id == 1
+
+    def test_cursor_outside_history_needs_resync(self):
+        bus = EventBus(history=2)
+        for i in range(4):
+            bus.publish("slot.traffic", {"slot": i})
+        assert bus.wait(1, timeout=0)[0] is None
+        assert bus.wait(99, timeout=0)[0] is None
+        events, cursor = bus.latest()
+        assert [e.data for e in events] == [{"slot": 3}] and cursor == 4
+
+    def test_wait_wakes_on_publish(self):
+        bus = EventBus()
+        timer = threading.Timer(0.05, bus.publish, ("guide", {"generation": 2}))
+        timer.start()
+        events, _ = bus.wait(0, timeout=5)
+        timer.join()
+        assert [e.data for e in events] == [{"generation": 2}]
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "DATABASE", str(tmp_path / "users_test.db"))
+    monkeypatch.setattr(app_module, "TUNER_DB", str(tmp_path / "tuners_test.db"))
+    monkeypatch.setattr(app_module, "EPG_DB", str(tmp_path / "epg_test.db"))
+    monkeypatch.setattr(app_module, "cached_channels", [])
+    monkeypatch.setattr(app_module, "_epg_generation", None)
+    monkeypatch.setattr(app_module, "_event_bus", EventBus())
+    monkeypatch.setattr(app_module, "crt_qr_visible", True)
+    monkeypatch.setattr(app_module, "qr_hide_time", None)
+    init_db()
+    init_tuners_db()
+    add_user("admin", "adminpass")
+    app.config["TESTING"] = True
+    with app.test_client() as c:
+        yield c
+
+
+class TestEventsApi:
+    def test_poll_without_cursor_returns_current_state(self, client):
+        app_module.publish_tuner_data("Tuner 1", [{"tvg_id": "ch1"}], {})
+        body = client.get("/api/events/poll?topics=guide").get_json()
+        assert body["resync"] is True
+        assert body["events"][0]["topic"] == "guide"
+        assert body["events"][0]["data"]["generation"] == app_module._epg_generation["id"]
+
+    def test_poll_returns_qr_flip(self, client):
+        cursor = client.get("/api/events/poll").get_json()["cursor"]
+        client.post("/api/qr_hide")
+        body = client.get(f"/api/events/poll?after={cursor}&topics=qr&timeout=0").get_json()
+        assert body["resync"] is False
+        assert [e["data"] for e in body["events"]] == [{"visible": False}]
+        idle = client.get(f"/api/events/poll?after={body['cursor']}&timeout=0").get_json()
+        assert idle["events"] == []
+
+    def test_slot_transitions_are_published_once(self, client):
+        now_ts = 1_700_000_000.0
+        app_module._publish_virtual_slots(now_ts)
+        _, cursor = app_module._event_bus.latest()
+        assert {"slot.traffic", "slot.nasa"} <= {e.topic for e in app_module._event_bus.latest()[0]}
+        app_module._publish_virtual_slots(now_ts + 1)
+        assert app_module._event_bus.wait(cursor, timeout=0)[0] == []
+        app_module._publish_virtual_slots(now_ts + 3600)
+        topics = {e.topic for e in app_module._event_bus.wait(cursor, timeout=0)[0]}
+        assert "slot.traffic" in topics
+
+    def test_nasa_slots_follow_the_overlay_rotation(self, client):
+        # 900 s / 7 images = 128 s each; the last image also gets the 4 s left over.
+        app_module.save_nasa_interval('15')
+        app_module.save_nasa_image_count(7)
+        cfg = app_module.get_nasa_config()
+        cycle_start = 1_700_000_100 // 900 * 900
+        seen = {}
+        for ts in range(cycle_start, cycle_start + 900, 2):
+            data = app_module._virtual_slot_states(ts)[0]["slot.nasa"]
+            assert data["image_index"] == app_module._nasa_image_slot(cfg, ts)[1]
+            seen.setdefault(data["slot"], set()).add(data["image_index"])
+        assert len(seen) == 7 and all(len(indexes) == 1 for indexes in seen.values())
+
+    def test_stream_sends_current_state_first(self, client):
+        app_module.publish_tuner_data("Tuner 1", [{"tvg_id": "ch1"}], {})
+        resp = client.get("/api/events?topics=guide", buffered=False)
+        assert resp.mimetype == "text/event-stream"
+        chunks = iter(resp.response)
+        assert next(chunks).startswith(b"retry:")
+        assert next(chunks).startswith(b"id: ")
+        resp.close()
@@ -0,0 +1,204 @@
+"""Tests for the on-disk feed cache with conditional GET (utils/feed_cache.py)
+and its use by refresh_current_tuner to skip re-parsing unchanged feeds."""
+import hashlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import init_db, init_tuners_db
+from utils import feed_cache
+
+
+M3U = """#EXTM3U
+#EXTINF:-1 tvg-id="ch1" tvg-logo="" group-title="News",Channel One
+http://example.test/ch1.m3u8
+"""
+
+XMLTV = b"""<?xml version="1.0" encoding="UTF-8"?>
+<tv>
+  <channel id="ch1"><display-name>Channel One</display-name></channel>
+  <programme channel="ch1" start="20260101010000 +0000" stop="20260101020000 +0000">
+    <title>Morning Show</title>
+  </programme>
+</tv>
+"""
+
+
+class _Response:
+    """Mimics the parts of requests.Response used by the feed cache."""
+
+    def __init__(self, content=b"", status_code=200, headers=None, encoding=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.encoding = encoding
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise app_module.requests.HTTPError(str(self.status_code))
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), 5):
+            yield self.content[i:i + 5]
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeServer:
+    """Serves fixed bodies per URL and honours If-None-Match."""
+
+    def __init__(self, bodies, etags=None):
+        self.bodies = bodies
+        self.etags = etags or {}
+        self.requests = []
+
+    def get(self, url, **kwargs):
+        headers = kwargs.get("headers") or {}
+        self.requests.append((url, headers))
+        etag = self.etags.get(url)
+        if etag and headers.get("If-None-Match") == etag:
+            return _Response(status_code=304)
+        return _Response(self.bodies[url], headers={"ETag": etag} if etag else {},
+                         encoding="utf-8")
+
+
+@pytest.fixture()
+def cache_dir(tmp_path):
+    path = tmp_path / "xmltv"
+    path.mkdir()
+    return str(path)
+
+
+class TestRevalidate:
+    def test_first_fetch_stores_body_and_validators(self, cache_dir, monkeypatch):
+        server = _FakeServer({"http://x/g.xml": XMLTV}, etags={"http://x/g.xml": '"v1"'})
+        monkeypatch.setattr(app_module.requests, "get", server.get)
+        result = feed_cache.revalidate(cache_dir, "http://x/g.xml")
+        assert result.not_modified is False
+        assert b"".join(feed_cache.iter_body(result)) == XMLTV
+        assert feed_cache.load_meta(cache_dir, "http://x/g.xml")["etag"] == '"v1"'
+        assert server.requests[0][1] == {}
+
+    def test_304_reuses_cached_body(self, cache_dir, monkeypatch):
+        server = _FakeServer({"http://x/g.xml": XMLTV}, etags={"http://x/g.xml": '"v1"'})
+        monkeypatch.setattr(app_module.requests, "get", server.get)
+        first = feed_cache.revalidate(cache_dir, "http://x/g.xml")
+        second = feed_cache.revalidate(cache_dir, "http://x/g.xml")
+        assert server.requests[1][1] == {"If-None-Match": '"v1"'}
+        assert second.not_modified is True
+        assert second.sha256 == first.sha256
+
+    def test_same_content_without_validators_keeps_hash(self, cache_dir, monkeypatch):
+        server = _FakeServer({"http://x/p.m3u": M3U.encode()})
+        monkeypatch.setattr(app_module.requests, "get", server.get)
+        first = feed_cache.revalidate(cache_dir, "http://x/p.m3u")
+        second = feed_cache.revalidate(cache_dir, "http://x/p.m3u")
+        assert second.not_modified is False
+        assert second.sha256 == first.sha256
+        assert feed_cache.read_text(second) == M3U
+
+    def test_failed_fetch_falls_back_to_cached_body(self, cache_dir, monkeypatch):
+        server = _FakeServer({"http://x/g.xml": XMLTV})
+        monkeypatch.setattr(app_module.requests, "get", server.get)
+        first = feed_cache.revalidate(cache_dir, "http://x/g.xml")
+        monkeypatch.setattr(app_module.requests, "get",
+                            lambda *_a, **_k: _Response(status_code=503))
+        result = feed_cache.revalidate(cache_dir, "http://x/g.xml")
+        assert result.not_modified is True
+        assert result.sha256 == first.sha256
+
+    def test_cached_reads_body_without_network(self, cache_dir, monkeypatch):
+        server = _FakeServer({"http://x/g.xml": XMLTV})
+        monkeypatch.setattr(app_module.requests, "get", server.get)
+        first = feed_cache.revalidate(cache_dir, "http://x/g.xml")
+        result = feed_cache.cached(cache_dir, "http://x/g.xml")
+        assert len(server.requests) == 1
+        assert result.not_modified is True and result.sha256 == first.sha256
+        assert feed_cache.cached(cache_dir, "http://x/other.xml").path is None
+
+    def test_overlapping_fetches_do_not_share_a_temp_file(self, cache_dir, monkeypatch):
+        url = "http://x/g.xml"
+        bodies = [XMLTV, XMLTV.replace(b"Morning", b"Evening")]
+
+        class _Overlapping(_Response):
+            def iter_content(self, chunk_size=1):
+                yield self.content[:10]
+                if bodies:
+                    # A second refresh of the same URL runs mid-download.
+                    feed_cache.revalidate(cache_dir, url)
+                yield self.content[10:]
+
+        monkeypatch.setattr(app_module.requests, "get",
+                            lambda *_a, **_k: _Overlapping(bodies.pop(0)))
+        result = feed_cache.revalidate(cache_dir, url)
+        body = b"".join(feed_cache.iter_body(result))
+        assert body == XMLTV
+        assert feed_cache.load_meta(cache_dir, url)["sha256"] == hashlib.sha256(body).hexdigest()
+        assert not [n for n in os.listdir(cache_dir) if n.endswith(".tmp")]
+
+    def test_failed_first_fetch_has_no_body(self, cache_dir, monkeypatch):
+        def boom(*_a, **_k):
+            raise app_module.requests.ConnectionError("down")
+        monkeypatch.setattr(app_module.requests, "get", boom)
+        result = feed_cache.revalidate(cache_dir, "http://x/g.xml")
+        assert result.path is None and result.sha256 is None
+        assert list(feed_cache.iter_body(result)) == []
+
+
+class TestRefreshSkipsUnchangedFeeds:
+    @pytest.fixture()
+    def tuner(self, tmp_path, monkeypatch, cache_dir):
+        monkeypatch.setattr(app_module, "DATABASE", str(tmp_path / "users_test.db"))
+        monkeypatch.setattr(app_module, "TUNER_DB", str(tmp_path / "tuners_test.db"))
+        monkeypatch.setattr(app_module, "EPG_DB", str(tmp_path / "epg_test.db"))
+        monkeypatch.setattr(app_module, "FEED_CACHE_DIR", cache_dir)
+        monkeypatch.setattr(app_module, "cached_channels", [])
+        monkeypatch.setattr(app_module, "_epg_generation", None)
+        init_db()
+        init_tuners_db()
+        app_module.update_tuner_urls("Tuner 1", "http://x/g.xml", "http://x/p.m3u")
+        # The fixture guide is dated in the past; keep the whole feed.
+        app_module.set_setting("epg_lookback_hours:Tuner 1", "")
+        app_module.set_setting("epg_lookahead_hours:Tuner 1", "")
+        server = _FakeServer(
+            {"http://x/g.xml": XMLTV, "http://x/p.m3u": M3U.encode()},
+            etags={"http://x/g.xml": '"v1"'},
+        )
+        monkeypatch.setattr(app_module.requests, "get", server.get)
+        return server
+
+    def test_unchanged_feeds_are_not_reparsed(self, tuner, monkeypatch):
+        assert app_module.refresh_current_tuner("Tuner 1") is True
+        first = app_module._epg_generation
+        assert [c["tvg_id"] for c in app_module.cached_channels] == ["ch1"]
+        assert first["programme_count"] == 1
+
+        def fail(*_a, **_k):
+            raise AssertionError("feed was re-parsed")
+        monkeypatch.setattr(app_module, "_programmes_from_chunks", fail)
+        monkeypatch.setattr(app_module, "_channels_from_m3u_lines", fail)
+
+        assert app_module.refresh_current_tuner("Tuner 1") is True
+        assert app_module._epg_generation["id"] == first["id"]
+
+    def test_retention_change_forces_reingest(self, tuner):
+        app_module.refresh_current_tuner("Tuner 1")
+        first = app_module._epg_generation
+        app_module.set_setting("epg_lookahead_hours:Tuner 1", "24")
+        app_module.refresh_current_tuner("Tuner 1")
+        assert app_module._epg_generation["id"] != first["id"]
+
+    def test_changed_feed_publishes_new_generation(self, tuner):
+        app_module.refresh_current_tuner("Tuner 1")
+        first = app_module._epg_generation
+        tuner.bodies["http://x/p.m3u"] = (M3U + '#EXTINF:-1 tvg-id="ch2",Channel Two\n'
+                                          'http://example.test/ch2.m3u8\n').encode()
+        app_module.refresh_current_tuner("Tuner 1")
+        assert app_module._epg_generation["id"] != first["id"]
+        assert [c["tvg_id"] for c in app_module.cached_channels] == ["ch1", "ch2"]
@@ -0,0 +1,136 @@
+"""Tests for per-channel guide deltas (utils/guide_delta.py) and the
+/api/guide/delta endpoint."""
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app, init_db, init_tuners_db, add_user
+from utils.guide_delta import GuideDeltaLog, channel_hashes
+
+NOW = datetime.now(timezone.utc)
+
+
+def _prog(title, start_min=-5, length_min=30):
+    return {"title": title, "desc": "", "start": NOW + timedelta(minutes=start_min),
+            "stop": NOW + timedelta(minutes=start_min + length_min)}
+
+
+def _lineup(n):
+    return [{"tvg_id": f"ch{i}", "name": f"Ch {i}"} for i in range(n)]
+
+
+def _guide(n, **overrides):
+    epg = {f"ch{i}": [_prog(f"Show {i}")] for i in range(n)}
+    epg.update(overrides)
+    return epg
+
+
+class TestGuideDeltaLog:
+    def test_hash_covers_metadata_and_programmes(self):
+        base = channel_hashes(_lineup(2), _guide(2))
+        assert channel_hashes(_lineup(2), _guide(2)) == base
+        renamed = _lineup(2)
+        renamed[1]["name"] = "Renamed"
+        assert channel_hashes(renamed, _guide(2))["ch1"] != base["ch1"]
+        assert channel_hashes(_lineup(2), _guide(2, ch0=[_prog("Other")]))["ch0"] != base["ch0"]
+
+    def test_merges_deltas_since_a_generation(self):
+        log = GuideDeltaLog()
+        log.record("T", 1, _lineup(4), _guide(4))
+        log.record("T", 2, _lineup(4), _guide(4, ch1=[_prog("New")]))
+        log.record("T", 3, _lineup(3), _guide(3, ch1=[_prog("New")], ch2=[_prog("New")]))
+        assert log.since("T", 2) == {"generation": 3, "changed": {"ch2"}, "removed": {"ch3"}, "order": None}
+        assert log.since("T", 1)["changed"] == {"ch1", "ch2"}
+        assert log.since("T", 3)["changed"] == set()
+
+    def test_order_is_sent_when_lineup_is_reordered(self):
+        log = GuideDeltaLog()
+        log.record("T", 1, _lineup(2), _guide(2))
+        log.record("T", 2, list(reversed(_lineup(2))), _guide(2))
+        assert log.since("T", 1) == {"generation": 2, "changed": set(), "removed": set(),
+                                     "order": ["ch1", "ch0"]}
+
+    @staticmethod
+    def _half_hourly(first, last, retitle=None):
+        """ch0 with half-hour programmes from slot *first* to *last* around NOW."""
+        base = int(NOW.timestamp()) // 1800 * 1800
+        return {"ch0": [{"title": "Changed" if i == retitle else f"Show {i}", "desc": "",
+                         "start": datetime.fromtimestamp(base + i * 1800, timezone.utc),
+                         "stop": datetime.fromtimestamp(base + (i + 1) * 1800, timezone.utc)}
+                        for i in range(first, last)]}
+
+    def test_window_edges_do_not_mark_channels_changed(self):
+        now = int(NOW.timestamp())
+        log = GuideDeltaLog()
+        # Refreshed an hour later with a one-hour lookback that is not
+        # aligned to programme boundaries.
+        log.record("T", 1, _lineup(1), self._half_hourly(-4, 12), window=(now - 7200 + 60, None))
+        log.record("T", 2, _lineup(1), self._half_hourly(-2, 14), window=(now - 3600 + 60, None))
+        assert log.since("T", 1)["changed"] == set()
+        log.record("T", 3, _lineup(1), self._half_hourly(-2, 14, retitle=5), window=(now - 3600 + 60, None))
+        assert log.since("T", 2)["changed"] == {"ch0"}
+
+    def test_programme_on_air_and_last_shared_are_compared(self):
+        # No lookback: the programme on air is the first one of the data.
+        window = (int(NOW.timestamp()), None)
+        for retitle in (0, 7):
+            log = GuideDeltaLog()
+            log.record("T", 1, _lineup(1), self._half_hourly(0, 8), window=window)
+            log.record("T", 2, _lineup(1), self._half_hourly(0, 8, retitle=retitle), window=window)
+            assert log.since("T", 1)["changed"] == {"ch0"}
+
+    def test_unknown_generations_need_resync(self):
+        log = GuideDeltaLog(max_deltas=2)
+        for gen in range(1, 5):
+            log.record("T", gen, _lineup(1), _guide(1))
+        assert log.since("T", 1) is None
+        assert log.since("T", 2) is not None
+        assert log.since("Other", 4) is None
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "DATABASE", str(tmp_path / "users_test.db"))
+    monkeypatch.setattr(app_module, "TUNER_DB", str(tmp_path / "tuners_test.db"))
+    monkeypatch.setattr(app_module, "EPG_DB", str(tmp_path / "epg_test.db"))
+    monkeypatch.setattr(app_module, "cached_channels", [])
+    monkeypatch.setattr(app_module, "_epg_generation", None)
+    monkeypatch.setattr(app_module, "_guide_delta_log", GuideDeltaLog())
+    init_db()
+    init_tuners_db()
+    add_user("admin", "adminpass")
+    app.config["TESTING"] = True
+    with app.test_client() as c:
+        yield c
+
+
+class TestGuideDeltaApi:
+    def test_returns_only_changed_channels(self, client):
+        app_module.publish_tuner_data("Tuner 1", _lineup(50), _guide(50))
+        since = client.get("/api/guide_snapshot").get_json()["meta"]["generation"]
+        app_module.publish_tuner_data("Tuner 1", _lineup(49), _guide(49, ch7=[_prog("Breaking")]))
+
+        body = client.get(f"/api/guide/delta?since={since}&hours=2").get_json()
+        assert body["resync"] is False
+        assert body["generation"] == app_module._epg_generation["id"]
+        assert [c["tvg_id"] for c in body["changed"]] == ["ch7"]
+        assert body["changed"][0]["programs"][0]["title"] == "Breaking"
+        assert body["removed"] == ["ch49"]
+        assert body["order"] is None
+
+        current = client.get(f"/api/guide/delta?since={body['generation']}").get_json()
+        assert current["resync"] is False and current["changed"] == []
+
+    def test_unknown_generation_gets_resync_hint(self, client):
+        app_module.publish_tuner_data("Tuner 1", _lineup(2), _guide(2))
+        body = client.get("/api/guide/delta?since=12345").get_json()
+        assert body["resync"] is True
+        assert body["changed"] == []
+
+    def test_since_is_required(self, client):
+        assert client.get("/api/guide/delta").status_code == 400
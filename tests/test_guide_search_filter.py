@@ -16,6 +16,9 @@ def isolated_db(tmp_path, monkeypatch):
     tuners_db = str(tmp_path / "tuners_test.db")
     monkeypatch.setattr(app_module, "DATABASE", users_db)
     monkeypatch.setattr(app_module, "TUNER_DB", tuners_db)
+    monkeypatch.setattr(app_module, "EPG_DB", str(tmp_path / "epg_test.db"))
+    monkeypatch.setattr(app_module, "cached_channels", [])
+    monkeypatch.setattr(app_module, "_epg_generation", None)
     init_db()
     init_tuners_db()
     add_user("admin", "adminpass")
@@ -40,10 +43,18 @@ def login(client):
 class _MockResponse:
     def __init__(self, content: bytes):
         self.content = content
+        self.headers = {}
 
     def raise_for_status(self):
         return None
 
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self):
+        return None
+
 
 class TestGuideSearchFilter:
     def test_guide_search_panel_is_hidden_by_default_and_has_toggle_hooks(self, client):
@@ -85,12 +96,12 @@ class TestGuideSearchFilter:
 
         monkeypatch.setattr(app_module.requests, "get", lambda *_args, **_kwargs: _MockResponse(xml))
         epg = parse_epg("http://example.test/guide.xml")
-        assert epg["ch1"][0]["categories"] == ["Movies"]
-        assert epg["ch1"][0]["colors"] == ["Blue", "Gold"]
+        assert epg["ch1"][0]["categories"] == ("Movies",)
+        assert epg["ch1"][0]["colors"] == ("Blue", "Gold")
 
     def test_guide_program_blocks_render_category_and_color_data(self, client, monkeypatch):
         now = datetime.now(timezone.utc)
-        monkeypatch.setattr(app_module, "cached_channels", [
+        app_module.publish_tuner_data("Tuner 1", [
             {
                 "name": "Channel One",
                 "logo": "",
@@ -99,8 +110,7 @@ class TestGuideSearchFilter:
                 "group": "Movies",
                 "tvg_chno": "101",
             }
-        ])
-        monkeypatch.setattr(app_module, "cached_epg", {
+        ], {
             "ch1": [{
                 "title": "Movie Night",
                 "desc": "Feature film",
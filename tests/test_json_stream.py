@@ -0,0 +1,105 @@
+"""Tests for streamed JSON responses (utils/json_stream.py and
+_json_list_response in app.py)."""
+import gzip
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app, init_db, init_tuners_db, add_user
+from utils.json_stream import iter_json_object
+
+
+class TestIterJsonObject:
+    @pytest.mark.parametrize("count", [0, 1, 5, 250])
+    def test_matches_json_dumps(self, count):
+        fields = {"meta": {"tuner": "T"}, "paging": None}
+        items = ({"n": i, "name": f"Ch {i}"} for i in range(count))
+        chunks = list(iter_json_object(fields, "channels", items, batch=100))
+        body = json.loads("".join(chunks))
+        assert body == {**fields, "channels": [{"n": i, "name": f"Ch {i}"} for i in range(count)]}
+        assert len(chunks) == 2 + count // 100
+
+    @pytest.mark.parametrize("key", ["a", "m", "z"])
+    def test_text_matches_sorted_dumps(self, key):
+        fields = {"y": {"b": 1, "a": [{"d": 2, "c": "\u00e9"}]}, "b": None}
+        items = [{"z": 1, "a": {"y": 2, "x": 3}}, {"name": "\u00e9"}]
+        text = "".join(iter_json_object(fields, key, iter(items), batch=1))
+        assert text == json.dumps({**fields, key: items}, sort_keys=True, separators=(",", ":")) + "\n"
+
+    def test_unsorted_keeps_field_order(self):
+        text = "".join(iter_json_object({"y": {"b": 1, "a": 2}}, "a", [{"d": 1, "c": 2}],
+                                        sort_keys=False, ensure_ascii=False))
+        assert text == '{"y":{"b":1,"a":2},"a":[{"d":1,"c":2}]}\n'
+
+    def test_items_are_consumed_lazily(self):
+        seen = []
+
+        def items():
+            for i in range(10):
+                seen.append(i)
+                yield i
+
+        chunks = iter_json_object({}, "xs", items(), batch=2)
+        assert next(chunks) == '{"xs":['
+        assert seen == []
+        next(chunks)
+        assert seen == [0, 1]
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "DATABASE", str(tmp_path / "users_test.db"))
+    monkeypatch.setattr(app_module, "TUNER_DB", str(tmp_path / "tuners_test.db"))
+    monkeypatch.setattr(app_module, "EPG_DB", str(tmp_path / "epg_test.db"))
+    monkeypatch.setattr(app_module, "cached_channels", [])
+    monkeypatch.setattr(app_module, "_epg_generation", None)
+    init_db()
+    init_tuners_db()
+    add_user("admin", "adminpass")
+    app.config["TESTING"] = True
+    with app.test_client() as c:
+        c.post("/login", data={"username": "admin", "password": "adminpass"})
+        channels = [{"tvg_id": f"ch{i}", "name": f"Channel {i}"} for i in range(600)]
+        app_module.publish_tuner_data("Tuner 1", channels, {})
+        yield c
+
+
+class TestStreamedEndpoints:
+    def test_large_channel_list_is_streamed(self, client):
+        resp = client.get("/api/channels")
+        assert "Content-Length" not in resp.headers
+        body = resp.get_json()
+        assert [c["name"] for c in body["channels"]] == [f"Channel {i}" for i in range(600)]
+        assert "paging" not in body and body["timestamp"]
+
+    def test_channels_paging(self, client):
+        body = client.get("/api/channels?offset=590&limit=50").get_json()
+        assert [c["tvg_id"] for c in body["channels"]] == [f"ch{i}" for i in range(590, 600)]
+        assert body["paging"] == {"offset": 590, "limit": 50, "total": 600, "next_offset": None}
+
+    def test_streamed_snapshot_is_gzipped_on_the_fly(self, client):
+        resp = client.get("/api/guide_snapshot?limit=500", headers={"Accept-Encoding": "gzip"})
+        assert "Content-Length" not in resp.headers
+        assert resp.headers["Content-Encoding"] == "gzip"
+        body = json.loads(gzip.decompress(resp.data))
+        assert len(body["channels"]) == 500
+        assert body["paging"]["next_offset"] == 500
+        assert body["meta"]["tuner"] == "Tuner 1"
+
+    def test_small_pages_are_buffered(self, client):
+        resp = client.get("/api/guide_snapshot?limit=10")
+        assert "Content-Length" in resp.headers
+        assert len(resp.get_json()["channels"]) == 10
+
+    def test_streamed_body_matches_jsonify(self, client):
+        fields = {"meta": {"tuner": "T", "generation": 3}, "timestamp": "now"}
+        items = [{"tvg_id": f"ch{i}", "name": f"Ch\u00e9 {i}", "logo": None} for i in range(300)]
+        with app.test_request_context():
+            streamed = app_module._json_list_response(fields, "channels", iter(items), len(items))
+            buffered = app_module._json_list_response(fields, "channels", iter(items), 0)
+            assert b"".join(streamed.response) == buffered.get_data()
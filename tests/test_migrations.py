@@ -0,0 +1,84 @@
+"""Tests for the versioned schema migrations (utils/migrations.py and the
+users.db / tuners.db migration lists in app.py)."""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from utils.db_pool import connect
+from utils.migrations import add_column, current_version, migrate
+
+
+def _traced(conn):
+    statements = []
+    conn.set_trace_callback(statements.append)
+    return statements
+
+
+class TestMigrate:
+    MIGRATIONS = [
+        (1, "t", lambda c: c.execute("CREATE TABLE IF NOT EXISTS t (a TEXT)")),
+        (2, "t.b", lambda c: add_column(c, "t", "b", "TEXT")),
+    ]
+
+    def test_applies_pending_once(self, tmp_path):
+        conn = sqlite3.connect(str(tmp_path / "a.db"))
+        assert migrate(conn, self.MIGRATIONS) == 2
+        assert current_version(conn) == 2
+        statements = _traced(conn)
+        assert migrate(conn, self.MIGRATIONS) == 0
+        assert statements == ["SELECT MAX(version) FROM schema_version"]
+
+    def test_new_migrations_run_on_top(self, tmp_path):
+        conn = sqlite3.connect(str(tmp_path / "a.db"))
+        migrate(conn, self.MIGRATIONS[:1])
+        assert migrate(conn, self.MIGRATIONS) == 1
+        assert [r[1] for r in conn.execute("PRAGMA table_info(t)")] == ["a", "b"]
+
+    def test_failure_rolls_back_everything(self, tmp_path):
+        def boom(conn):
+            raise RuntimeError("boom")
+
+        conn = sqlite3.connect(str(tmp_path / "a.db"))
+        with pytest.raises(RuntimeError):
+            migrate(conn, self.MIGRATIONS + [(3, "boom", boom)])
+        assert current_version(conn) == 0
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name='t'").fetchone() is None
+
+
+class TestAppDatabases:
+    def test_legacy_users_db_is_brought_forward(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "users.db")
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                         "username TEXT UNIQUE, password TEXT, last_login TEXT)")
+            conn.execute("ALTER TABLE users ADD COLUMN assigned_tuner TEXT")
+        monkeypatch.setattr(app_module, "DATABASE", path)
+        app_module.init_db()
+        conn = connect(path)
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(users)")}
+        assert {"assigned_tuner", "must_change_password"} <= cols
+        assert current_version(conn) == app_module._USERS_MIGRATIONS[-1][0]
+
+    def test_tuners_db_start_is_one_read(self, tmp_path, monkeypatch):
+        path = str(tmp_path / "tuners.db")
+        monkeypatch.setattr(app_module, "TUNER_DB", path)
+        app_module.init_tuners_db()
+        conn = connect(path)
+        assert sorted(app_module.get_tuners()) == ["Tuner 1", "Tuner 2"]
+        assert conn.execute("SELECT COUNT(*) FROM traffic_demo_cities").fetchone()[0] > 0
+
+        conn.execute("INSERT INTO settings VALUES ('overlay.test_text', 'x')")
+        conn.commit()
+        statements = _traced(conn)
+        try:
+            app_module.init_tuners_db()
+        finally:
+            conn.set_trace_callback(None)
+        assert statements == ["SELECT MAX(version) FROM schema_version"]
+        # One-shot cleanups do not run again.
+        assert conn.execute("SELECT value FROM settings WHERE key='overlay.test_text'").fetchone() == ("x",)
@@ -0,0 +1,169 @@
+"""Tests for the background auto-refresh scheduler (utils/refresh_scheduler.py)
+and the /api/auto_refresh endpoints that report on and trigger it."""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app, init_db, init_tuners_db, add_user
+from utils.refresh_scheduler import RefreshScheduler
+
+
+class _Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _scheduler(clock, last_runs, interval=2, tuners=("A", "B"), jitter=0.0):
+    refreshed = []
+
+    def refresh(name):
+        refreshed.append(name)
+        last_runs[name] = clock.now
+        clock.now += 5  # each refresh takes five "seconds"
+        return name != "broken"
+
+    sched = RefreshScheduler(
+        list_tuners=lambda: list(tuners),
+        refresh=refresh,
+        interval_hours=lambda: interval,
+        last_run=last_runs.get,
+        jitter=jitter,
+        clock=clock,
+    )
+    return sched, refreshed
+
+
+class TestRunPending:
+    def test_never_run_tuners_are_due_immediately(self):
+        clock = _Clock()
+        sched, refreshed = _scheduler(clock, {})
+        assert sched.run_pending() == ["A", "B"]
+        assert refreshed == ["A", "B"]
+
+    def test_each_tuner_follows_its_own_interval(self):
+        clock = _Clock()
+        last_runs = {"A": clock.now - 3 * 3600, "B": clock.now - 1 * 3600}
+        sched, refreshed = _scheduler(clock, last_runs)
+        assert sched.run_pending() == ["A"]
+        assert sched.status("B")["next_due"] is not None
+        clock.now += 3600
+        assert sched.run_pending() == ["B"]
+
+    def test_disabled_refreshes_nothing_unless_triggered(self):
+        clock = _Clock()
+        sched, refreshed = _scheduler(clock, {}, interval=None)
+        assert sched.run_pending() == []
+        sched.trigger("B")
+        assert sched.run_pending() == ["B"]
+        assert sched.run_pending() == []
+
+    def test_jitter_only_delays(self):
+        clock = _Clock()
+        last_runs = {"A": clock.now - 2 * 3600}
+        sched, _ = _scheduler(clock, last_runs, tuners=("A",), jitter=0.5)
+        due_at = sched._due_at("A", 2)
+        assert last_runs["A"] + 2 * 3600 <= due_at <= last_runs["A"] + 3 * 3600
+
+    def test_status_records_duration_and_result(self):
+        clock = _Clock()
+        sched, _ = _scheduler(clock, {}, tuners=("A", "broken"))
+        sched.run_pending()
+        assert sched.status("A")["last_result"] == "success"
+        assert sched.status("A")["last_duration_seconds"] == 5
+        assert sched.status("A")["state"] == "idle"
+        assert sched.status("broken")["last_result"] == "failed"
+        assert set(sched.status()["tuners"]) == {"A", "broken"}
+
+    def test_refresh_exception_is_contained(self):
+        def boom(_name):
+            raise RuntimeError("down")
+
+        sched = RefreshScheduler(lambda: ["A"], boom, lambda: 2, lambda _n: None)
+        assert sched.run_pending() == ["A"]
+        assert sched.status("A")["last_result"] == "failed"
+
+    def test_background_thread_runs_and_stops(self):
+        done = []
+        sched = RefreshScheduler(lambda: ["A"], lambda name: done.append(name) or True,
+                                 lambda: 2, lambda _n: None if not done else time.time(),
+                                 poll_seconds=0.05)
+        sched.start()
+        try:
+            deadline = time.time() + 2
+            while not done and time.time() < deadline:
+                time.sleep(0.01)
+            assert done == ["A"]
+            assert sched.status()["running"] is True
+        finally:
+            sched.stop(timeout=2)
+        assert sched.status()["running"] is False
+
+
+class TestAutoRefreshApi:
+    @pytest.fixture()
+    def client(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(app_module, "DATABASE", str(tmp_path / "users_test.db"))
+        monkeypatch.setattr(app_module, "TUNER_DB", str(tmp_path / "tuners_test.db"))
+        monkeypatch.setattr(app_module, "EPG_DB", str(tmp_path / "epg_test.db"))
+        monkeypatch.setattr(app_module, "cached_channels", [])
+        monkeypatch.setattr(app_module, "_epg_generation", None)
+        init_db()
+        init_tuners_db()
+        add_user("admin", "adminpass")
+        add_user("viewer", "viewerpass")
+        sched = RefreshScheduler(lambda: [], lambda _n: True, lambda: None, lambda _n: None)
+        monkeypatch.setattr(app_module, "_refresh_scheduler", sched)
+        monkeypatch.setattr(sched, "start", lambda: None)
+        app.config["TESTING"] = True
+        with app.test_client() as c:
+            yield c
+
+    def _login(self, client, username, password):
+        client.post("/login", data={"username": username, "password": password})
+
+    def test_status_reports_scheduler_progress(self, client):
+        self._login(client, "admin", "adminpass")
+        body = client.get("/api/auto_refresh/status").get_json()
+        assert body["tuner"] == "Tuner 1"
+        assert body["state"] == "idle"
+        assert body["last_duration_seconds"] is None
+        assert body["scheduler"]["running"] is False
+
+    def test_trigger_queues_current_tuner(self, client):
+        self._login(client, "admin", "adminpass")
+        resp = client.post("/api/auto_refresh/trigger")
+        assert resp.get_json() == {"ok": True, "tuner": "Tuner 1"}
+        assert app_module._refresh_scheduler._requested == ["Tuner 1"]
+
+    def test_trigger_is_admin_only(self, client):
+        self._login(client, "viewer", "viewerpass")
+        assert client.post("/api/auto_refresh/trigger").status_code == 403
+
+    def test_guide_does_not_refresh_inline(self, client, monkeypatch):
+        def fail(*_a, **_k):
+            raise AssertionError("guide refreshed inline")
+
+        monkeypatch.setattr(app_module, "refresh_current_tuner", fail)
+        monkeypatch.setattr(app_module, "load_tuner_data_if_changed", fail)
+        app_module.set_setting("auto_refresh_enabled", "1")
+        app_module.set_setting("auto_refresh_interval_hours", "2")
+        self._login(client, "admin", "adminpass")
+        assert client.get("/guide").status_code == 200
+        assert client.get("/api/guide_snapshot").status_code == 200
+
+    def test_tuner_switch_publishes_new_guide_before_redirect(self, client, monkeypatch):
+        channels = [{"tvg_id": "t2", "name": "Two"}]
+        monkeypatch.setattr(app_module, "load_tuner_data", lambda name: (channels, {}))
+        self._login(client, "admin", "adminpass")
+        assert client.get("/set_tuner/Tuner 2").status_code == 302
+        assert app_module.get_current_tuner() == "Tuner 2"
+        assert [c["tvg_id"] for c in app_module.cached_channels] == ["t2"]
+        assert app_module._refresh_scheduler._requested == []
@@ -0,0 +1,105 @@
+"""Tests for the cached settings table access (utils/settings_store.py)."""
+import os
+import shutil
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.settings_store import SettingsStore, namespace
+
+
+@pytest.fixture()
+def db(tmp_path):
+    path = str(tmp_path / "tuners.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany("INSERT INTO settings VALUES (?, ?)", [
+            ("overlay.text_color", "#ffffff"),
+            ("overlay.virtual.news.bg_color", "#000000"),
+            ("overlay_other", "x"),
+            ("current_tuner", "Tuner 1"),
+        ])
+    return path
+
+
+def _external_write(path, key, value):
+    with sqlite3.connect(path) as conn:
+        conn.execute("INSERT OR REPLACE INTO settings VALUES (?, ?)", (key, value))
+
+
+def test_namespace():
+    assert namespace("overlay.virtual.news.bg_color") == "overlay."
+    assert namespace("current_tuner") == "current_tuner"
+
+
+def test_namespace_is_loaded_once(db):
+    store = SettingsStore(lambda: db)
+    assert store.get("overlay.text_color") == "#ffffff"
+    assert store.get("overlay.bg_color", "") == ""
+    assert store.prefix("overlay.virtual.") == {"overlay.virtual.news.bg_color": "#000000"}
+    assert store.get("overlay_other") == "x"
+    stats = store.stats()
+    assert stats["loads"] == 2 and stats["hits"] == 2
+    assert stats["namespaces"] == ["overlay.", "overlay_other"]
+
+
+def test_writes_update_the_cache_in_place(db):
+    store = SettingsStore(lambda: db)
+    store.get("overlay.text_color")
+    store.set_many({"overlay.text_color": "#ff0000", "overlay.bg_color": "#00ff00"})
+    store.delete("overlay.virtual.news.bg_color")
+    assert store.prefix("overlay.") == {"overlay.text_color": "#ff0000", "overlay.bg_color": "#00ff00"}
+    assert store.stats()["loads"] == 1
+    with sqlite3.connect(db) as conn:
+        rows = dict(conn.execute("SELECT key, value FROM settings WHERE key LIKE 'overlay.%'"))
+    assert rows == {"overlay.text_color": "#ff0000", "overlay.bg_color": "#00ff00"}
+
+
+def test_other_connection_writes_invalidate(db):
+    store = SettingsStore(lambda: db)
+    assert store.get("current_tuner") == "Tuner 1"
+    _external_write(db, "current_tuner", "Tuner 2")
+    assert store.get("current_tuner") == "Tuner 2"
+    assert store.stats()["invalidations"] == 1
+
+
+def test_path_change_and_file_replacement(db, tmp_path):
+    other = str(tmp_path / "other.db")
+    shutil.copy(db, other)
+    _external_write(other, "current_tuner", "Other")
+    path = [db]
+    store = SettingsStore(lambda: path[0])
+    assert store.get("current_tuner") == "Tuner 1"
+    path[0] = other
+    assert store.get("current_tuner") == "Other"
+    os.replace(db, other)  # e.g. a restore swapping the file in place
+    assert store.get("current_tuner") == "Tuner 1"
+
+
+def test_missing_table_is_not_cached(tmp_path):
+    path = str(tmp_path / "fresh.db")
+    store = SettingsStore(lambda: path)
+    assert store.get("current_tuner", "none") == "none"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+    store.set("current_tuner", "Tuner 1")
+    assert store.get("current_tuner") == "Tuner 1"
+
+
+def test_app_getters_share_one_cached_load(tmp_path, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "TUNER_DB", str(tmp_path / "tuners_test.db"))
+    app_module.init_tuners_db()
+    app_module.save_sports_config({"nfl": True})
+    app_module.get_sports_config()
+    loads = app_module.get_settings_cache_stats()["loads"]
+    config = app_module.get_sports_config()
+    assert config["leagues"]["nfl"] is True
+    assert app_module.get_settings_cache_stats()["loads"] == loads
+
+    _external_write(app_module.TUNER_DB, "sports.mode", "rss")
+    assert app_module.get_sports_config()["mode"] == "rss"
@@ -0,0 +1,59 @@
+"""Tests for the single-flight LRU cache (utils/single_flight.py)."""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.single_flight import SingleFlightCache
+
+
+def test_hit_returns_cached_value():
+    cache = SingleFlightCache()
+    assert cache.get("k", lambda: 1) == 1
+    assert cache.get("k", lambda: 2) == 1
+    assert (cache.builds, cache.hits) == (1, 1)
+
+
+def test_concurrent_misses_build_once():
+    cache = SingleFlightCache()
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.2)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("k", build)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["value"] * 8
+    assert len(calls) == 1
+
+
+def test_failed_build_is_not_cached():
+    cache = SingleFlightCache()
+
+    def boom():
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        cache.get("k", boom)
+    assert cache.get("k", lambda: "ok") == "ok"
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = SingleFlightCache(max_entries=2)
+    cache.get("a", lambda: 1)
+    cache.get("b", lambda: 2)
+    cache.get("a", lambda: 0)
+    cache.get("c", lambda: 3)
+    assert cache.get("a", lambda: "rebuilt") == 1
+    assert cache.get("b", lambda: "rebuilt") == "rebuilt"
@@ -0,0 +1,59 @@
+"""Tests for fingerprinted static URLs (utils/static_assets.py and the
+url_defaults / after_request hooks in app.py)."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app
+from utils.static_assets import AssetManifest
+
+
+class TestAssetManifest:
+    def test_hash_follows_content(self, tmp_path):
+        (tmp_path / "js").mkdir()
+        asset = tmp_path / "js" / "a.js"
+        asset.write_text("one")
+        manifest = AssetManifest(str(tmp_path))
+        assert manifest.build() == 1
+        first = manifest.version("js/a.js")
+        assert first and manifest.version("js/a.js") == first
+        asset.write_text("two, longer")
+        assert manifest.version("js/a.js") not in (None, first)
+
+    def test_missing_and_escaping_paths(self, tmp_path):
+        manifest = AssetManifest(str(tmp_path))
+        assert manifest.version("nope.css") is None
+        assert manifest.version("../secret") is None
+
+
+@pytest.fixture()
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, "_static_manifest", AssetManifest(app.static_folder))
+    app.config["TESTING"] = True
+    with app.test_client() as c:
+        yield c
+
+
+class TestFingerprintedStatic:
+    def test_url_for_adds_content_hash(self, client):
+        with app.test_request_context():
+            url = app_module.url_for("static", filename="js/guide-refresh.js")
+        version = app_module._static_manifest.version("js/guide-refresh.js")
+        assert url == f"/static/js/guide-refresh.js?v={version}"
+
+    def test_current_hash_is_immutable(self, client):
+        version = app_module._static_manifest.version("js/guide-refresh.js")
+        resp = client.get(f"/static/js/guide-refresh.js?v={version}")
+        assert resp.status_code == 200
+        assert resp.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+        resp.close()
+
+    def test_stale_or_missing_hash_is_revalidated(self, client):
+        for url in ("/static/js/guide-refresh.js", "/static/js/guide-refresh.js?v=000000000000"):
+            resp = client.get(url)
+            assert "immutable" not in resp.headers.get("Cache-Control", "")
+            resp.close()
@@ -0,0 +1,103 @@
+"""Tests for the identity/preference cache (utils/ttl_cache.py and its use
+by load_user / get_user_prefs in app.py)."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from app import app
+from utils.db_pool import connect
+from utils.ttl_cache import MISSING, TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    def test_entries_expire(self):
+        clock = _Clock()
+        cache = TTLCache(lambda: "db", ttl=10, clock=clock)
+        cache.put("a", 1)
+        clock.now = 9.9
+        assert cache.get("a") == 1
+        clock.now = 10
+        assert cache.get("a") is MISSING
+        assert cache.stats() == {"hits": 1, "misses": 1, "evictions": 0, "size": 0}
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TTLCache(lambda: "db", maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        assert cache.get("b") is MISSING
+        assert cache.get("a") == 1 and cache.get("c") == 3
+
+    def test_scope_change_clears(self):
+        scope = ["one.db"]
+        cache = TTLCache(lambda: scope[0])
+        cache.put("a", 1)
+        scope[0] = "two.db"
+        assert cache.get("a") is MISSING
+
+    def test_discard_where(self):
+        cache = TTLCache(lambda: "db")
+        cache.put(1, "alice")
+        cache.put(2, "bob")
+        cache.discard_where(lambda key, value: value == "alice")
+        assert cache.get(1) is MISSING and cache.get(2) == "bob"
+
+
+@pytest.fixture()
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "DATABASE", str(tmp_path / "users.db"))
+    monkeypatch.setattr(app_module, "TUNER_DB", str(tmp_path / "tuners.db"))
+    app_module.init_db()
+    app_module.init_tuners_db()
+    app_module.add_user("viewer", "pw")
+    app.config["TESTING"] = True
+    app.config["WTF_CSRF_ENABLED"] = False
+    with app.test_client() as c:
+        c.post("/login", data={"username": "viewer", "password": "pw"})
+        yield c
+
+
+def test_prefs_poll_does_no_users_db_work(client):
+    assert client.get("/api/user_prefs").status_code == 200
+    conn = connect(app_module.DATABASE)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        resp = client.get("/api/user_prefs")
+    finally:
+        conn.set_trace_callback(None)
+    assert resp.status_code == 200
+    assert statements == []
+
+
+def test_writes_invalidate(client):
+    user_id = app_module.get_user("viewer").id
+    user = app_module.load_user(user_id)
+    assert app_module.load_user(user_id) is user
+
+    client.post("/change_password", data={"old_password": "pw", "new_password": "pw2"})
+    assert app_module.load_user(user_id).password_hash != user.password_hash
+
+    client.post("/api/user_prefs", json={"hidden_channels": ["x"]})
+    prefs = app_module.get_user_prefs("viewer")
+    assert prefs["hidden_channels"] == ["x"]
+    prefs["hidden_channels"].append("y")
+    assert app_module.get_user_prefs("viewer")["hidden_channels"] == ["x"]
+
+    with connect(app_module.DATABASE) as conn:
+        conn.execute("DELETE FROM users WHERE username='viewer'")
+    app_module.forget_user("viewer")
+    assert app_module.load_user(user_id) is None
@@ -0,0 +1,129 @@
+"""Tests for the in-memory tuner registry (utils/tuner_registry.py)."""
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from utils.tuner_registry import TunerRegistry
+
+
+@pytest.fixture()
+def db(tmp_path):
+    path = str(tmp_path / "tuners.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE tuners (name TEXT PRIMARY KEY, xml TEXT, m3u TEXT, "
+                     "tuner_type TEXT DEFAULT 'standard', sources TEXT)")
+        conn.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("INSERT INTO tuners (name, xml, m3u) VALUES ('A', 'http://a/x', 'http://a/m')")
+        conn.execute("INSERT INTO settings VALUES ('current_tuner', 'A')")
+    return path
+
+
+@pytest.fixture()
+def registry(db):
+    reg = TunerRegistry(lambda: db)
+    yield reg
+    reg.close()
+
+
+def _traced(registry):
+    conn, _ = registry._watch.check()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    return statements
+
+
+def test_reads_are_served_from_memory(registry):
+    assert registry.tuners() == {"A": {"xml": "http://a/x", "m3u": "http://a/m",
+                                       "tuner_type": "standard", "sources": []}}
+    statements = _traced(registry)
+    registry.tuners()
+    assert registry.current() == "A"
+    assert "A" in registry
+    assert statements == ["PRAGMA data_version"] * 3
+
+
+def test_returned_entries_are_copies(registry):
+    registry.add("C", None, None, tuner_type="combined", sources=["A"])
+    registry.tuners()["C"]["sources"].append("B")
+    registry.get("A")["xml"] = "changed"
+    assert registry.get("C")["sources"] == ["A"]
+    assert registry.get("A")["xml"] == "http://a/x"
+
+
+def test_writes_update_cache_and_generation(registry):
+    gen = registry.current_generation()
+    registry.add("B", "http://b/x", "http://b/m")
+    assert registry.names() == ["A", "B"]
+    registry.update_urls("B", "http://b/x2", "http://b/m2")
+    assert registry.get("B")["xml"] == "http://b/x2"
+    registry.set_current("B")
+    assert registry.current() == "B"
+    registry.delete("A")
+    assert registry.names() == ["B"]
+    assert registry.current_generation() == gen + 4
+    with pytest.raises(ValueError):
+        registry.add("B", None, None)
+
+
+def test_rename_keeps_active_tuner(registry):
+    registry.rename("A", "Renamed")
+    assert registry.names() == ["Renamed"]
+    assert registry.current() == "Renamed"
+
+
+def test_other_connections_invalidate(registry, db):
+    gen = registry.current_generation()
+    with sqlite3.connect(db) as other:
+        other.execute("INSERT INTO tuners (name, xml, m3u) VALUES ('B', 'http://b/x', 'http://b/m')")
+    assert "B" in registry
+    assert registry.current_generation() == gen + 1
+
+    # Unrelated commits re-read the table but leave the generation alone.
+    with sqlite3.connect(db) as other:
+        other.execute("INSERT INTO settings VALUES ('overlay.x', '1')")
+    assert registry.current_generation() == gen + 1
+
+
+def test_missing_tables_are_not_cached(tmp_path):
+    path = str(tmp_path / "tuners.db")
+    reg = TunerRegistry(lambda: path)
+    try:
+        assert reg.tuners() == {} and reg.current() is None
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE tuners (name TEXT PRIMARY KEY, xml TEXT, m3u TEXT, "
+                         "tuner_type TEXT, sources TEXT)")
+            conn.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("INSERT INTO tuners (name) VALUES ('X')")
+        assert reg.names() == ["X"]
+    finally:
+        reg.close()
+
+
+def test_app_tuner_switch_changes_etag(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_module, "TUNER_DB", str(tmp_path / "tuners.db"))
+    app_module.init_tuners_db()
+    assert app_module.get_current_tuner() == "Tuner 1"
+    before = app_module._data_etag("x")
+    with sqlite3.connect(app_module.TUNER_DB) as other:
+        other.execute("UPDATE settings SET value='Tuner 2' WHERE key='current_tuner'")
+    assert app_module.get_current_tuner() == "Tuner 2"
+    assert app_module._data_etag("x") != before
+
+
+def test_old_schema_without_type_columns(tmp_path):
+    path = str(tmp_path / "tuners.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE tuners (name TEXT PRIMARY KEY, xml TEXT, m3u TEXT)")
+        conn.execute("CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT)")
+    reg = TunerRegistry(lambda: path)
+    try:
+        reg.add("A", "http://a/x", "http://a/m")
+        assert reg.get("A") == {"xml": "http://a/x", "m3u": "http://a/m",
+                                "tuner_type": "standard", "sources": []}
+    finally:
+        reg.close()
@@ -21,6 +21,8 @@ import socket
 from typing import Any, Dict, List
 from urllib.parse import urlparse, urlunparse
 
+from utils import db_pool
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,7 +40,7 @@ def check_user_accounts(db_path: str) -> Dict[str, Any]:
     - Any account with an assigned tuner that no longer exists in tuners.db
     """
     try:
-        with sqlite3.connect(db_path, timeout=5) as conn:
+        with db_pool.connect(db_path) as conn:
             cur = conn.execute(
                 "SELECT username, last_login, assigned_tuner FROM users ORDER BY username"
             )
@@ -103,7 +105,7 @@ def check_virtual_channels(tuner_db_path: str) -> Dict[str, Any]:
     # Read all relevant settings in one pass
     settings: Dict[str, str] = {}
     try:
-        with sqlite3.connect(tuner_db_path, timeout=5) as conn:
+        with db_pool.connect(tuner_db_path) as conn:
             cur = conn.execute("SELECT key, value FROM settings")
             for key, value in cur.fetchall():
                 settings[key] = value
@@ -331,7 +333,7 @@ def check_external_services(tuner_db_path: str) -> Dict[str, Any]:
     # Read settings
     settings: Dict[str, str] = {}
     try:
-        with sqlite3.connect(tuner_db_path, timeout=5) as conn:
+        with db_pool.connect(tuner_db_path) as conn:
             cur = conn.execute("SELECT key, value FROM settings")
             for key, value in cur.fetchall():
                 settings[key] = value
@@ -0,0 +1,85 @@
+"""Compact columnar form of the ``/api/guide_snapshot`` payload.
+
+The regular snapshot repeats four ISO timestamps and the full title and
+description for every programme, which is a lot of text for a Pi Zero
+framebuffer client to download and parse.  :func:`compact_snapshot`
+re-encodes one page of it as::
+
+    {
+      "format": "retroiptv-compact/1",
+      "meta": ..., "timeline": ..., "paging": ...,
+      "window": {..., "start_epoch": <UTC epoch seconds>},
+      "strings": ["", "Channel One", "News at Six", ...],
+      "channels": {
+        "tvg_id":   [<string index>, ...],
+        "number":   [<number or null>, ...],
+        "name":     [<string index>, ...],
+        "logo":     [<string index>, ...],
+        "programs": [[title, desc, start, duration, title, desc, start, duration, ...], ...]
+      }
+    }
+
+Channel fields are columns (one entry per channel).  Every string goes
+through the shared ``strings`` table (index 0 is the empty string), so a
+description repeated across channels is sent once.  ``programs`` holds
+four integers per programme: title and description string indices, the
+start in whole minutes from the window start (negative for a programme
+already running) and the duration in whole minutes.  Clipping to the
+window is left to the client: ``max(start, 0)``,
+``min(start + duration, window.minutes)``.  A channel without guide data
+has an empty programme list.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+FORMAT = "retroiptv-compact/1"
+MEDIA_TYPE = "application/vnd.retroiptv.compact+json"
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self.strings: List[str] = [""]
+        self._index: Dict[str, int] = {"": 0}
+
+    def __call__(self, value: Optional[str]) -> int:
+        if not value:
+            return 0
+        i = self._index.get(value)
+        if i is None:
+            i = self._index[value] = len(self.strings)
+            self.strings.append(value)
+        return i
+
+
+def _minutes(iso: str, window_start: float) -> int:
+    return int((datetime.fromisoformat(iso).timestamp() - window_start) // 60)
+
+
+def compact_snapshot(snapshot: Dict[str, Any], channels: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Compact form of *snapshot* (a full snapshot payload) for the page *channels*."""
+    window = dict(snapshot["window"])
+    window_start = datetime.fromisoformat(window["start_iso"]).timestamp()
+    window["start_epoch"] = int(window_start)
+
+    s = _StringTable()
+    columns: Dict[str, List[Any]] = {"tvg_id": [], "number": [], "name": [], "logo": [], "programs": []}
+    for ch in channels:
+        columns["tvg_id"].append(s(ch.get("tvg_id")))
+        columns["number"].append(ch.get("number"))
+        columns["name"].append(s(ch.get("name")))
+        columns["logo"].append(s(ch.get("logo")))
+        flat: List[int] = []
+        for p in ch.get("programs") or ():
+            if not p.get("start") or not p.get("stop"):
+                continue  # the "No Data" placeholder
+            start = _minutes(p["start"], window_start)
+            flat += (s(p.get("title")), s(p.get("desc")),
+                     start, _minutes(p["stop"], window_start) - start)
+        columns["programs"].append(flat)
+
+    out = {k: v for k, v in snapshot.items() if k not in ("channels", "window")}
+    out.update({"format": FORMAT, "window": window, "strings": s.strings, "channels": columns})
+    return out
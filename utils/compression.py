@@ -0,0 +1,153 @@
+"""Negotiated gzip / brotli compression of text responses.
+
+The guide page, the JSON APIs and the roads GeoJSON are text that
+compresses five to ten times, and the TVs that fetch them are often on
+slow Wi-Fi.  The app compresses buffered text responses above a size
+threshold with the best encoding the client accepts: brotli when the
+optional ``brotli`` package is installed, otherwise gzip.
+
+Many of those bodies are identical between requests (the same snapshot
+page, the same channel list until the next refresh), so
+:class:`CompressionCache` keeps compressed bodies keyed by a hash of the
+uncompressed bytes and the encoding; hashing is far cheaper than
+compressing again.  It also records per-route compression counts, sizes
+and time for the diagnostics page.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+try:
+    import brotli as _brotli
+except ImportError:  # optional; gzip only
+    _brotli = None
+
+BROTLI_AVAILABLE = _brotli is not None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_COMPRESSIBLE_PREFIXES = ("text/",)
+_COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/geo+json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+
+
+def is_compressible(mimetype: Optional[str]) -> bool:
+    if not mimetype:
+        return False
+    return (mimetype.startswith(_COMPRESSIBLE_PREFIXES) or mimetype in _COMPRESSIBLE_TYPES
+            or mimetype.endswith("+json"))
+
+
+def negotiate(accept_encodings: Any) -> Optional[str]:
+    """Pick ``"br"`` or ``"gzip"`` from a werkzeug ``Accept`` of the request, or None."""
+    if BROTLI_AVAILABLE and accept_encodings.quality("br") > 0:
+        return "br"
+    if accept_encodings.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return _brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output identical for identical input.
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def gzip_stream(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Gzip a streamed text body chunk by chunk.
+
+    Each chunk is flushed (``Z_SYNC_FLUSH``) so the client can decode it on
+    arrival; used for streamed responses, which the cache above skips.
+    """
+    comp = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        out = comp.compress(chunk.encode("utf-8")) + comp.flush(zlib.Z_SYNC_FLUSH)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+class CompressionCache:
+    """Compressed bodies by (encoding, body hash), bounded to *max_bytes* (LRU)."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._routes: Dict[str, Dict[str, Any]] = {}
+
+    def compress(self, route: str, body: bytes, encoding: str) -> bytes:
+        """*body* compressed with *encoding*, from the cache when seen before."""
+        key = (encoding, hashlib.sha1(body).digest())
+        with self._lock:
+            stats = self._routes.setdefault(route, {
+                "responses": 0, "cache_hits": 0, "bytes_in": 0, "bytes_out": 0, "compress_ms": 0.0,
+            })
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                stats["responses"] += 1
+                stats["cache_hits"] += 1
+                stats["bytes_in"] += len(body)
+                stats["bytes_out"] += len(cached)
+                return cached
+
+        started = time.perf_counter()
+        out = compress(body, encoding)
+        elapsed_ms = (time.perf_counter() - started) * 1000.0
+
+        with self._lock:
+            stats["responses"] += 1
+            stats["bytes_in"] += len(body)
+            stats["bytes_out"] += len(out)
+            stats["compress_ms"] += elapsed_ms
+            if len(out) <= self.max_bytes and key not in self._entries:
+                self._entries[key] = out
+                self._bytes += len(out)
+                while self._bytes > self.max_bytes:
+                    _, old = self._entries.popitem(last=False)
+                    self._bytes -= len(old)
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache size and, per route, responses, cache hits, bytes and compression time."""
+        with self._lock:
+            routes = {}
+            for route, s in self._routes.items():
+                misses = s["responses"] - s["cache_hits"]
+                routes[route] = {
+                    "responses": s["responses"],
+                    "cache_hits": s["cache_hits"],
+                    "bytes_in": s["bytes_in"],
+                    "bytes_out": s["bytes_out"],
+                    "ratio": round(s["bytes_out"] / s["bytes_in"], 3) if s["bytes_in"] else None,
+                    "compress_ms_total": round(s["compress_ms"], 2),
+                    "compress_ms_avg": round(s["compress_ms"] / misses, 2) if misses else None,
+                }
+            return {
+                "brotli_available": BROTLI_AVAILABLE,
+                "cache_entries": len(self._entries),
+                "cache_bytes": self._bytes,
+                "routes": routes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._routes.clear()
@@ -0,0 +1,356 @@
+"""Reusable SQLite connections for users.db, tuners.db and epg.db.
+
+Every helper used to open its own connection for one or two statements,
+paying for the open, the schema parse and statement preparation each
+time, and tuners.db ran in rollback-journal mode, so a writer (a settings
+save, the activity log) blocked every reader.
+
+:func:`connect` hands each thread one connection per database file and
+keeps it for the life of the thread.  The Werkzeug server runs each
+request on a new thread, so when a thread ends its connections go back to
+an idle list and the next thread picks them up instead of opening new
+ones.  Because a connection lives on, its statement cache
+(``cached_statements``) keeps repeated queries prepared.
+
+New connections get WAL journaling, ``synchronous=NORMAL`` (safe with
+WAL; only the last transactions can be lost on power failure, never
+corrupted), a modest page cache and memory-mapped reads, sized for a
+Raspberry Pi.  A database that owns its schema (``epg.db``) passes an
+*init* callback; it runs once on each new connection, instead of on every
+call.
+
+Connections work as drop-in replacements for ``sqlite3.connect``:
+
+* ``with connect(path) as conn:`` commits on success and rolls back on
+  error, as before.  Nested blocks on the same thread share the
+  connection, and only the outermost block commits: inside a nested
+  block ``commit()`` does nothing, so a helper called from a caller's
+  block cannot commit the caller's half-done transaction.
+* ``close()`` does not close; outside any ``with`` block it rolls back
+  uncommitted work, like a real close would.  Inside one it leaves the
+  transaction to the block.
+
+:func:`stats` reports per-database opens, reuses and *busy time*: wall
+time spent inside the outermost ``with`` blocks, which includes waiting
+on another connection's lock.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BUSY_TIMEOUT_SECONDS = 10
+CACHED_STATEMENTS = 256
+MAX_IDLE = 16            # across all database files
+MAX_LEASES_PER_THREAD = 4
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-2048",       # KiB, per connection
+    "PRAGMA mmap_size=33554432",     # 32 MiB; shared with the OS page cache
+    "PRAGMA temp_store=MEMORY",
+)
+
+_FileId = Tuple[int, int]
+
+
+def _file_id(path: str) -> _FileId:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return (0, 0)
+    return (st.st_dev, st.st_ino)
+
+
+def apply_pragmas(conn: sqlite3.Connection) -> None:
+    """Apply :data:`PRAGMAS` to *conn*; a read-only location keeps the defaults."""
+    for pragma in PRAGMAS:
+        try:
+            conn.execute(pragma)
+        except sqlite3.DatabaseError as exc:
+            logger.debug("%s failed: %s", pragma, exc)
+
+
+class _DbStats:
+    __slots__ = ("opened", "reused", "transactions", "busy_s", "max_busy_s", "lock_errors")
+
+    def __init__(self) -> None:
+        self.opened = 0
+        self.reused = 0
+        self.transactions = 0
+        self.busy_s = 0.0
+        self.max_busy_s = 0.0
+        self.lock_errors = 0
+
+
+class PooledConnection(sqlite3.Connection):
+    """A ``sqlite3.Connection`` owned by :class:`ConnectionPool`."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.pool_path = ""
+        self.file_id: _FileId = (0, 0)
+        self.initialised = False
+        self._pool: Optional["ConnectionPool"] = None
+        self._depth = 0
+        self._entered_at = 0.0
+
+    def __enter__(self) -> "PooledConnection":
+        if self._depth == 0:
+            self._entered_at = time.perf_counter()
+        self._depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._depth -= 1
+        if self._depth:
+            return False
+        try:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        except sqlite3.Error as commit_exc:
+            exc = exc or commit_exc
+            raise
+        finally:
+            if self._pool is not None:
+                self._pool._record(self, time.perf_counter() - self._entered_at, exc)
+        return False
+
+    def commit(self) -> None:
+        if self._depth > 1:
+            return
+        super().commit()
+
+    def close(self) -> None:
+        if self._depth == 0 and self.in_transaction:
+            self.rollback()
+
+    def _close(self) -> None:
+        sqlite3.Connection.close(self)
+
+
+class _Lease:
+    """Holds a thread's connection, returning it to the pool when the thread's locals die."""
+
+    def __init__(self, pool: "ConnectionPool", conn: PooledConnection):
+        self.conn = conn
+        self._finalizer = weakref.finalize(self, pool._release, conn)
+        self._finalizer.atexit = False
+
+    def detach(self) -> None:
+        self._finalizer.detach()
+
+
+class ConnectionPool:
+    def __init__(self, max_idle: int = MAX_IDLE, max_leases: int = MAX_LEASES_PER_THREAD):
+        self.max_idle = max_idle
+        self.max_leases = max_leases
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._idle: List[PooledConnection] = []  # least recently released first
+        self._leased: Dict[str, int] = {}
+        self._stats: Dict[str, _DbStats] = {}
+
+    def connect(self, path: str, init: Optional[Callable[[sqlite3.Connection], None]] = None) -> PooledConnection:
+        """This thread's connection to *path*, opened or reused as needed.
+
+        *init* (e.g. ``CREATE TABLE IF NOT EXISTS`` statements) runs and is
+        committed the first time a connection is handed out with it.
+        """
+        conn = self._lease(path)
+        if init is not None and not conn.initialised:
+            init(conn)
+            conn.commit()
+            conn.initialised = True
+        return conn
+
+    def _lease(self, path: str) -> PooledConnection:
+        leases = getattr(self._local, "leases", None)
+        if leases is None:
+            leases = self._local.leases = OrderedDict()
+        lease = leases.get(path)
+        fid = _file_id(path)
+        if lease is not None and lease.conn.file_id == fid and fid != (0, 0):
+            leases.move_to_end(path)
+            conn = lease.conn
+            if conn._depth == 0:
+                conn.row_factory = None
+            return conn
+        if lease is not None:
+            # The file was replaced or removed under us; don't hand it back out.
+            del leases[path]
+            lease.detach()
+            self._discard(lease.conn)
+        conn = self._checkout(path, fid)
+        leases[path] = _Lease(self, conn)
+        # Only tests juggle more files than this; hand back the oldest idle ones.
+        for old_path in list(leases)[:-self.max_leases]:
+            if leases[old_path].conn._depth == 0:
+                del leases[old_path]
+        return conn
+
+    def _checkout(self, path: str, fid: _FileId) -> PooledConnection:
+        stale = []
+        conn = None
+        with self._lock:
+            stats = self._stats.setdefault(path, _DbStats())
+            for i in range(len(self._idle) - 1, -1, -1):
+                candidate = self._idle[i]
+                if candidate.pool_path != path:
+                    continue
+                del self._idle[i]
+                if candidate.file_id == fid and fid != (0, 0):
+                    conn = candidate
+                    stats.reused += 1
+                    break
+                stale.append(candidate)
+            self._leased[path] = self._leased.get(path, 0) + 1
+        for old in stale:
+            old._close()
+        if conn is None:
+            try:
+                conn = self._open(path)
+            except Exception:
+                with self._lock:
+                    self._leased[path] -= 1
+                raise
+            with self._lock:
+                stats.opened += 1
+        conn.row_factory = None
+        return conn
+
+    def _open(self, path: str) -> PooledConnection:
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_SECONDS, factory=PooledConnection,
+                               cached_statements=CACHED_STATEMENTS, check_same_thread=False)
+        apply_pragmas(conn)
+        conn.pool_path = path
+        conn.file_id = _file_id(path)
+        conn._pool = self
+        return conn
+
+    def _release(self, conn: PooledConnection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn._depth = 0
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        evicted = []
+        with self._lock:
+            self._leased[conn.pool_path] -= 1
+            if conn.file_id == _file_id(conn.pool_path):
+                self._idle.append(conn)
+            else:
+                evicted.append(conn)
+            while len(self._idle) > self.max_idle:
+                evicted.append(self._idle.pop(0))
+        for old in evicted:
+            old._close()
+
+    def _discard(self, conn: PooledConnection) -> None:
+        with self._lock:
+            self._leased[conn.pool_path] -= 1
+        try:
+            conn._close()
+        except sqlite3.Error:
+            pass
+
+    def _record(self, conn: PooledConnection, elapsed: float, exc: Optional[BaseException]) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(conn.pool_path, _DbStats())
+            stats.transactions += 1
+            stats.busy_s += elapsed
+            stats.max_busy_s = max(stats.max_busy_s, elapsed)
+            if isinstance(exc, sqlite3.OperationalError) and "locked" in str(exc):
+                stats.lock_errors += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per database file: connections opened, reused, leased and idle, and busy time."""
+        with self._lock:
+            return {
+                os.path.basename(path): {
+                    "opened": s.opened,
+                    "reused": s.reused,
+                    "leased": self._leased.get(path, 0),
+                    "idle": sum(1 for c in self._idle if c.pool_path == path),
+                    "transactions": s.transactions,
+                    "busy_ms_total": round(s.busy_s * 1000.0, 1),
+                    "busy_ms_max": round(s.max_busy_s * 1000.0, 1),
+                    "lock_errors": s.lock_errors,
+                }
+                for path, s in self._stats.items()
+            }
+
+    def close_idle(self) -> None:
+        """Close every idle connection (leased ones close when their thread ends)."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn._close()
+
+
+class WatchedConnection:
+    """A dedicated connection that notices commits made by other connections.
+
+    For in-memory caches of a table: :meth:`check` reports whether anything
+    committed to the file since the previous call through ``PRAGMA
+    data_version`` (which ignores the connection's own commits, so the
+    cache writes through this connection and updates itself), or whether
+    the path or file changed.  Not thread-safe; callers hold their own lock.
+    """
+
+    def __init__(self, path: Callable[[], str], timeout: float = BUSY_TIMEOUT_SECONDS):
+        self._path = path
+        self._timeout = timeout
+        self._conn: Optional[sqlite3.Connection] = None
+        self._where: Optional[Tuple[str, _FileId]] = None
+        self._data_version: Optional[int] = None
+
+    def check(self) -> Tuple[sqlite3.Connection, bool]:
+        """``(connection, changed)``; *changed* is True on the first call too."""
+        path = self._path()
+        if self._conn is not None and (path, _file_id(path)) != self._where:
+            self.close()
+        if self._conn is None:
+            self._conn = sqlite3.connect(path, timeout=self._timeout, check_same_thread=False)
+            apply_pragmas(self._conn)
+            self._where = (path, _file_id(path))
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        changed = version != self._data_version
+        self._data_version = version
+        return self._conn, changed
+
+    def close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+        self._conn = None
+        self._where = None
+        self._data_version = None
+
+
+_pool = ConnectionPool()
+
+
+def connect(path: str, init: Optional[Callable[[sqlite3.Connection], None]] = None) -> PooledConnection:
+    """Pooled replacement for ``sqlite3.connect(path, timeout=...)``."""
+    return _pool.connect(path, init)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return _pool.stats()
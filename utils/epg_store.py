@@ -0,0 +1,420 @@
+"""Persistent SQLite programme store for parsed XMLTV data.
+
+Parsed guide data used to live in the module-global ``cached_epg`` dict in
+app.py: rebuilt from scratch on every refresh, lost on restart, and resident
+in memory in full even though only a few hours of it are ever displayed.
+
+This module keeps programmes in ``DATA_DIR/db/epg.db`` instead:
+
+* Each refresh of a tuner writes a new *generation*: one ``generations`` row
+  plus its programmes, bulk-inserted with ``executemany`` inside a single
+  transaction.  The same transaction points ``active_generation`` at the new
+  generation and deletes the tuner's previous one, so readers see either the
+  old or the new guide, never a mix.
+* Each channel's programmes are normalised on the way in (see
+  :func:`normalise_programmes`): sorted by start, with missing or
+  overlapping stop times repaired, so a channel's schedule is a sequence of
+  disjoint intervals.
+* ``programmes`` is indexed on ``(generation, channel_id, start, stop)`` and
+  ``(generation, start)``.  Times are stored as UTC epoch seconds.  Because
+  intervals are disjoint, "on now" is the last programme starting at or
+  before the instant and "next N" the first N starting after it; both are a
+  single seek on the index, the on-disk equivalent of a bisect over a sorted
+  start-time array.  Each generation also records its longest programme so
+  window queries can bound the ``start`` range on both sides.
+
+All functions take the database path explicitly (like the other ``utils``
+helpers) so tests can point them at a temporary file.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils import db_pool
+from utils.programme import EMPTY, Programme, as_programme, datetime_to_ts
+
+logger = logging.getLogger(__name__)
+
+NO_GUIDE_TITLE = "No Guide Data Available"
+
+# Length given to the last programme of a channel when the feed omits its
+# stop time (one guide slot).
+DEFAULT_PROGRAMME_LENGTH = timedelta(minutes=30)
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS generations (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           tuner TEXT NOT NULL,
+           created_at TEXT NOT NULL,
+           channel_count INTEGER NOT NULL DEFAULT 0,
+           programme_count INTEGER NOT NULL DEFAULT 0,
+           max_duration INTEGER NOT NULL DEFAULT 0,
+           channels TEXT,
+           meta TEXT
+       )""",
+    """CREATE TABLE IF NOT EXISTS active_generation (
+           tuner TEXT PRIMARY KEY,
+           generation INTEGER NOT NULL
+       )""",
+    """CREATE TABLE IF NOT EXISTS programmes (
+           generation INTEGER NOT NULL,
+           channel_id TEXT NOT NULL,
+           start INTEGER,
+           stop INTEGER,
+           title TEXT,
+           desc TEXT,
+           icon TEXT,
+           categories TEXT,
+           colors TEXT
+       )""",
+    "CREATE INDEX IF NOT EXISTS idx_programmes_channel_range "
+    "ON programmes (generation, channel_id, start, stop)",
+    "CREATE INDEX IF NOT EXISTS idx_programmes_start ON programmes (generation, start)",
+)
+
+_PROGRAMME_COLUMNS = "channel_id, start, stop, title, desc, icon, categories, colors"
+
+
+def _create_schema(conn: sqlite3.Connection) -> None:
+    for stmt in _SCHEMA:
+        conn.execute(stmt)
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    """This thread's pooled connection to *db_path* (see utils/db_pool.py).
+
+    The schema is created on the first connection to each database file.
+    """
+    return db_pool.connect(db_path, init=_create_schema)
+
+
+_to_ts = datetime_to_ts
+
+
+def _encode_list(values: Optional[Iterable[str]]) -> Optional[str]:
+    values = list(values or ())
+    return json.dumps(values) if values else None
+
+
+def _decode_list(raw: Optional[str]) -> Tuple[str, ...]:
+    return tuple(json.loads(raw)) if raw else EMPTY
+
+
+def _row_to_programme(row) -> Programme:
+    """Convert a programmes row (without channel_id) to a programme record."""
+    start, stop, title, desc, icon, categories, colors = row
+    return Programme(title or "", desc or "", start, stop, icon or "",
+                     _decode_list(categories), _decode_list(colors))
+
+
+def normalise_programmes(progs: Iterable[Any]) -> List[Programme]:
+    """Return one channel's programmes sorted by start with sane stop times.
+
+    * Entries without a start time (the "No Guide Data Available"
+      placeholders) are kept, ahead of the dated ones.
+    * When several programmes share a start time, the first one listed wins.
+    * A missing stop, or one not after the start, becomes the next
+      programme's start (or ``start + DEFAULT_PROGRAMME_LENGTH`` for the
+      last one).  A stop running into the next programme is clipped to its
+      start.
+
+    Legacy programme dicts are converted to :class:`Programme` records;
+    repaired entries are copies, so the input is not modified.
+    """
+    records = [as_programme(p) for p in progs]
+    undated = [p for p in records if p.start_ts is None]
+    dated: List[Programme] = []
+    for p in sorted((p for p in records if p.start_ts is not None),
+                    key=lambda p: p.start_ts):
+        if dated and dated[-1].start_ts == p.start_ts:
+            continue
+        dated.append(p)
+
+    default_length = int(DEFAULT_PROGRAMME_LENGTH.total_seconds())
+    for i, p in enumerate(dated):
+        next_start = dated[i + 1].start_ts if i + 1 < len(dated) else None
+        stop = p.stop_ts
+        if stop is None or stop <= p.start_ts:
+            stop = next_start if next_start is not None else p.start_ts + default_length
+        elif next_start is not None and stop > next_start:
+            stop = next_start
+        if stop != p.stop_ts:
+            dated[i] = p.with_stop(stop)
+    return undated + dated
+
+
+# ---------------------------------------------------------------------------
+# Writes
+# ---------------------------------------------------------------------------
+
+def publish_generation(
+    db_path: str,
+    tuner: str,
+    channels: List[Dict[str, Any]],
+    epg: Dict[str, List[Dict[str, Any]]],
+    meta: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Store *epg* as the new active generation for *tuner* and return it.
+
+    *channels* (the parsed playlist) is stored alongside so the last good
+    lineup survives a restart.  Programmes are normalised per channel with
+    :func:`normalise_programmes`.  The previous generation of the tuner is
+    removed in the same transaction.
+    """
+    stats = {"count": 0, "max_duration": 0}
+
+    def _rows(gen_id):
+        for cid, progs in epg.items():
+            for p in normalise_programmes(progs):
+                start, stop = p.start_ts, p.stop_ts
+                if start is not None and stop is not None:
+                    stats["max_duration"] = max(stats["max_duration"], stop - start)
+                stats["count"] += 1
+                yield (
+                    gen_id, cid, start, stop, p.title, p.desc, p.icon,
+                    _encode_list(p.categories), _encode_list(p.colors),
+                )
+
+    created_at = datetime.now(timezone.utc).isoformat()
+    with _connect(db_path) as conn:
+        cur = conn.execute(
+            "INSERT INTO generations (tuner, created_at, channel_count, channels, meta) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (tuner, created_at, len(epg), json.dumps(channels), json.dumps(meta or {})),
+        )
+        gen_id = cur.lastrowid
+        conn.executemany(
+            "INSERT INTO programmes (generation, " + _PROGRAMME_COLUMNS + ") "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            _rows(gen_id),
+        )
+        conn.execute(
+            "UPDATE generations SET programme_count=?, max_duration=? WHERE id=?",
+            (stats["count"], stats["max_duration"], gen_id),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO active_generation (tuner, generation) VALUES (?, ?)",
+            (tuner, gen_id),
+        )
+        _delete_generations(conn, "tuner=? AND id != ?", (tuner, gen_id))
+
+    return {
+        "id": gen_id,
+        "tuner": tuner,
+        "created_at": created_at,
+        "channel_count": len(epg),
+        "programme_count": stats["count"],
+        "max_duration": stats["max_duration"],
+        "meta": dict(meta or {}),
+    }
+
+
+def _delete_generations(conn: sqlite3.Connection, where: str, params) -> None:
+    old_ids = [r[0] for r in conn.execute("SELECT id FROM generations WHERE " + where, params)]
+    if old_ids:
+        conn.executemany("DELETE FROM programmes WHERE generation=?", [(i,) for i in old_ids])
+        conn.executemany("DELETE FROM generations WHERE id=?", [(i,) for i in old_ids])
+
+
+def drop_tuner(db_path: str, tuner: str) -> None:
+    """Remove every stored generation of a deleted tuner."""
+    with _connect(db_path) as conn:
+        conn.execute("DELETE FROM active_generation WHERE tuner=?", (tuner,))
+        _delete_generations(conn, "tuner=?", (tuner,))
+
+
+def rename_tuner(db_path: str, old_name: str, new_name: str) -> None:
+    """Carry a tuner's stored guide over to its new name."""
+    with _connect(db_path) as conn:
+        conn.execute("UPDATE generations SET tuner=? WHERE tuner=?", (new_name, old_name))
+        conn.execute("UPDATE active_generation SET tuner=? WHERE tuner=?", (new_name, old_name))
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+def get_active_generation(db_path: str, tuner: str) -> Optional[Dict[str, Any]]:
+    """Return the active generation of *tuner* (including its channel list)."""
+    with _connect(db_path) as conn:
+        row = conn.execute(
+            "SELECT g.id, g.tuner, g.created_at, g.channel_count, g.programme_count, "
+            "g.max_duration, g.channels, g.meta "
+            "FROM active_generation a JOIN generations g ON g.id = a.generation "
+            "WHERE a.tuner=?",
+            (tuner,),
+        ).fetchone()
+    if not row:
+        return None
+    return {
+        "id": row[0],
+        "tuner": row[1],
+        "created_at": row[2],
+        "channel_count": row[3],
+        "programme_count": row[4],
+        "max_duration": row[5],
+        "channels": json.loads(row[6]) if row[6] else [],
+        "meta": json.loads(row[7]) if row[7] else {},
+    }
+
+
+def get_generation_meta(db_path: str, tuner: str) -> Optional[Dict[str, Any]]:
+    """Return the ``meta`` of *tuner*'s active generation, or None if it has none."""
+    with _connect(db_path) as conn:
+        row = conn.execute(
+            "SELECT g.meta FROM active_generation a JOIN generations g ON g.id = a.generation "
+            "WHERE a.tuner=?",
+            (tuner,),
+        ).fetchone()
+    if not row:
+        return None
+    return json.loads(row[0]) if row[0] else {}
+
+
+def programmes_in_window(
+    db_path: str,
+    generation: Dict[str, Any],
+    start: datetime,
+    end: datetime,
+    include_undated: bool = False,
+    channel_ids: Optional[Iterable[str]] = None,
+) -> Dict[str, List[Programme]]:
+    """Return ``{channel_id: [programme, ...]}`` overlapping ``[start, end)``.
+
+    Programmes are ordered by start time.  With *include_undated*, entries
+    without a start time (the "No Guide Data Available" placeholders) are
+    returned as well, ahead of the dated ones.  *channel_ids* limits the
+    result to the dated programmes of those channels (one index seek each).
+    """
+    start_ts, end_ts = _to_ts(start), _to_ts(end)
+    out: Dict[str, List[Dict[str, Any]]] = {}
+    with _connect(db_path) as conn:
+        if channel_ids is not None:
+            for cid in channel_ids:
+                for row in conn.execute(
+                    "SELECT " + _PROGRAMME_COLUMNS + " FROM programmes "
+                    "WHERE generation=? AND channel_id=? AND start >= ? AND start < ? AND stop > ? "
+                    "ORDER BY start",
+                    (generation["id"], cid, start_ts - generation["max_duration"], end_ts, start_ts),
+                ):
+                    out.setdefault(row[0], []).append(_row_to_programme(row[1:]))
+            return out
+        if include_undated:
+            for row in conn.execute(
+                "SELECT " + _PROGRAMME_COLUMNS + " FROM programmes "
+                "WHERE generation=? AND start IS NULL ORDER BY rowid",
+                (generation["id"],),
+            ):
+                out.setdefault(row[0], []).append(_row_to_programme(row[1:]))
+        for row in conn.execute(
+            "SELECT " + _PROGRAMME_COLUMNS + " FROM programmes "
+            "WHERE generation=? AND start >= ? AND start < ? AND stop > ? "
+            "ORDER BY channel_id, start",
+            (generation["id"], start_ts - generation["max_duration"], end_ts, start_ts),
+        ):
+            out.setdefault(row[0], []).append(_row_to_programme(row[1:]))
+    return out
+
+
+def current_programme(
+    db_path: str,
+    generation: Dict[str, Any],
+    channel_id: str,
+    at: datetime,
+) -> Optional[Programme]:
+    """Return the programme airing on *channel_id* at *at* (inclusive bounds).
+
+    Programmes of a channel are disjoint, so this is the last one starting
+    at or before *at*, provided it has not ended yet.
+    """
+    ts = _to_ts(at)
+    with _connect(db_path) as conn:
+        row = conn.execute(
+            "SELECT start, stop, title, desc, icon, categories, colors FROM programmes "
+            "WHERE generation=? AND channel_id=? AND start <= ? "
+            "ORDER BY start DESC LIMIT 1",
+            (generation["id"], channel_id, ts),
+        ).fetchone()
+    if not row or row[1] is None or row[1] < ts:
+        return None
+    return _row_to_programme(row)
+
+
+def upcoming_programmes(
+    db_path: str,
+    generation: Dict[str, Any],
+    channel_id: str,
+    after: datetime,
+    limit: int = 1,
+) -> List[Programme]:
+    """Return the next *limit* programmes of *channel_id* starting after *after*."""
+    with _connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT start, stop, title, desc, icon, categories, colors FROM programmes "
+            "WHERE generation=? AND channel_id=? AND start > ? "
+            "ORDER BY start LIMIT ?",
+            (generation["id"], channel_id, _to_ts(after), limit),
+        ).fetchall()
+    return [_row_to_programme(r) for r in rows]
+
+
+def fallback_programme(
+    db_path: str,
+    generation: Dict[str, Any],
+    channel_id: str,
+) -> Optional[Programme]:
+    """Return the first stored entry for a channel, preferring real titles.
+
+    Used when nothing is airing right now.  "First" is stored order: the
+    earliest start, with undated entries ahead of dated ones (see
+    :func:`normalise_programmes`), not feed order.
+    """
+    with _connect(db_path) as conn:
+        row = conn.execute(
+            "SELECT start, stop, title, desc, icon, categories, colors FROM programmes "
+            "WHERE generation=? AND channel_id=? "
+            "ORDER BY (title IS NULL OR title = '' OR title = ?), rowid LIMIT 1",
+            (generation["id"], channel_id, NO_GUIDE_TITLE),
+        ).fetchone()
+    return _row_to_programme(row) if row else None
+
+
+def sample_programmes(
+    db_path: str,
+    generation: Optional[Dict[str, Any]],
+    limit: int = 2000,
+) -> List[Programme]:
+    """Return up to *limit* programmes of a generation (for the memory report)."""
+    if not generation:
+        return []
+    with _connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT start, stop, title, desc, icon, categories, colors FROM programmes "
+            "WHERE generation=? LIMIT ?",
+            (generation["id"], limit),
+        ).fetchall()
+    return [_row_to_programme(r) for r in rows]
+
+
+def generation_stats(db_path: str, generation: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Channel / entry counts of a generation, for the diagnostics cache view."""
+    if not generation:
+        return {"generation": None, "epg_channel_count": 0, "epg_entry_count": 0}
+    with _connect(db_path) as conn:
+        row = conn.execute(
+            "SELECT channel_count, programme_count, created_at FROM generations WHERE id=?",
+            (generation["id"],),
+        ).fetchone()
+    if not row:
+        return {"generation": None, "epg_channel_count": 0, "epg_entry_count": 0}
+    return {
+        "generation": generation["id"],
+        "epg_channel_count": row[0],
+        "epg_entry_count": row[1],
+        "generation_created_at": row[2],
+    }
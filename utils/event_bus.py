@@ -0,0 +1,96 @@
+"""In-memory publish/subscribe bus behind ``/api/events``.
+
+Clients used to poll for state that changes a few times an hour: the guide
+after a refresh, the wall-clock slots of the virtual channels, the CRT QR
+overlay.  Every poll paid a request, an auth lookup and settings reads.
+
+:class:`EventBus` keeps a numbered history of the last ``history`` events
+and the latest event of every topic.  Subscribers (one SSE stream or one
+long-poll request each) block on a single shared condition variable, so an
+idle connection costs a parked thread and nothing else; publishing wakes
+them all and each picks out the events after the id it has seen.
+
+Topics are dotted names (``guide``, ``qr``, ``slot.news``); subscribing to
+``slot`` receives every ``slot.*`` topic.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Any, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+
+class Event(NamedTuple):
+    id: int
+    topic: str
+    data: Any
+
+
+def _wanted(topic: str, topics: Optional[Set[str]]) -> bool:
+    return topics is None or topic in topics or topic.split(".", 1)[0] in topics
+
+
+class EventBus:
+    """Numbered events with a bounded history; see the module docstring."""
+
+    def __init__(self, history: int = 256):
+        self._cond = threading.Condition()
+        self._events: "deque[Event]" = deque(maxlen=history)
+        self._latest: dict = {}
+        self.last_id = 0
+
+    def publish(self, topic: str, data: Any, only_if_changed: bool = False) -> Optional[Event]:
+        """Append an event and wake all subscribers.
+
+        With *only_if_changed*, nothing is published when *data* equals the
+        topic's latest event (for state that is re-evaluated periodically).
+        """
+        with self._cond:
+            latest = self._latest.get(topic)
+            if only_if_changed and latest is not None and latest.data == data:
+                return None
+            self.last_id += 1
+            event = Event(self.last_id, topic, data)
+            self._events.append(event)
+            self._latest[topic] = event
+            self._cond.notify_all()
+            return event
+
+    def latest(self, topics: Optional[Iterable[str]] = None) -> Tuple[List[Event], int]:
+        """The current event of every (wanted) topic, oldest first, and the cursor after them."""
+        wanted = set(topics) if topics is not None else None
+        with self._cond:
+            events = sorted((e for t, e in self._latest.items() if _wanted(t, wanted)),
+                            key=lambda e: e.id)
+            return events, self.last_id
+
+    def _after(self, after: int, topics: Optional[Set[str]]) -> Optional[List[Event]]:
+        if after == self.last_id:
+            return []
+        if after > self.last_id or self._events[0].id > after + 1:
+            return None  # from another process, or fell out of the history
+        return [e for e in self._events if e.id > after and _wanted(e.topic, topics)]
+
+    def wait(self, after: int, topics: Optional[Iterable[str]] = None,
+             timeout: Optional[float] = None) -> Tuple[Optional[List[Event]], int]:
+        """Wait up to *timeout* for events with an id above *after*.
+
+        Returns ``(events, cursor)``; pass *cursor* as *after* next time.
+        *events* is empty on timeout, or None when the events after *after*
+        are no longer in the history (resync from :meth:`latest`).
+        """
+        wanted = set(topics) if topics is not None else None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                events = self._after(after, wanted)
+                if events is None or events:
+                    return events, self.last_id
+                # Events of other topics still move the cursor forward.
+                after = self.last_id
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return [], after
+                self._cond.wait(remaining)
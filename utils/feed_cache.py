@@ -0,0 +1,203 @@
+"""On-disk cache of raw M3U / XMLTV feed bodies with HTTP revalidation.
+
+Every refresh used to download and re-parse a tuner's full playlist and
+guide even when the provider had not changed anything.  This module keeps
+the last body of each feed URL in ``DATA_DIR/xmltv`` next to a small JSON
+sidecar holding its ``ETag``, ``Last-Modified`` and SHA-256:
+
+* :func:`revalidate` sends ``If-None-Match`` / ``If-Modified-Since`` from the
+  sidecar.  On ``304 Not Modified`` the cached body is reused as-is; on
+  ``200`` the new body is streamed to disk (hashed on the way) and replaces
+  the old one.  For servers without validators the hash still tells the
+  caller whether anything changed.
+* When the request fails, the previous body is returned instead so a flaky
+  provider does not wipe the guide.
+
+The caller decides what "unchanged" means by comparing
+:attr:`FeedResult.sha256` with the hashes it recorded last time.  Like the
+other ``utils`` helpers, every function takes the cache directory explicitly.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, NamedTuple, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Size of the chunks read from the HTTP response and from cached bodies.
+CHUNK_SIZE = 64 * 1024
+
+# Revalidations of one URL can overlap (the scheduler and a manual refresh,
+# or a fetch that outlived its timeout).  Each download goes to its own temp
+# file, and swapping in the body and its sidecar happens under a per-URL lock
+# so they always describe the same download.
+_publish_locks: Dict[str, threading.Lock] = {}
+_publish_locks_guard = threading.Lock()
+
+
+def _publish_lock(body_path: str) -> threading.Lock:
+    with _publish_locks_guard:
+        return _publish_locks.setdefault(body_path, threading.Lock())
+
+
+def _temp_file(final_path: str, mode: str):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(final_path) or ".",
+                               prefix=os.path.basename(final_path) + ".", suffix=".tmp")
+    return open(fd, mode, **({} if "b" in mode else {"encoding": "utf-8"})), tmp
+
+
+class FeedResult(NamedTuple):
+    """Outcome of :func:`revalidate` for one feed URL."""
+
+    url: str
+    path: Optional[str]              # cached body on disk; None if nothing was ever fetched
+    sha256: Optional[str]            # hash of the cached body
+    not_modified: bool               # True when the body on disk was reused
+    encoding: Optional[str] = None   # charset reported by the server (text feeds)
+    content_encoding: Optional[str] = None
+
+
+def _paths(cache_dir: str, url: str):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+    base = os.path.join(cache_dir, key)
+    return base + ".body", base + ".json"
+
+
+def load_meta(cache_dir: str, url: str) -> Dict[str, Any]:
+    """Return the sidecar of *url*, or ``{}`` when its body is not cached."""
+    body_path, meta_path = _paths(cache_dir, url)
+    if not os.path.isfile(body_path):
+        return {}
+    try:
+        with open(meta_path, "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+    except (OSError, ValueError):
+        return {}
+    return meta if isinstance(meta, dict) and meta.get("url") == url else {}
+
+
+def _write_meta(meta_path: str, meta: Dict[str, Any]) -> None:
+    fh, tmp = _temp_file(meta_path, "w")
+    try:
+        with fh:
+            json.dump(meta, fh)
+        os.replace(tmp, meta_path)
+    except BaseException:
+        _unlink(tmp)
+        raise
+
+
+def _unlink(path: Optional[str]) -> None:
+    if path:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _result(url: str, body_path: str, meta: Dict[str, Any], not_modified: bool) -> FeedResult:
+    if not meta:
+        return FeedResult(url, None, None, False)
+    return FeedResult(url, body_path, meta.get("sha256"), not_modified,
+                      meta.get("encoding"), meta.get("content_encoding"))
+
+
+def _header(headers, name: str) -> Optional[str]:
+    value = headers.get(name) if headers is not None else None
+    return value if isinstance(value, str) and value else None
+
+
+def revalidate(cache_dir: str, url: str, timeout: float = 15) -> FeedResult:
+    """Fetch *url* conditionally and return the cached body.
+
+    Network and HTTP errors are logged and answered with the previously
+    cached body (``not_modified=True``) when there is one.
+    """
+    body_path, meta_path = _paths(cache_dir, url)
+    meta = load_meta(cache_dir, url)
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        r = requests.get(url, timeout=timeout, stream=True, headers=headers)
+    except Exception as e:
+        logger.warning("feed_cache: could not fetch %s: %s", url, e)
+        return _result(url, body_path, meta, True)
+
+    tmp_path = None
+    try:
+        if r.status_code == 304 and meta:
+            return _result(url, body_path, meta, True)
+        r.raise_for_status()
+
+        digest = hashlib.sha256()
+        fh, tmp_path = _temp_file(body_path, "wb")
+        with fh:
+            for chunk in r.iter_content(chunk_size=CHUNK_SIZE):
+                if chunk:
+                    digest.update(chunk)
+                    fh.write(chunk)
+
+        encoding = getattr(r, "encoding", None)
+        meta = {
+            "url": url,
+            "etag": _header(r.headers, "ETag"),
+            "last_modified": _header(r.headers, "Last-Modified"),
+            "encoding": encoding if isinstance(encoding, str) else None,
+            "content_encoding": _header(r.headers, "Content-Encoding"),
+            "sha256": digest.hexdigest(),
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with _publish_lock(body_path):
+            os.replace(tmp_path, body_path)
+            tmp_path = None
+            _write_meta(meta_path, meta)
+        return _result(url, body_path, meta, False)
+    except Exception as e:
+        logger.warning("feed_cache: could not refresh %s: %s", url, e)
+        _unlink(tmp_path)
+        return _result(url, body_path, load_meta(cache_dir, url), True)
+    finally:
+        r.close()
+
+
+def cached(cache_dir: str, url: str) -> FeedResult:
+    """Return the cached body of *url* without touching the network."""
+    body_path, _ = _paths(cache_dir, url)
+    return _result(url, body_path, load_meta(cache_dir, url), True)
+
+
+def iter_body(result: FeedResult) -> Iterator[bytes]:
+    """Yield the cached body of *result* in ``CHUNK_SIZE`` pieces."""
+    if not result.path:
+        return
+    with open(result.path, "rb") as fh:
+        while True:
+            chunk = fh.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def read_text(result: FeedResult) -> str:
+    """Return the cached body of a text feed (M3U) decoded with its charset."""
+    if not result.path:
+        return ""
+    with open(result.path, "rb") as fh:
+        data = fh.read()
+    try:
+        return data.decode(result.encoding or "utf-8", errors="replace")
+    except LookupError:
+        return data.decode("utf-8", errors="replace")
@@ -0,0 +1,91 @@
+"""Cache of rendered ``/guide`` channel rows.
+
+A row's markup depends only on the tuner's guide generation, the grid
+window and the row's position, not on the user (hidden channels and
+favourites are applied client-side by ``user-prefs.js``) and not on the
+theme (a class on ``<body>``).  So every viewer in the same 30-minute slot
+can share the rows rendered for the first one.
+
+:class:`GuideRowCache` keeps the rows of the last few keys (typically the
+current slot and the pre-warmed next one).  Each :class:`RowSlot` also
+holds the guide data its rows are rendered from, so a row can be
+re-rendered on its own when its "now" highlight changes mid-slot (a
+programme starting at 10:05 in the 10:00 slot): every cached row carries
+the time its markup stops being valid.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+Row = Tuple[str, Optional[datetime]]  # (markup, valid until; None = whole slot)
+
+
+class RowSlot:
+    """Rendered rows for one cache key, filled lazily row by row."""
+
+    __slots__ = ("channels", "data", "rows", "boundaries")
+
+    def __init__(self, channels: List[Dict[str, Any]], data: Any):
+        self.channels = channels
+        self.data = data
+        self.rows: List[Optional[Row]] = [None] * len(channels)
+        # Sorted times at which some row's "now" highlight changes; filled
+        # lazily by the app (used for the /guide ETag).
+        self.boundaries: Optional[List[datetime]] = None
+
+
+class GuideRowCache:
+    """Rendered guide rows keyed by (generation, grid_start, first row index)."""
+
+    def __init__(self, max_slots: int = 3):
+        self.max_slots = max_slots
+        self._lock = threading.Lock()
+        self._slots: "OrderedDict[Hashable, RowSlot]" = OrderedDict()
+        self.hits = 0
+        self.renders = 0
+
+    def slot(self, key: Hashable, channels: List[Dict[str, Any]], load: Callable[[], Any]) -> RowSlot:
+        """Return the slot for *key*, creating it with ``load()`` as its data.
+
+        A slot built for a different channel list object (the tuner was
+        switched or refreshed) is replaced.
+        """
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None and slot.channels is channels:
+                self._slots.move_to_end(key)
+                return slot
+        slot = RowSlot(channels, load())
+        with self._lock:
+            self._slots[key] = slot
+            self._slots.move_to_end(key)
+            while len(self._slots) > self.max_slots:
+                self._slots.popitem(last=False)
+        return slot
+
+    def row(self, slot: RowSlot, index: int, now: datetime, render: Callable[[int], Row]) -> str:
+        """Markup of row *index*, re-rendered with ``render(index)`` when missing or expired."""
+        cached = slot.rows[index]
+        if cached is not None and (cached[1] is None or now < cached[1]):
+            self.hits += 1
+            return cached[0]
+        self.renders += 1
+        cached = slot.rows[index] = render(index)
+        return cached[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slots.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "slots": len(self._slots),
+                "rows": sum(sum(r is not None for r in s.rows) for s in self._slots.values()),
+                "hits": self.hits,
+                "renders": self.renders,
+            }
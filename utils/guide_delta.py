@@ -0,0 +1,191 @@
+"""Per-channel changes between guide generations, for ``/api/guide/delta``.
+
+A refresh usually changes a handful of channels out of thousands, yet a
+client that wants to stay current has to refetch the whole snapshot.
+:class:`GuideDeltaLog` records, for every published generation, which
+channels changed since the tuner's previous one:
+
+* When a generation is published, each channel gets a digest of its
+  playlist metadata and programmes (:func:`channel_hashes`).  Comparing
+  them with the previous generation's digests gives the changed and removed
+  channel ids.  This happens once, at refresh time.
+* Programmes are only compared over the time span both generations hold
+  in full.  The retention window (and the provider's own feed horizon)
+  slides with every refresh, so an unchanged feed loses programmes at one
+  end and gains some at the other.  Each digest keeps the start, stop and
+  hash of every dated programme.  The span runs from the later of the two
+  first starts to the earlier of the two last stops, clipped to both
+  ingest windows.  Every programme overlapping it is compared, including
+  the one on air and the first and last ones both generations share.
+  Programmes that merely scrolled into or out of the window do not mark a
+  channel changed.  Clients pick those up when their display window moves.
+* The last ``max_deltas`` deltas are kept per tuner, in memory only.
+  :meth:`GuideDeltaLog.since` merges the ones after a client's generation;
+  ``None`` means the client is too far behind (or the server restarted)
+  and must resync from the full snapshot.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import struct
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from utils.programme import as_programme
+
+
+_PROGRAMME = struct.Struct("<qq8s")
+
+Window = Tuple[Optional[int], Optional[int]]
+
+
+class ChannelDigest(NamedTuple):
+    """What :func:`channel_hashes` remembers about one channel."""
+
+    meta: str          # playlist entries and undated programmes (placeholders)
+    full: str          # every programme; equal means unchanged without further work
+    programmes: bytes  # packed (start, stop, hash) of every dated programme
+
+
+def channel_hashes(channels: List[Dict[str, Any]], epg: Dict[str, Iterable[Any]]) -> Dict[str, ChannelDigest]:
+    """Digest of every channel id in the lineup or the guide."""
+    meta: Dict[str, List[Dict[str, Any]]] = {}
+    for ch in channels:
+        meta.setdefault(ch.get("tvg_id"), []).append(ch)
+    out = {}
+    for cid in set(meta) | set(epg):
+        head = hashlib.sha1(json.dumps(meta.get(cid, []), sort_keys=True, default=str).encode("utf-8"))
+        full = hashlib.sha1()
+        dated = []
+        for p in epg.get(cid, ()):
+            p = as_programme(p)
+            key = repr((p.start_ts, p.stop_ts, p.title, p.desc, p.icon,
+                        p.categories, p.colors)).encode("utf-8")
+            full.update(key)
+            if p.start_ts is None:
+                head.update(key)
+                continue
+            stop = p.stop_ts if p.stop_ts is not None else p.start_ts
+            dated.append(_PROGRAMME.pack(p.start_ts, stop, hashlib.blake2b(key, digest_size=8).digest()))
+        out[cid] = ChannelDigest(head.hexdigest(), full.hexdigest(), b"".join(dated))
+    return out
+
+
+def _overlap(a: Window, b: Window) -> Window:
+    lo = max((x for x in (a[0], b[0]) if x is not None), default=None)
+    hi = min((x for x in (a[1], b[1]) if x is not None), default=None)
+    return lo, hi
+
+
+def _changed(old: Optional[ChannelDigest], new: ChannelDigest, window: Window) -> bool:
+    """True when *new* differs from *old* over the span both generations hold."""
+    if old is None or old.meta != new.meta:
+        return True
+    if old.full == new.full:
+        return False
+    before = list(_PROGRAMME.iter_unpack(old.programmes))
+    after = list(_PROGRAMME.iter_unpack(new.programmes))
+    if not before or not after:
+        return True
+    lo, hi = _overlap(window, (max(min(r[0] for r in before), min(r[0] for r in after)),
+                               min(max(r[1] for r in before), max(r[1] for r in after))))
+    if lo >= hi:
+        return True
+
+    def inside(records):
+        return sorted(r for r in records if r[1] > lo and r[0] < hi)
+
+    return inside(before) != inside(after)
+
+
+class _TunerState:
+    __slots__ = ("generation", "hashes", "order", "window", "deltas")
+
+    def __init__(self, max_deltas: int):
+        self.generation: Optional[int] = None
+        self.hashes: Dict[str, ChannelDigest] = {}
+        self.window: Window = (None, None)
+        self.order: List[str] = []
+        self.deltas: "deque[Dict[str, Any]]" = deque(maxlen=max_deltas)
+
+
+class GuideDeltaLog:
+    """Remembers the last *max_deltas* per-channel deltas of every tuner."""
+
+    def __init__(self, max_deltas: int = 5):
+        self.max_deltas = max_deltas
+        self._lock = threading.Lock()
+        self._tuners: Dict[str, _TunerState] = {}
+
+    def record(self, tuner: str, generation: int, channels: List[Dict[str, Any]],
+               epg: Dict[str, Iterable[Any]], window: Window = (None, None)) -> None:
+        """Diff a newly published generation of *tuner* against its previous one.
+
+        *window* is the ``(lo, hi)`` epoch-seconds range the guide was
+        filtered to at ingest (None = open); see the module docstring.
+        """
+        hashes = channel_hashes(channels, epg)
+        order = [ch.get("tvg_id") for ch in channels]
+        with self._lock:
+            state = self._tuners.setdefault(tuner, _TunerState(self.max_deltas))
+            if state.generation is not None:
+                # Removed channels drop out and new ones go to the end unless
+                # the lineup says otherwise; only then is the order sent.
+                old_ids, new_ids = set(state.order), set(order)
+                expected = ([cid for cid in state.order if cid in new_ids]
+                            + [cid for cid in order if cid not in old_ids])
+                state.deltas.append({
+                    "from": state.generation,
+                    "to": generation,
+                    "changed": {cid for cid, h in hashes.items()
+                                if _changed(state.hashes.get(cid), h, _overlap(state.window, window))},
+                    "removed": set(state.hashes) - set(hashes),
+                    "reordered": order != expected,
+                })
+            state.generation, state.hashes, state.order = generation, hashes, order
+            state.window = window
+
+    def since(self, tuner: str, generation: int) -> Optional[Dict[str, Any]]:
+        """Changes of *tuner* from *generation* to its latest recorded one.
+
+        Returns ``{"generation", "changed", "removed", "order"}``, or None
+        when *generation* is not covered by the log.  ``order`` is the new
+        lineup order, or None when applying the delta (drop removed channels,
+        append new ones) already yields it.
+        """
+        with self._lock:
+            state = self._tuners.get(tuner)
+            if state is None or state.generation is None:
+                return None
+            current = state.generation
+            deltas = list(state.deltas)
+            hashes, order = state.hashes, state.order
+        if generation == current:
+            return {"generation": current, "changed": set(), "removed": set(), "order": None}
+        for i, delta in enumerate(deltas):
+            if delta["from"] == generation:
+                break
+        else:
+            return None
+        changed: Set[str] = set()
+        removed: Set[str] = set()
+        reordered = False
+        for delta in deltas[i:]:
+            changed |= delta["changed"]
+            removed |= delta["removed"]
+            reordered = reordered or delta["reordered"]
+        # A channel removed and then re-added is not at the end of the old order.
+        reordered = reordered or any(cid in hashes for cid in removed)
+        return {
+            "generation": current,
+            "changed": {cid for cid in changed if cid in hashes},
+            "removed": {cid for cid in removed if cid not in hashes},
+            "order": list(order) if reordered else None,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tuners.clear()
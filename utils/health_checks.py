@@ -21,6 +21,8 @@ import time
 from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
 
+from utils import db_pool
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,7 +36,7 @@ def check_db(db_path: str) -> Dict[str, Any]:
     exists = os.path.exists(abs_path)
     size_bytes = os.path.getsize(abs_path) if exists else 0
     try:
-        with sqlite3.connect(db_path, timeout=5) as conn:
+        with db_pool.connect(db_path) as conn:
             conn.execute("SELECT 1")
         return {
             "status": "PASS",
@@ -72,7 +74,7 @@ def check_schema(db_path: str) -> Dict[str, Any]:
         "must_change_password",
     }
     try:
-        with sqlite3.connect(db_path, timeout=5) as conn:
+        with db_pool.connect(db_path) as conn:
             cur = conn.execute(
                 "SELECT name FROM sqlite_master WHERE type='table'"
             )
@@ -91,7 +93,7 @@ def check_schema(db_path: str) -> Dict[str, Any]:
             }
 
         # Check that all expected columns are present in the users table.
-        with sqlite3.connect(db_path, timeout=5) as conn:
+        with db_pool.connect(db_path) as conn:
             col_cur = conn.execute("PRAGMA table_info(users)")
             existing_cols = {row[1] for row in col_cur.fetchall()}
         missing_columns = sorted(required_columns - existing_cols)
@@ -135,7 +137,7 @@ def check_schema(db_path: str) -> Dict[str, Any]:
 def check_tuners(tuner_db_path: str) -> Dict[str, Any]:
     """Verify that the tuner database has at least one configured tuner."""
     try:
-        with sqlite3.connect(tuner_db_path, timeout=5) as conn:
+        with db_pool.connect(tuner_db_path) as conn:
             cur = conn.execute("SELECT COUNT(*) FROM tuners")
             count = cur.fetchone()[0]
         if count == 0:
@@ -164,7 +166,7 @@ def check_tuners(tuner_db_path: str) -> Dict[str, Any]:
 def check_xmltv(tuner_db_path: str) -> Dict[str, Any]:
     """Check whether any tuner has a non-empty XMLTV URL configured."""
     try:
-        with sqlite3.connect(tuner_db_path, timeout=5) as conn:
+        with db_pool.connect(tuner_db_path) as conn:
             cur = conn.execute("SELECT name, xml FROM tuners")
             rows = cur.fetchall()
 
@@ -345,7 +347,7 @@ def check_tuner_connectivity(tuner_db_path: str) -> List[Dict[str, Any]]:
     """
     tuners_result: List[Dict[str, Any]] = []
     try:
-        with sqlite3.connect(tuner_db_path, timeout=5) as conn:
+        with db_pool.connect(tuner_db_path) as conn:
             try:
                 cur = conn.execute(
                     "SELECT name, xml, m3u, tuner_type, sources FROM tuners"
@@ -509,13 +511,19 @@ def check_cache_state(tuner_db_path: str) -> Dict[str, Any]:
     """Return runtime cache / EPG state useful for stream-play troubleshooting (bug #203).
 
     Reads the live in-memory globals from the app module so the data is
-    always current (not a stale DB snapshot).
+    always current (not a stale DB snapshot).  EPG counts come from the
+    active generation in the programme store.
     """
     try:
         import app as app_module  # noqa: PLC0415
 
         channels = getattr(app_module, "cached_channels", [])
-        epg = getattr(app_module, "cached_epg", {})
+        get_epg_stats = getattr(app_module, "get_epg_stats", None)
+        get_epg_memory_report = getattr(app_module, "get_epg_memory_report", None)
+        get_compression_stats = getattr(app_module, "get_compression_stats", None)
+        get_settings_cache_stats = getattr(app_module, "get_settings_cache_stats", None)
+        get_tuner_generation = getattr(app_module, "get_tuner_generation", None)
+        get_user_cache_stats = getattr(app_module, "get_user_cache_stats", None)
         active_tuner = getattr(app_module, "get_current_tuner", lambda: None)()
         currently_playing = getattr(app_module, "CURRENTLY_PLAYING", None)
 
@@ -535,7 +543,7 @@ def check_cache_state(tuner_db_path: str) -> Dict[str, Any]:
         refresh_interval = None
         last_refresh_info: Dict[str, str] = {}
         try:
-            with sqlite3.connect(tuner_db_path, timeout=5) as conn:
+            with db_pool.connect(tuner_db_path) as conn:
                 cur = conn.execute(
                     "SELECT key, value FROM settings WHERE key IN ('auto_refresh_enabled', 'auto_refresh_interval_hours') "
                     "OR key LIKE 'last_auto_refresh:%'"
@@ -551,13 +559,49 @@ def check_cache_state(tuner_db_path: str) -> Dict[str, Any]:
         except Exception:
             pass
 
-        epg_channel_count = len(epg)
-        epg_entry_count = sum(len(v) for v in epg.values())
+        epg_stats: Dict[str, Any] = {}
+        try:
+            if get_epg_stats is not None:
+                epg_stats = get_epg_stats()
+        except Exception:
+            pass
+        memory: Dict[str, Any] = {}
+        try:
+            if get_epg_memory_report is not None:
+                memory = get_epg_memory_report()
+        except Exception:
+            pass
+        compression: Dict[str, Any] = {}
+        try:
+            if get_compression_stats is not None:
+                compression = get_compression_stats()
+        except Exception:
+            pass
+        settings_cache: Dict[str, Any] = {}
+        try:
+            if get_settings_cache_stats is not None:
+                settings_cache = get_settings_cache_stats()
+        except Exception:
+            pass
+        user_cache: Dict[str, Any] = {}
+        try:
+            if get_user_cache_stats is not None:
+                user_cache = get_user_cache_stats()
+        except Exception:
+            pass
+        tuner_generation = None
+        try:
+            if get_tuner_generation is not None:
+                tuner_generation = get_tuner_generation()
+        except Exception:
+            pass
+        epg_channel_count = int(epg_stats.get("epg_channel_count") or 0)
+        epg_entry_count = int(epg_stats.get("epg_entry_count") or 0)
 
         # All configured tuner names (for UI selects)
         all_tuners: List[str] = []
         try:
-            with sqlite3.connect(tuner_db_path, timeout=5) as conn:
+            with db_pool.connect(tuner_db_path) as conn:
                 cur = conn.execute("SELECT name FROM tuners ORDER BY name")
                 all_tuners = [row[0] for row in cur.fetchall()]
         except Exception:
@@ -568,12 +612,20 @@ def check_cache_state(tuner_db_path: str) -> Dict[str, Any]:
             "channel_count": len(channels),
             "epg_channel_count": epg_channel_count,
             "epg_entry_count": epg_entry_count,
+            "epg_generation": epg_stats.get("generation"),
+            "legacy_bytes_per_programme": memory.get("legacy_bytes_per_programme"),
+            "compact_bytes_per_programme": memory.get("compact_bytes_per_programme"),
             "currently_playing": currently_playing,
             "sample_channels": sample_channels,
             "auto_refresh_enabled": refresh_enabled,
             "auto_refresh_interval_hours": refresh_interval,
             "last_refresh_per_tuner": last_refresh_info,
             "all_tuners": all_tuners,
+            "compression": compression,
+            "settings_cache": settings_cache,
+            "user_cache": user_cache,
+            "tuner_generation": tuner_generation,
+            "db_connections": db_pool.stats(),
         }
 
     except Exception as exc:  # noqa: BLE001
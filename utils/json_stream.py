@@ -0,0 +1,49 @@
+"""Incremental JSON encoding for responses with one long list.
+
+``jsonify`` builds the whole response text while the Python structure it
+came from is still alive, so a large channel list briefly exists twice and
+nothing is sent until the last channel is encoded.
+:func:`iter_json_object` encodes the same object a batch of list items at a
+time, so a response generator holds one batch of text at once and the
+first bytes go out immediately.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+from typing import Any, Callable, Dict, Iterable, Iterator
+
+_SEPARATORS = (",", ":")  # compact, like jsonify outside debug mode
+
+
+def iter_json_object(fields: Dict[str, Any], key: str, items: Iterable[Any],
+                     batch: int = 100, sort_keys: bool = True, ensure_ascii: bool = True,
+                     default: Callable[[Any], Any] = str) -> Iterator[str]:
+    """Yield the JSON text of ``{**fields, key: list(items)}`` in chunks.
+
+    *items* is consumed lazily; each chunk holds up to *batch* encoded items.
+    *sort_keys*, *ensure_ascii* and *default* apply at every level, as in
+    ``json.dumps``; pass the app's JSON provider settings so the text is
+    byte-for-byte what ``jsonify`` would send.  With *sort_keys* the list
+    sits at its sorted place among *fields*, otherwise it comes last.
+    """
+    dumps = functools.partial(json.dumps, separators=_SEPARATORS, sort_keys=sort_keys,
+                              ensure_ascii=ensure_ascii, default=default)
+    fields = {k: v for k, v in fields.items() if k != key}
+    before, after = dict(fields), {}
+    if sort_keys:
+        before = {k: v for k, v in fields.items() if k < key}
+        after = {k: v for k, v in fields.items() if k > key}
+    head = dumps(before)[:-1]
+    yield head + ("," if before else "") + dumps(key) + ":["
+    parts = []
+    first = True
+    for item in items:
+        parts.append(dumps(item) if first else "," + dumps(item))
+        first = False
+        if len(parts) >= batch:
+            yield "".join(parts)
+            parts = []
+    tail = dumps(after)[1:]
+    yield "".join(parts) + "]" + ("," if after else "") + tail + "\n"
@@ -224,10 +224,11 @@ def read_activity_log_from_db(
         *error_message* is ``""`` on success or a human-readable description.
     """
     import sqlite3 as _sqlite3
+    from utils import db_pool  # noqa: PLC0415
 
     max_rows = min(max_rows, MAX_LINES)
     try:
-        with _sqlite3.connect(db_path, timeout=5) as conn:
+        with db_pool.connect(db_path) as conn:
             cur = conn.execute(
                 "SELECT username, action, timestamp FROM activity_logs ORDER BY id ASC LIMIT ?",
                 (max_rows,),
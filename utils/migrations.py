@@ -0,0 +1,80 @@
+"""Versioned, one-shot schema migrations for the app's SQLite databases.
+
+Each database records the migrations it has applied in a
+``schema_version`` table.  :func:`migrate` reads the current version (the
+only statement on an up-to-date database) and applies anything newer in a
+single ``BEGIN IMMEDIATE`` transaction, so a start that has nothing to do
+writes nothing, and a crash part-way through leaves the old version in
+place to retry.
+
+Migrations are ``(version, description, apply)`` tuples; ``apply`` takes
+the connection and must not commit.  Versions only ever grow: append new
+migrations, never edit or reorder applied ones.  Databases created before
+versioning start at version 0 and run every migration, so the early ones
+are written to be idempotent (``CREATE TABLE IF NOT EXISTS``,
+:func:`add_column`).
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+from datetime import datetime, timezone
+from typing import Callable, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+Migration = Tuple[int, str, Callable[[sqlite3.Connection], None]]
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:  # no schema_version table yet
+        return 0
+    return row[0] or 0
+
+
+def add_column(conn: sqlite3.Connection, table: str, column: str, decl: str) -> None:
+    """``ALTER TABLE table ADD COLUMN column decl`` unless the column already exists."""
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in existing:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def migrate(conn: sqlite3.Connection, migrations: Sequence[Migration]) -> int:
+    """Bring *conn*'s database up to the last of *migrations*; returns how many ran."""
+    latest = migrations[-1][0] if migrations else 0
+    if current_version(conn) >= latest:
+        return 0
+
+    if conn.in_transaction:
+        conn.commit()
+    # Still open when called from a caller's pooled block (utils/db_pool.py):
+    # the migration then joins the caller's transaction.
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Re-read under the write lock: another worker may have just migrated.
+        version = current_version(conn)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS schema_version "
+            "(version INTEGER PRIMARY KEY, description TEXT, applied_at TEXT)"
+        )
+        applied = 0
+        for number, description, apply in migrations:
+            if number <= version:
+                continue
+            apply(conn)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) VALUES (?, ?, ?)",
+                (number, description, datetime.now(timezone.utc).isoformat()),
+            )
+            applied += 1
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    if applied:
+        logger.info("Applied %d schema migration(s), now at version %d", applied, latest)
+    return applied
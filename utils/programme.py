@@ -0,0 +1,202 @@
+"""Compact programme record used by the XMLTV ingest path and the programme store.
+
+Every parsed programme used to be a 7-key dict holding two tz-aware
+datetimes and two fresh lists, a few hundred bytes of overhead per entry.
+:class:`Programme` keeps the same fields in ``__slots__`` with the times as
+UTC epoch seconds:
+
+* ``start`` / ``stop`` are computed from ``start_ts`` / ``stop_ts`` on
+  access, so templates and callers that expect datetimes keep working.
+* ``categories`` / ``colors`` are tuples; the empty ones all share ``()``.
+* :class:`Interner` lets one ingest share repeated titles, icons and
+  category tuples between records.
+
+Records also answer ``p['title']`` / ``p.get('title')`` so code written
+against the old dicts reads them unchanged.
+"""
+
+from __future__ import annotations
+
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+EMPTY: Tuple[str, ...] = ()
+
+FIELDS = ("title", "desc", "start", "stop", "icon", "categories", "colors")
+
+
+def ts_to_datetime(ts: Optional[int]) -> Optional[datetime]:
+    return datetime.fromtimestamp(ts, tz=timezone.utc) if ts is not None else None
+
+
+def datetime_to_ts(dt: Optional[datetime]) -> Optional[int]:
+    return int(dt.timestamp()) if dt is not None else None
+
+
+class Programme:
+    """One guide entry.  Times are UTC epoch seconds (None when unknown)."""
+
+    __slots__ = ("title", "desc", "start_ts", "stop_ts", "icon", "categories", "colors")
+
+    def __init__(
+        self,
+        title: str = "",
+        desc: str = "",
+        start_ts: Optional[int] = None,
+        stop_ts: Optional[int] = None,
+        icon: str = "",
+        categories: Tuple[str, ...] = EMPTY,
+        colors: Tuple[str, ...] = EMPTY,
+    ):
+        self.title = title
+        self.desc = desc
+        self.start_ts = start_ts
+        self.stop_ts = stop_ts
+        self.icon = icon
+        self.categories = categories
+        self.colors = colors
+
+    @property
+    def start(self) -> Optional[datetime]:
+        return ts_to_datetime(self.start_ts)
+
+    @property
+    def stop(self) -> Optional[datetime]:
+        return ts_to_datetime(self.stop_ts)
+
+    # Read-only mapping access, for code written against the old dicts.
+    def __getitem__(self, key: str) -> Any:
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key) if key in FIELDS else None
+        return default if value is None else value
+
+    def keys(self) -> Tuple[str, ...]:
+        return FIELDS
+
+    def __contains__(self, key: object) -> bool:
+        return key in FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(FIELDS)
+
+    def with_stop(self, stop_ts: Optional[int]) -> "Programme":
+        return Programme(self.title, self.desc, self.start_ts, stop_ts,
+                         self.icon, self.categories, self.colors)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Programme):
+            return NotImplemented
+        return all(getattr(self, f) == getattr(other, f) for f in self.__slots__)
+
+    __hash__ = None  # mutable, like the dicts it replaces
+
+    def __repr__(self) -> str:
+        return f"Programme({self.title!r}, start_ts={self.start_ts}, stop_ts={self.stop_ts})"
+
+
+def as_programme(p: Any) -> Programme:
+    """Return *p* as a :class:`Programme`, converting a legacy programme dict."""
+    if isinstance(p, Programme):
+        return p
+    return Programme(
+        p.get("title") or "",
+        p.get("desc") or "",
+        datetime_to_ts(p.get("start")),
+        datetime_to_ts(p.get("stop")),
+        p.get("icon") or "",
+        tuple(p.get("categories") or EMPTY),
+        tuple(p.get("colors") or EMPTY),
+    )
+
+
+class Interner:
+    """Shares repeated strings and string tuples between the records of one ingest.
+
+    Strings go through :func:`sys.intern`; tuples are de-duplicated in a
+    per-instance table, so the table is released with the ingest.
+    """
+
+    def __init__(self) -> None:
+        self._tuples: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+
+    @staticmethod
+    def text(value: Optional[str]) -> str:
+        return sys.intern(value) if value else ""
+
+    def strings(self, values: Iterable[str]) -> Tuple[str, ...]:
+        t = tuple(sys.intern(v) for v in values)
+        if not t:
+            return EMPTY
+        return self._tuples.setdefault(t, t)
+
+
+# ---------------------------------------------------------------------------
+# Memory report (diagnostics)
+# ---------------------------------------------------------------------------
+
+def _deep_size(obj: Any, seen: set) -> int:
+    """Bytes reachable from *obj*, counting shared objects once.
+
+    Interned strings and the shared empty tuple are counted the first time
+    they are reached, which is what sharing buys.
+    """
+    if id(obj) in seen or obj is None or isinstance(obj, (bool, int)) and -5 <= obj <= 256:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_size(v, seen) for v in obj)
+    elif isinstance(obj, Programme):
+        size += sum(_deep_size(getattr(obj, f), seen) for f in Programme.__slots__)
+    return size
+
+
+def _fresh(s: str) -> str:
+    """A new string object equal to *s* (ElementTree hands out one per element)."""
+    return s[:1] + s[1:] if len(s) > 1 else s
+
+
+def _legacy_dict(p: Programme) -> Dict[str, Any]:
+    """The per-programme dict the parser used to build, with fresh lists."""
+    return {
+        "title": _fresh(p.title),
+        "desc": _fresh(p.desc),
+        "start": p.start,
+        "stop": p.stop,
+        "icon": _fresh(p.icon),
+        "categories": [_fresh(c) for c in p.categories],
+        "colors": [_fresh(c) for c in p.colors],
+    }
+
+
+def memory_report(programmes: List[Programme]) -> Dict[str, Any]:
+    """Compare bytes per programme for legacy dicts vs compact records.
+
+    Both sides are built from the same *programmes* sample: the legacy side
+    with the old dict shape and unshared strings and lists, the compact side
+    through an :class:`Interner` the way the ingest path builds records.
+    """
+    count = len(programmes)
+    if not count:
+        return {"sample_size": 0, "legacy_bytes_per_programme": None,
+                "compact_bytes_per_programme": None}
+    interner = Interner()
+    compact = [
+        Programme(interner.text(p.title), p.desc, p.start_ts, p.stop_ts, interner.text(p.icon),
+                  interner.strings(p.categories), interner.strings(p.colors))
+        for p in programmes
+    ]
+    legacy_bytes = _deep_size([_legacy_dict(p) for p in programmes], set())
+    compact_bytes = _deep_size(compact, set())
+    return {
+        "sample_size": count,
+        "legacy_bytes_per_programme": round(legacy_bytes / count),
+        "compact_bytes_per_programme": round(compact_bytes / count),
+    }
@@ -0,0 +1,182 @@
+"""Background auto-refresh scheduler.
+
+Auto-refresh used to be lazy: ``refresh_if_due()`` ran at the top of
+``/guide`` and ``/api/guide_snapshot``, so whichever viewer arrived first
+after the interval waited for a full download and parse, and every request
+paid the settings lookups that decided whether to.
+
+:class:`RefreshScheduler` runs one daemon thread instead.  It wakes every
+``poll_seconds`` and refreshes each tuner whose interval has elapsed, so
+request handlers only ever read the last published guide.  Each tuner's
+interval is stretched by a random jitter (redrawn after every refresh) so
+tuners configured together do not all hit their providers in the same tick.
+
+The scheduler knows nothing about tuners or settings: the app passes in
+callables.  :meth:`RefreshScheduler.run_pending` performs a single pass and
+is what the thread calls, so it can be driven directly without a thread.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Status of a tuner the scheduler has not refreshed yet.
+_IDLE: Dict[str, Any] = {
+    "state": "idle",
+    "started_at": None,
+    "last_result": None,
+    "last_duration_seconds": None,
+    "next_due": None,
+}
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat() if ts is not None else None
+
+
+class RefreshScheduler:
+    """Refreshes every tuner on its own interval from a background thread.
+
+    Args:
+        list_tuners: returns the names of all tuners.
+        refresh: refreshes one tuner by name; returns True on success.
+        interval_hours: returns the refresh interval, or None when
+            auto-refresh is disabled.
+        last_run: returns the epoch seconds of a tuner's last refresh
+            attempt, or None if it never ran.
+        poll_seconds: how often the thread checks for due tuners.
+        jitter: maximum extra fraction of the interval added per tuner.
+    """
+
+    def __init__(
+        self,
+        list_tuners: Callable[[], Iterable[str]],
+        refresh: Callable[[str], bool],
+        interval_hours: Callable[[], Optional[float]],
+        last_run: Callable[[str], Optional[float]],
+        poll_seconds: float = 60.0,
+        jitter: float = 0.1,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._list_tuners = list_tuners
+        self._refresh = refresh
+        self._interval_hours = interval_hours
+        self._last_run = last_run
+        self.poll_seconds = poll_seconds
+        self.jitter = jitter
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._factors: Dict[str, float] = {}
+        self._requested: List[str] = []
+        self._status: Dict[str, Dict[str, Any]] = {}
+
+    # -- control ----------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background thread (no-op if it is already running)."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name="auto-refresh")
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def trigger(self, tuner_name: str) -> None:
+        """Refresh *tuner_name* on the next pass, whether or not it is due."""
+        with self._lock:
+            if tuner_name not in self._requested:
+                self._requested.append(tuner_name)
+        self._wake.set()
+
+    # -- scheduling -------------------------------------------------------
+
+    def _due_at(self, name: str, interval_hours: Optional[float]) -> Optional[float]:
+        """Epoch seconds at which *name* is due, or None when never."""
+        if interval_hours is None:
+            return None
+        last = self._last_run(name)
+        if last is None:
+            return self._clock()
+        factor = self._factors.setdefault(name, 1.0 + random.uniform(0.0, self.jitter))
+        return last + interval_hours * 3600.0 * factor
+
+    def run_pending(self) -> List[str]:
+        """Refresh every tuner that is due or was triggered; return their names."""
+        interval = self._interval_hours()
+        with self._lock:
+            requested, self._requested = self._requested, []
+        refreshed = []
+        for name in list(self._list_tuners()):
+            if self._stopping.is_set():
+                break
+            due_at = self._due_at(name, interval)
+            if name not in requested and (due_at is None or self._clock() < due_at):
+                self._set_status(name, next_due=_iso(due_at))
+                continue
+            self._run_one(name)
+            refreshed.append(name)
+            self._factors.pop(name, None)
+            self._set_status(name, next_due=_iso(self._due_at(name, interval)))
+        return refreshed
+
+    def _run_one(self, name: str) -> None:
+        started = self._clock()
+        self._set_status(name, state="running", started_at=_iso(started))
+        ok = False
+        try:
+            ok = bool(self._refresh(name))
+        except Exception:
+            logger.exception("auto-refresh: refresh of %s failed", name)
+        finally:
+            self._set_status(
+                name,
+                state="idle",
+                last_result="success" if ok else "failed",
+                last_duration_seconds=round(self._clock() - started, 3),
+            )
+
+    def _run(self) -> None:
+        logger.info("auto-refresh: scheduler started (poll every %ss)", self.poll_seconds)
+        while not self._stopping.is_set():
+            # Cleared before the pass so a trigger() during it is not lost.
+            self._wake.clear()
+            try:
+                self.run_pending()
+            except Exception:
+                logger.exception("auto-refresh: scheduler pass failed")
+            self._wake.wait(self.poll_seconds)
+
+    # -- status -----------------------------------------------------------
+
+    def _set_status(self, name: str, **fields: Any) -> None:
+        with self._lock:
+            self._status.setdefault(name, dict(_IDLE)).update(fields)
+
+    def status(self, tuner_name: Optional[str] = None) -> Dict[str, Any]:
+        """Progress of one tuner, or of the scheduler and every tuner seen so far."""
+        with self._lock:
+            if tuner_name is not None:
+                return dict(self._status.get(tuner_name, _IDLE))
+            return {
+                "running": self._thread is not None and self._thread.is_alive(),
+                "poll_seconds": self.poll_seconds,
+                "tuners": {name: dict(entry) for name, entry in self._status.items()},
+            }
@@ -25,10 +25,11 @@ from __future__ import annotations
 
 import logging
 import math
-import sqlite3
 import string
 from typing import Any, Dict, List
 
+from utils import db_pool
+
 logger = logging.getLogger(__name__)
 
 
@@ -114,7 +115,7 @@ def _check_secret_key(secret_key: str) -> Dict[str, Any]:
 def _check_admin_password_hash(db_path: str) -> Dict[str, Any]:
     """Verify the admin password uses a strong modern hash algorithm."""
     try:
-        with sqlite3.connect(db_path, timeout=5) as conn:
+        with db_pool.connect(db_path) as conn:
             row = conn.execute(
                 "SELECT password FROM users WHERE username = 'admin' LIMIT 1"
             ).fetchone()
@@ -0,0 +1,159 @@
+"""Cached access to the ``settings`` key/value table in the tuner DB.
+
+The settings getters used to open a connection and run one ``SELECT`` per
+key, so rendering ``/guide`` cost dozens of connections.
+:class:`SettingsStore` loads a whole key namespace (everything up to the
+first ``.``, e.g. ``overlay.``) with one range query on the primary key and
+answers later reads from memory.
+
+The cache is dropped when:
+
+* a write goes through the store (the cache is updated in place instead,
+  and the ``on_write`` callback runs);
+* ``PRAGMA data_version`` on the store's connection changes, which happens
+  whenever any *other* connection commits to the file -- another worker
+  process, a script, or the app's own pooled connections
+  (``utils/db_pool.py``);
+* the DB path changes or the file is replaced (e.g. a restore).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Set
+
+from utils.db_pool import WatchedConnection
+
+
+def namespace(key: str) -> str:
+    """The load unit for *key*: its text up to and including the first ``.``."""
+    dot = key.find(".")
+    return key if dot < 0 else key[:dot + 1]
+
+
+def _prefix_upper_bound(prefix: str) -> str:
+    # Smallest string greater than every string starting with *prefix*.
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class SettingsStore:
+    """Read-through, write-through cache of the settings table at ``path()``."""
+
+    def __init__(self, path: Callable[[], str], timeout: float = 10,
+                 on_write: Optional[Callable[[], Any]] = None):
+        # A dedicated connection, not a pooled one: data_version only
+        # reports commits made by *other* connections.
+        self._watch = WatchedConnection(path, timeout)
+        self._on_write = on_write
+        self._lock = threading.RLock()
+        self._values: Dict[str, str] = {}
+        self._loaded: Set[str] = set()
+        self._stats = {"hits": 0, "loads": 0, "invalidations": 0}
+
+    def _drop(self) -> None:
+        if self._loaded:
+            self._stats["invalidations"] += 1
+        self._values.clear()
+        self._loaded.clear()
+
+    def _validate(self) -> sqlite3.Connection:
+        """Connection for the current DB file, with the cache dropped if stale."""
+        conn, changed = self._watch.check()
+        if changed:
+            self._drop()
+        return conn
+
+    def _ensure(self, conn: sqlite3.Connection, prefix: str) -> None:
+        if prefix in self._loaded:
+            self._stats["hits"] += 1
+            return
+        try:
+            rows = conn.execute(
+                "SELECT key, value FROM settings WHERE key >= ? AND key < ?",
+                (prefix, _prefix_upper_bound(prefix)),
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # No settings table yet (fresh DB before init); nothing to cache.
+            return
+        self._stats["loads"] += 1
+        for key, value in rows:
+            self._values[key] = value
+        self._loaded.add(prefix)
+
+    # -- reads ---------------------------------------------------------------
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Stored value of *key* (a string), or *default* when unset."""
+        with self._lock:
+            conn = self._validate()
+            self._ensure(conn, namespace(key))
+            return self._values.get(key, default)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Stored values of those *keys* that are set."""
+        keys = list(keys)
+        with self._lock:
+            conn = self._validate()
+            for ns in {namespace(k) for k in keys}:
+                self._ensure(conn, ns)
+            return {k: self._values[k] for k in keys if k in self._values}
+
+    def prefix(self, prefix: str) -> Dict[str, str]:
+        """All stored keys starting with *prefix* and their values."""
+        with self._lock:
+            conn = self._validate()
+            self._ensure(conn, namespace(prefix))
+            return {k: v for k, v in self._values.items() if k.startswith(prefix)}
+
+    # -- writes --------------------------------------------------------------
+
+    def set_many(self, values: Mapping[str, Any]) -> None:
+        """Store every key of *values* (as strings) in one transaction."""
+        items = [(k, None if v is None else str(v)) for k, v in values.items()]
+        with self._lock:
+            conn = self._validate()
+            try:
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", items)
+            except Exception:
+                self._drop()
+                raise
+            for k, v in items:
+                self._values[k] = v
+        self._written()
+
+    def set(self, key: str, value: Any) -> None:
+        self.set_many({key: value})
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            conn = self._validate()
+            try:
+                with conn:
+                    conn.executemany("DELETE FROM settings WHERE key=?", [(k,) for k in keys])
+            except Exception:
+                self._drop()
+                raise
+            for k in keys:
+                self._values.pop(k, None)
+        self._written()
+
+    def _written(self) -> None:
+        if self._on_write is not None:
+            self._on_write()
+
+    # -- maintenance ---------------------------------------------------------
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._drop()
+
+    def close(self) -> None:
+        with self._lock:
+            self._watch.close()
+            self._drop()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "keys": len(self._values), "namespaces": sorted(self._loaded)}
@@ -0,0 +1,66 @@
+"""Small LRU cache whose concurrent misses share one computation.
+
+Used for payloads that are expensive to build and identical for every
+caller with the same key (for example ``/api/guide_snapshot`` per guide
+generation and window).  When many clients poll at once right after a
+refresh, the first caller builds the value and the others wait for that
+result instead of building it again.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlightCache:
+    """Keeps the last *max_entries* values; one build per missing key at a time."""
+
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._values: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._inflight: Dict[Hashable, Future] = {}
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        """Return the cached value for *key*, building it with ``build()`` on a miss.
+
+        If another thread is already building *key*, wait for its result.
+        An exception from ``build()`` is raised in every waiting caller and
+        nothing is cached.
+        """
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end(key)
+                self.hits += 1
+                return self._values[key]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            value = build()
+        except BaseException as exc:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self.builds += 1
+            self._values[key] = value
+            while len(self._values) > self.max_entries:
+                self._values.popitem(last=False)
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
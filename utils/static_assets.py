@@ -0,0 +1,79 @@
+"""Content fingerprints for files under ``static/``.
+
+``url_for('static', filename=...)`` used to produce bare URLs, so after
+every guide reload the browser revalidated each script, stylesheet and
+logo.  :class:`AssetManifest` maps each static file to a short hash of its
+content.  The app appends it as ``?v=<hash>`` to static URLs and serves
+requests carrying the current hash with a one-year ``immutable``
+``Cache-Control``, so repeat page loads need no static requests at all.
+When a file changes, its hash and therefore its URL change with it.
+
+The manifest is built at startup (:meth:`AssetManifest.build`).  Lookups
+re-check the file's size and mtime, so files added or replaced while the
+app runs (uploaded logos and music) get a fresh hash on their next URL.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from werkzeug.security import safe_join
+
+HASH_LENGTH = 12
+_CHUNK = 1024 * 1024
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()[:HASH_LENGTH]
+
+
+class AssetManifest:
+    """``filename -> content hash`` for the files under *static_dir*."""
+
+    def __init__(self, static_dir: str):
+        self.static_dir = static_dir
+        self._lock = threading.Lock()
+        # filename -> (mtime_ns, size, hash)
+        self._entries: Dict[str, Tuple[int, int, str]] = {}
+
+    def build(self) -> int:
+        """Hash every file under the static directory; return how many."""
+        count = 0
+        for root, _dirs, files in os.walk(self.static_dir):
+            for name in files:
+                rel = os.path.relpath(os.path.join(root, name), self.static_dir)
+                if self.version(rel.replace(os.sep, "/")):
+                    count += 1
+        return count
+
+    def version(self, filename: str) -> Optional[str]:
+        """Content hash of static *filename*, or None if it does not exist."""
+        path = safe_join(self.static_dir, filename)
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            entry = self._entries.get(filename)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+        try:
+            digest = _file_hash(path)
+        except OSError:
+            return None
+        with self._lock:
+            self._entries[filename] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,85 @@
+"""Small bounded, time-limited cache for per-user lookups.
+
+Flask-Login reloads the user on every authenticated request and the guide
+and overlays re-read the user's preferences on every poll; both change
+rarely and every in-process write path drops or replaces the entry
+explicitly.  Writes made by another process (another worker, the
+``reset_admin_password`` script) are only picked up once an entry expires,
+so keep the TTL short.
+
+The users DB cannot be watched through ``PRAGMA data_version`` the way
+the tuner DB is (see ``utils/settings_store.py``): every ``log_event``
+commits to it, which would empty the cache on nearly every request.
+
+Entries are scoped to ``scope()`` -- the DB path -- and the whole cache is
+dropped when it changes.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, scope: Callable[[], Any], ttl: float = 60.0, maxsize: int = 256,
+                 clock: Callable[[], float] = time.monotonic):
+        self._scope_fn = scope
+        self._scope: Any = MISSING
+        self._ttl = ttl
+        self._maxsize = maxsize
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _check_scope(self) -> None:
+        scope = self._scope_fn()
+        if scope != self._scope:
+            self._entries.clear()
+            self._scope = scope
+
+    def get(self, key: Hashable) -> Any:
+        """Cached value for *key*, or :data:`MISSING`."""
+        with self._lock:
+            self._check_scope()
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self._stats["misses"] += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._check_scope()
+            self._entries[key] = (self._clock() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[Hashable, Any], bool]) -> None:
+        """Drop every entry for which ``predicate(key, value)`` is true."""
+        with self._lock:
+            for key in [k for k, (_, v) in self._entries.items() if predicate(k, v)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries)}
@@ -14,17 +14,25 @@ from __future__ import annotations
 
 import html
 import logging
+import lzma
 import re
 import requests as _req
 import socket
-import sqlite3
 import time
 import xml.etree.ElementTree as ET
+import zlib
 from typing import Any, Dict, List, Optional
 from urllib.parse import urlparse
 
+from utils import db_pool
+from utils.xmltv import decompressed_chunks, detect_compression, parse_time
+
 logger = logging.getLogger(__name__)
 
+# Cap on the decompressed size of a compressed XMLTV sample (the compressed
+# fetch itself is capped at 5 MB by _fetch_url).
+MAX_DECOMPRESSED_BYTES = 40 * 1024 * 1024
+
 
 # ---------------------------------------------------------------------------
 # Public entry point
@@ -278,6 +286,12 @@ def _trace_xmltv(url: str) -> Dict[str, Any]:
         return trace
 
     raw = fetch["raw_bytes"]
+    compression = detect_compression(raw[:8], fetch.get("content_encoding"))
+    trace["compression"] = compression
+    if compression:
+        raw = _decompress_sample(raw, fetch)
+        # The coverage cross-check re-reads raw_bytes, so keep the plain XML.
+        fetch["raw_bytes"] = raw
     trace["content_sample"] = _safe_content_sample(raw, max_bytes=1024)
 
     ct = fetch.get("content_type", "") or ""
@@ -291,6 +305,21 @@ def _trace_xmltv(url: str) -> Dict[str, Any]:
     return trace
 
 
+def _decompress_sample(raw: bytes, fetch: Dict[str, Any]) -> bytes:
+    """Decompress a gzip/xz/bz2 XMLTV body, capped like the raw fetch."""
+    out = b""
+    try:
+        for piece in decompressed_chunks([raw], fetch.get("content_encoding")):
+            out += piece
+            if len(out) >= MAX_DECOMPRESSED_BYTES:
+                fetch["truncated"] = True
+                break
+    except (OSError, EOFError, zlib.error, lzma.LZMAError) as exc:
+        # A body cut off by the fetch cap ends mid-stream; keep what decoded.
+        logger.debug("Could not fully decompress XMLTV response: %s", exc)
+    return out
+
+
 def _analyse_xmltv_bytes(raw: bytes) -> Dict[str, Any]:
     """Parse raw bytes as XMLTV and return statistics."""
     result: Dict[str, Any] = {
@@ -368,15 +397,12 @@ def _analyse_xmltv_bytes(raw: bytes) -> Dict[str, Any]:
         )
     else:
         # Time range
-        starts = []
-        for p in programmes:
-            s = p.attrib.get("start", "")
-            if s and len(s) >= 14:
-                starts.append(s[:14])
+        # Compared in UTC, so feeds with mixed offsets are ordered correctly.
+        starts = [ts for ts in (parse_time(p.attrib.get("start")) for p in programmes)
+                  if ts is not None]
         if starts:
-            starts.sort()
-            result["earliest_programme"] = starts[0]
-            result["latest_programme"] = starts[-1]
+            result["earliest_programme"] = time.strftime("%Y%m%d%H%M%S +0000", time.gmtime(min(starts)))
+            result["latest_programme"] = time.strftime("%Y%m%d%H%M%S +0000", time.gmtime(max(starts)))
 
         # Channels with programmes
         prog_cids = {p.attrib.get("channel", "") for p in programmes}
@@ -517,7 +543,7 @@ def _strip_raw_bytes(trace: Optional[Dict[str, Any]]) -> None:
 
 def _load_tuner_config(tuner_name: str, tuner_db_path: str) -> Dict[str, Any]:
     """Read a single tuner row from the DB."""
-    with sqlite3.connect(tuner_db_path, timeout=5) as conn:
+    with db_pool.connect(tuner_db_path) as conn:
         cur = conn.execute(
             "SELECT name, xml, m3u, tuner_type, sources FROM tuners WHERE name=?",
             (tuner_name,),
@@ -567,6 +593,7 @@ def _fetch_url(url: str, timeout: int = 15) -> Dict[str, Any]:
         "status_code": None,
         "content_type": None,
         "content_length": None,
+        "content_encoding": None,
         "response_time_ms": None,
         "error": None,
         "raw_bytes": b"",
@@ -580,6 +607,7 @@ def _fetch_url(url: str, timeout: int = 15) -> Dict[str, Any]:
         result["status_code"] = resp.status_code
         result["content_type"] = resp.headers.get("Content-Type", "")
         result["content_length"] = resp.headers.get("Content-Length")
+        result["content_encoding"] = resp.headers.get("Content-Encoding")
         resp.raise_for_status()
 
         raw = b""
@@ -0,0 +1,157 @@
+"""In-memory copy of the ``tuners`` table and the active tuner.
+
+Nearly every page render needs the tuner list (the header fly-out) and the
+active tuner, and several routes look up one tuner's URLs or decode a
+combined tuner's ``sources`` JSON.  :class:`TunerRegistry` parses the
+table once and serves those reads from memory.
+
+Changes made through the registry (add, rename, delete, URL updates, the
+tuner switch) run in one transaction on its own connection and the
+in-memory copy is re-read from that connection after the commit.  Changes
+made by anything else -- another process, a script -- are noticed through
+``PRAGMA data_version`` (see :class:`utils.db_pool.WatchedConnection`).
+
+:attr:`TunerRegistry.generation` grows by one every time the tuner table or
+the active tuner changes, for caches that depend on either.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.db_pool import WatchedConnection
+
+_Tuners = Dict[str, Dict[str, Any]]
+
+
+def _load(conn: sqlite3.Connection) -> Tuple[_Tuners, Optional[str]]:
+    tuners: _Tuners = {}
+    try:
+        rows = conn.execute("SELECT name, xml, m3u, tuner_type, sources FROM tuners").fetchall()
+    except sqlite3.OperationalError:
+        # Old schema without the tuner_type/sources columns.
+        rows = [row + ("standard", None) for row in conn.execute("SELECT name, xml, m3u FROM tuners")]
+    for name, xml, m3u, tuner_type, sources_json in rows:
+        try:
+            sources = json.loads(sources_json) if sources_json else []
+        except ValueError:
+            sources = []
+        tuners[name] = {"xml": xml, "m3u": m3u, "tuner_type": tuner_type or "standard",
+                        "sources": sources}
+    row = conn.execute("SELECT value FROM settings WHERE key='current_tuner'").fetchone()
+    return tuners, (row[0] if row else None)
+
+
+def _copy(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {**entry, "sources": list(entry["sources"])}
+
+
+class TunerRegistry:
+    def __init__(self, path: Callable[[], str]):
+        self._watch = WatchedConnection(path)
+        self._lock = threading.RLock()
+        self._tuners: Optional[_Tuners] = None
+        self._current: Optional[str] = None
+        self.generation = 0
+
+    def _refresh(self, force: bool = False) -> sqlite3.Connection:
+        conn, changed = self._watch.check()
+        if changed or force or self._tuners is None:
+            try:
+                tuners, current = _load(conn)
+            except sqlite3.OperationalError:
+                # Tables not created yet (before init_tuners_db).
+                self._tuners, self._current = None, None
+                return conn
+            if (tuners, current) != (self._tuners, self._current):
+                self.generation += 1
+            self._tuners, self._current = tuners, current
+        return conn
+
+    # -- reads ---------------------------------------------------------------
+
+    def tuners(self) -> _Tuners:
+        """``{name: {"xml", "m3u", "tuner_type", "sources"}}`` (a copy)."""
+        with self._lock:
+            self._refresh()
+            return {name: _copy(entry) for name, entry in (self._tuners or {}).items()}
+
+    def names(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return list(self._tuners or ())
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._refresh()
+            entry = (self._tuners or {}).get(name)
+            return _copy(entry) if entry is not None else None
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return name in (self._tuners or {})
+
+    def current(self) -> Optional[str]:
+        with self._lock:
+            self._refresh()
+            return self._current
+
+    def current_generation(self) -> int:
+        """:attr:`generation` after picking up changes from other connections."""
+        with self._lock:
+            self._refresh()
+            return self.generation
+
+    # -- writes --------------------------------------------------------------
+
+    def _write(self, statements: List[Tuple[str, tuple]]) -> None:
+        with self._lock:
+            conn = self._refresh()
+            try:
+                with conn:
+                    for sql, params in statements:
+                        conn.execute(sql, params)
+            finally:
+                self._refresh(force=True)
+
+    def add(self, name: str, xml: Optional[str], m3u: Optional[str],
+            tuner_type: str = "standard", sources: Optional[List[str]] = None) -> None:
+        """Insert a tuner; ValueError if the name is taken."""
+        with self._lock:
+            if name in self:
+                raise ValueError(f"Tuner '{name}' already exists")
+            try:
+                self._write([(
+                    "INSERT INTO tuners (name, xml, m3u, tuner_type, sources) VALUES (?, ?, ?, ?, ?)",
+                    (name, xml, m3u, tuner_type, json.dumps(sources) if sources is not None else None),
+                )])
+            except sqlite3.OperationalError:
+                if tuner_type != "standard":
+                    raise
+                # Old schema without the tuner_type/sources columns.
+                self._write([("INSERT INTO tuners (name, xml, m3u) VALUES (?, ?, ?)", (name, xml, m3u))])
+
+    def update_urls(self, name: str, xml: Optional[str], m3u: Optional[str]) -> None:
+        self._write([("UPDATE tuners SET xml=?, m3u=? WHERE name=?", (xml, m3u, name))])
+
+    def rename(self, old: str, new: str) -> None:
+        """Rename a tuner, keeping it active if it was."""
+        self._write([
+            ("UPDATE tuners SET name=? WHERE name=?", (new, old)),
+            ("UPDATE settings SET value=? WHERE key='current_tuner' AND value=?", (new, old)),
+        ])
+
+    def delete(self, name: str) -> None:
+        self._write([("DELETE FROM tuners WHERE name=?", (name,))])
+
+    def set_current(self, name: str) -> None:
+        self._write([("INSERT OR REPLACE INTO settings (key, value) VALUES ('current_tuner', ?)", (name,))])
+
+    def close(self) -> None:
+        with self._lock:
+            self._watch.close()
+            self._tuners, self._current = None, None
@@ -0,0 +1,269 @@
+"""Streaming XMLTV helpers used by the EPG ingest path.
+
+``parse_epg`` used to buffer the whole XMLTV body (``r.content``) and build
+the complete element tree with ``ET.fromstring`` before converting a single
+programme, so a 400 MB multi-provider guide needed several GB of RSS.
+
+The helpers here let the caller consume the HTTP response incrementally:
+
+* :class:`ChunkReader` adapts an iterator of ``bytes`` chunks (for example
+  ``requests.Response.iter_content``) into the minimal file object that
+  ``ET.iterparse`` reads from.
+* :func:`iter_epg_elements` yields each top-level ``<channel>`` /
+  ``<programme>`` element as soon as its end tag has been parsed and clears
+  it from the tree once the caller has converted it, so peak memory is one
+  element plus whatever the caller keeps.
+* :func:`decompressed_chunks` transparently unwraps ``.xml.gz`` / ``.xz`` /
+  ``.bz2`` feeds chunk by chunk, so the uncompressed document is never held
+  in memory either.
+* :func:`parse_time` turns an XMLTV ``YYYYMMDDHHMMSS +HHMM`` timestamp into
+  UTC epoch seconds, honouring the offset.
+"""
+
+from __future__ import annotations
+
+import bz2
+import lzma
+import xml.etree.ElementTree as ET
+import zlib
+from functools import lru_cache
+from typing import IO, Callable, Iterable, Iterator, Optional, Tuple, Union
+
+# Size of the chunks requested from the HTTP response.  64 KiB keeps the
+# number of Python-level reads low without holding much data in flight.
+CHUNK_SIZE = 64 * 1024
+
+EPG_TAGS = ("channel", "programme")
+
+# Upper bound on the decompressed bytes produced per step, so a small, highly
+# compressible input chunk cannot expand into one huge allocation.
+MAX_DECOMPRESSED_PIECE = 1024 * 1024
+
+_MAGIC_NUMBERS = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\xfd7zXZ\x00", "xz"),
+    (b"BZh", "bz2"),
+)
+
+# Content-Encoding tokens that requests/urllib3 leave undecoded.  gzip and
+# deflate are already unwrapped by the HTTP layer, so for those the magic
+# bytes of the (possibly still compressed) payload decide.
+_CONTENT_ENCODINGS = {
+    "xz": "xz",
+    "x-xz": "xz",
+    "bzip2": "bz2",
+    "x-bzip2": "bz2",
+}
+
+
+class ChunkReader:
+    """Read-only file object over an iterator of ``bytes`` chunks.
+
+    Only ``read()`` is implemented because that is all ``ET.iterparse``
+    needs.  Empty keep-alive chunks are skipped.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._buf = b""
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            data = self._buf + b"".join(self._chunks)
+            self._buf = b""
+            return data
+        while len(self._buf) < size:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                break
+            if chunk:
+                self._buf += chunk
+        data, self._buf = self._buf[:size], self._buf[size:]
+        return data
+
+
+def iter_epg_elements(
+    source: Union[IO[bytes], ChunkReader],
+    tags: Tuple[str, ...] = EPG_TAGS,
+) -> Iterator[ET.Element]:
+    """Yield the top-level XMLTV elements named in *tags* as they complete.
+
+    Every direct child of the document root is cleared and detached after
+    the consumer has resumed the generator, whether or not it was yielded,
+    so the tree never accumulates more than the element currently being
+    handled.  The yielded element must therefore be fully converted before
+    the next one is requested.
+
+    ``ET.ParseError`` propagates to the caller for malformed documents.
+    """
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            if elem.tag in tags:
+                yield elem
+            elem.clear()
+            root.clear()
+
+
+# ---------------------------------------------------------------------------
+# Compressed feeds
+# ---------------------------------------------------------------------------
+
+def detect_compression(head: bytes, content_encoding: Optional[str] = None) -> Optional[str]:
+    """Return ``'gzip'``, ``'xz'``, ``'bz2'`` or ``None`` for a payload.
+
+    *head* is the first few bytes of the body; the magic number wins.  When
+    it is inconclusive, a ``Content-Encoding`` the HTTP layer does not decode
+    itself (``xz``, ``bzip2``) is used instead.
+    """
+    for magic, kind in _MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return kind
+    for token in (content_encoding or "").lower().split(","):
+        kind = _CONTENT_ENCODINGS.get(token.strip())
+        if kind:
+            return kind
+    return None
+
+
+def decompressed_chunks(
+    chunks: Iterable[bytes],
+    content_encoding: Optional[str] = None,
+) -> Iterator[bytes]:
+    """Yield *chunks* decompressed on the fly when they are gzip/xz/bz2 data.
+
+    The first bytes are peeked to pick a codec; plain XML passes through
+    untouched.  Concatenated members/streams (``cat a.gz b.gz``) are handled.
+    """
+    chunks = iter(chunks)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= 6:
+            break
+
+    def _replay() -> Iterator[bytes]:
+        if head:
+            yield head
+        yield from chunks
+
+    kind = detect_compression(head, content_encoding)
+    if kind == "gzip":
+        return _gunzip_chunks(_replay())
+    if kind == "xz":
+        return _unpack_chunks(_replay(), lzma.LZMADecompressor)
+    if kind == "bz2":
+        return _unpack_chunks(_replay(), bz2.BZ2Decompressor)
+    return _replay()
+
+
+def _gunzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = chunk
+        while data:
+            out = d.decompress(data, MAX_DECOMPRESSED_PIECE)
+            if out:
+                yield out
+            if d.eof:
+                # Next gzip member, ignoring NUL padding after the last one.
+                data = d.unused_data
+                d = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                if not data.strip(b"\x00"):
+                    data = b""
+            else:
+                data = d.unconsumed_tail
+    tail = d.flush()
+    if tail:
+        yield tail
+
+
+def _unpack_chunks(chunks: Iterable[bytes], factory: Callable) -> Iterator[bytes]:
+    """Stream through an ``lzma``/``bz2`` style decompressor."""
+    d = factory()
+    for chunk in chunks:
+        data = chunk
+        while True:
+            out = d.decompress(data, MAX_DECOMPRESSED_PIECE)
+            if out:
+                yield out
+            if d.eof:
+                data = d.unused_data
+                d = factory()
+                if not data.strip(b"\x00"):
+                    break
+                continue
+            if d.needs_input:
+                break
+            data = b""
+
+
+# ---------------------------------------------------------------------------
+# Timestamps
+# ---------------------------------------------------------------------------
+
+# Consecutive programmes share boundaries (one's stop is the next one's
+# start) and a guide repeats the same slot times on every channel, so a
+# modest cache answers most lookups.
+TIME_CACHE_SIZE = 16384
+
+_MONTH_DAYS = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _days_from_civil(y: int, m: int, d: int) -> int:
+    """Days since 1970-01-01 for a proleptic Gregorian date."""
+    y -= m <= 2
+    era = (y if y >= 0 else y - 399) // 400
+    yoe = y - era * 400
+    doy = (153 * (m + (-3 if m > 2 else 9)) + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+@lru_cache(maxsize=TIME_CACHE_SIZE)
+def parse_time(value: Optional[str]) -> Optional[int]:
+    """Return UTC epoch seconds for an XMLTV timestamp, or None if malformed.
+
+    Accepts ``YYYYMMDDhhmmss`` optionally followed, with or without a space,
+    by a numeric offset (``+0200``, ``-0500``, ``+02:00``).  Seconds, or
+    minutes and seconds, may be omitted as the XMLTV DTD allows.  A missing
+    offset means UTC, and so does anything else after the digits (``UTC``,
+    ``Z``, ``GMT``, junk) -- feeds like that have always been read as UTC.
+    The digits are sliced as integers instead of going through ``strptime``.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    n = 0
+    while n < len(value) and value[n].isdigit():
+        n += 1
+    if n > 14:
+        n = 14
+    elif n not in (10, 12, 14):
+        return None
+    stamp, offset = value[:n], value[n:]
+    year, month, day = int(stamp[:4]), int(stamp[4:6]), int(stamp[6:8])
+    hour = int(stamp[8:10])
+    minute = int(stamp[10:12]) if n >= 12 else 0
+    second = int(stamp[12:14]) if n == 14 else 0
+    if not (1 <= month <= 12 and hour < 24 and minute < 60 and second < 61):
+        return None
+    if not 1 <= day <= _MONTH_DAYS[month] or (
+            month == 2 and day == 29 and (year % 4 or (year % 100 == 0 and year % 400))):
+        return None
+    ts = (_days_from_civil(year, month, day) * 86400
+          + hour * 3600 + minute * 60 + second)
+
+    offset = offset.strip().replace(":", "")
+    if len(offset) == 5 and offset[0] in "+-" and offset[1:].isdigit():
+        shift = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+        ts -= shift if offset[0] == "+" else -shift
+    return ts